@@ -0,0 +1,67 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# analyze_pipeline_benchmark.py
+
+# Resource importing and management.
+from pathlib import Path
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "SQL Optimizer"))
+
+from query_parser import QueryParser
+from query_cache import summary_cache
+from explain_analyzer import ExplainAnalyzer
+from suggestions import Suggestions
+
+# Queries covering the analyzer's text checks, from a single table scan to nested subqueries.
+QUERIES = [
+    "SELECT * FROM users WHERE age > 30 ORDER BY name LIMIT 10",
+    "SELECT DISTINCT city FROM customers WHERE LOWER(email) = 'a@b.com' OR name LIKE '%son'",
+    "SELECT u.name, COUNT(o.id) FROM users u JOIN orders o ON u.id = o.user_id WHERE o.total > 100 GROUP BY u.name HAVING COUNT(o.id) > 2",
+    "SELECT name FROM employees WHERE dept IN (SELECT id FROM departments WHERE city IN (SELECT city FROM offices WHERE region = 'EU')) AND salary > 50000",
+]
+
+# Representative EXPLAIN QUERY PLAN rows shared by every query.
+EXPLAIN_PLAN = [
+    {"id" : 2, "parent" : 0, "notused" : 0, "detail" : "SCAN users"},
+    {"id" : 5, "parent" : 0, "notused" : 0, "detail" : "USE TEMP B-TREE FOR ORDER BY"},
+]
+
+# Pipeline before the change: the query is parsed twice and the analyzer re-scans the raw text with regexes.
+def baseline_pipeline(query):
+    QueryParser(query).summarize_query()
+    summary = QueryParser(query).summarize_query()
+    issues = ExplainAnalyzer(EXPLAIN_PLAN, raw_query = query).analyze()["issues_detected"]
+    return summary, Suggestions(issues).generate_suggestions()
+
+# Pipeline after the change: one parse yields the summary and the analyzer features.
+def shared_parse_pipeline(query):
+    profile = summary_cache.lookup(query)
+    issues = ExplainAnalyzer(EXPLAIN_PLAN, raw_query = query, query_features = profile["features"]).analyze()["issues_detected"]
+    return profile["summary"], Suggestions(issues).generate_suggestions()
+
+# Returns the CPU seconds spent running the pipeline over every query for the given number of rounds.
+def measure(pipeline, rounds, cold):
+    start = time.process_time()
+    for _ in range(rounds):
+        for query in QUERIES:
+            if cold:
+                summary_cache.clear()
+            pipeline(query)
+    return time.process_time() - start
+
+# Runs the benchmark and prints per-query CPU time for each variant.
+def main(rounds = 200):
+    calls = rounds * len(QUERIES)
+    baseline = measure(baseline_pipeline, rounds, cold = True)
+    cold = measure(shared_parse_pipeline, rounds, cold = True)
+    warm = measure(shared_parse_pipeline, rounds, cold = False)
+
+    print(f"{'pipeline':<28}{'cpu us/query':>14}{'speedup':>10}")
+    for name, seconds in (("baseline (parse twice)", baseline), ("shared parse, cold cache", cold), ("shared parse, warm cache", warm)):
+        print(f"{name:<28}{seconds / calls * 1e6:>14.1f}{baseline / seconds:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
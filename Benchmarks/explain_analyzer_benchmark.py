@@ -0,0 +1,132 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# explain_analyzer_benchmark.py
+
+# Resource importing and management.
+from pathlib import Path
+import random
+import sys
+import time
+import re
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "SQL Optimizer"))
+
+from explain_analyzer import ExplainAnalyzer
+from query_parser import QueryParser
+from plan_tree import classify_step
+from rules import clear_dispatch_tables
+
+# Query exercising every text rule.
+QUERY = "SELECT DISTINCT name FROM users WHERE LOWER(email) = 'a@b.com' OR name LIKE '%son' ORDER BY name"
+
+# Plan steps the synthetic plans are drawn from: mostly table access, with some sorting and grouping.
+STEPS = [
+    "SCAN users", "SCAN users", "SCAN users", "SCAN users",
+    "SEARCH orders USING INDEX idx_orders (user_id=?)", "SEARCH orders USING INDEX idx_orders (user_id=?)",
+    "SEARCH orders USING INDEX idx_orders (user_id=?)", "SEARCH orders USING INDEX idx_orders (user_id=?)",
+    "USE TEMP B-TREE FOR ORDER BY", "USE TEMP B-TREE FOR GROUP BY"
+]
+
+
+# The analyzer before the rule engine: seven checks, each rescanning the plan or the query text.
+class SequentialChecks:
+
+    # Initializes the checks for a plan and query.
+    def __init__(self, explain_plan, raw_query = ""):
+        self.explain_plan = explain_plan
+        self.raw_query = raw_query.upper()
+        self.issues = []
+
+    # Runs every check in the original order.
+    def analyze(self):
+        for row in self.explain_plan:
+            detail = row.get("detail", "").upper()
+            if "SCAN" in detail and "USING INDEX" not in detail:
+                self.issues.append({"type": "Full Table Scan", "message": f"Query performs full table scan: '{row['detail']}'"})
+        for purpose, issue_type, message in (
+            ("ORDER BY", "Unnecessary Filesort", "Query may be using an unnecessary filesort"),
+            ("GROUP BY", "Inefficient GROUP BY", "Query may be using a temporary B-Tree for the GROUP BY Clause")
+        ):
+            index_seen = False
+            for row in self.explain_plan:
+                detail = row.get("detail", "").upper()
+                if "USING INDEX" in detail:
+                    index_seen = True
+                if f"USE TEMP B-TREE FOR {purpose}" in detail and not index_seen:
+                    self.issues.append({"type": issue_type, "message": f"{message}: '{row['detail']}'"})
+        for pattern in re.findall(r"LIKE\s+['\"](.*?)['\"]", self.raw_query, flags = re.IGNORECASE):
+            if pattern.startswith('%'):
+                self.issues.append({"type": "LIKE without index", "message": f"LIKE pattern starts with wildcard '{pattern}', index likely not used."})
+        if re.search(r'\bOR\b', self.raw_query, re.IGNORECASE):
+            for row in self.explain_plan:
+                detail = row.get("detail", "").upper()
+                if ("SCAN" in detail) and ("INDEX" not in detail):
+                    self.issues.append({"type": "Inefficient OR Conditions", "message": "OR condition detected that may prevent index usage."})
+                    break
+        where_clause = self.raw_query.split("WHERE")[1] if "WHERE" in self.raw_query else ""
+        func_calls = re.findall(r"\b[A-Z]+\s*\([^)]*\)", where_clause, re.IGNORECASE)
+        if func_calls:
+            self.issues.append({"type": "Functions on Indexed Columns", "message": f"Functions used in WHERE clause may disable index usage: {func_calls}"})
+        if "DISTINCT" in self.raw_query:
+            if not any("INDEX" in row.get("detail", "").upper() or "USING" in row.get("detail", "").upper() for row in self.explain_plan):
+                self.issues.append({"type": "DISTINCT Without Index", "message": "DISTINCT clause is used but no index was detected in the query plan."})
+        return {"issues_detected": self.issues, "total_issues": len(self.issues)}
+
+
+# Builds a flat plan of the given size; unique plans give every step its own table or index name.
+def build_plan(size, unique, seed = 1):
+    generator = random.Random(seed)
+    plan = []
+    for position in range(size):
+        detail = generator.choice(STEPS)
+        if unique:
+            detail = detail.replace("users", f"users_{position}").replace("idx_orders", f"idx_orders_{position}")
+        plan.append({"id" : position + 2, "parent" : 0, "notused" : 0, "detail" : detail})
+    return plan
+
+# Returns the wall seconds of one call of run, averaged over enough calls to fill about 5 ms, so short plans are not lost
+# in timer resolution; cold samples clear the step classification caches before every call.
+def sample(run, calls, cold = False):
+    start = time.perf_counter()
+    for _ in range(calls):
+        if cold:
+            classify_step.cache_clear()
+            clear_dispatch_tables()
+        run()
+    return (time.perf_counter() - start) / calls
+
+# Returns the best per-call seconds of each named runner; the runners take turns within every round, so machine noise hits them alike.
+def measure(runners, plan_size, rounds):
+    calls = max(5000 // plan_size, 5)
+    best = {name : None for name in runners}
+    for _ in range(rounds):
+        for name, (run, cold) in runners.items():
+            elapsed = sample(run, calls, cold)
+            best[name] = elapsed if best[name] is None else min(best[name], elapsed)
+    return best
+
+# Runs the benchmark over several plan sizes, checking both analyzers report the same issues.
+# "engine" derives the query features from the raw query with the regex fallback, as the sequential checks did;
+# "features" is the pipeline's path, handed the parser's features; "cold" clears the classification caches before each run.
+def main(rounds = 20):
+    features = QueryParser(QUERY).get_query_features()
+    print(f"{'plan':<24}{'sequential ms':>15}{'engine ms':>12}{'features ms':>13}{'cold ms':>10}{'engine':>9}{'features':>10}")
+    for size in (10, 1000, 5000, 20000):
+        for unique in (False, True):
+            plan = build_plan(size, unique)
+            expected = [(issue["type"], issue["message"]) for issue in SequentialChecks(plan, raw_query = QUERY).analyze()["issues_detected"]]
+            if [(issue["type"], issue["message"]) for issue in ExplainAnalyzer(plan, raw_query = QUERY).analyze()["issues_detected"]] != expected:
+                raise AssertionError(f"Issue lists differ for the {size}-step plan.")
+            best = measure({
+                "sequential" : (lambda: SequentialChecks(plan, raw_query = QUERY).analyze(), False),
+                "engine" : (lambda: ExplainAnalyzer(plan, raw_query = QUERY).analyze(), False),
+                "features" : (lambda: ExplainAnalyzer(plan, raw_query = QUERY, query_features = features).analyze(), False),
+                "cold" : (lambda: ExplainAnalyzer(plan, raw_query = QUERY).analyze(), True)
+            }, size, rounds)
+            label = f"{size} steps, {'unique' if unique else 'repeated'}"
+            print(f"{label:<24}{best['sequential'] * 1e3:>15.3f}{best['engine'] * 1e3:>12.3f}{best['features'] * 1e3:>13.3f}{best['cold'] * 1e3:>10.3f}"
+                  f"{best['sequential'] / best['engine']:>8.2f}x{best['sequential'] / best['features']:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -4,75 +4,173 @@
 
 # Resource importing and management. 
 from flask import Flask, render_template, request, jsonify
-from db_connector import DBConnector
-from query_parser import QueryParser
-from suggestions import Suggestions
-from explain_analyzer import ExplainAnalyzer
+from db_connector import CONNECTION_OPTIONS
+from connection_pool import validate_options
+from pipeline import analyze_query, check_rewrite
+from instrumentation import metrics
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import threading
 import config
 import os
 
 app = Flask(__name__)
 
-# Provides analysis of a SQL query given a SQLite DB. 
-def analyze_query(query, db_path):
-    db = DBConnector(db_path = db_path)
+# String forms accepted for boolean request flags, besides JSON true and false.
+FLAG_STRINGS = {"true" : True, "false" : False, "1" : True, "0" : False, "yes" : True, "no" : False}
 
-    try:
-        query_results = db.execute_query(query)
-        explain_rows = db.get_explain(query)
-
-        analyzer = ExplainAnalyzer(explain_rows, raw_query = query)
-        analysis_result = analyzer.analyze()
-        issues_detected = analysis_result.get("issues_detected", [])
-
-        parser = QueryParser(query)
-        summary = parser.summarize_query()
-
-        parser = QueryParser(query)
-        summary = parser.summarize_query()
-
-        suggester = Suggestions(issues_detected)
-        suggestions = suggester.generate_suggestions()
-
-        return {
-            "query_summary": summary,
-            "issues": issues_detected,
-            "suggestions": suggestions,
-            "explain_plan": explain_rows,
-            "query_results": query_results
-        }
-
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        db.close()
+# Worker pool shared by batch requests, created on first use from BATCH_CONFIG.
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
 
 # Renders the index.html page.
 @app.route('/')
 def index():
     return render_template('index.html')
 
+# Parses a boolean request flag: a JSON boolean, 0 or 1, or one of FLAG_STRINGS in any case. Returns None for anything else.
+def _parse_flag(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        return FLAG_STRINGS.get(value.strip().lower())
+    return None
+
+# Validates one analysis request, returning its analyze_query arguments or an error message.
+def _parse_analysis_request(data):
+    if not isinstance(data, dict):
+        return None, "Request must be a JSON object."
+    raw_path = str(data.get('db_path') or '').strip()
+    query = str(data.get('query') or '').strip()
+    connection_options = data.get('connection') or {}
+
+    if not raw_path:
+        return None, "Database path is required."
+    db_path = os.path.normpath(raw_path)
+    if not os.path.exists(db_path):
+        return None, f"Database file not found at path: {db_path}"
+    if not query:
+        return None, "SQL query is required."
+    if not isinstance(connection_options, dict) or set(connection_options) - set(CONNECTION_OPTIONS):
+        return None, f"Connection options must be an object with keys: {', '.join(CONNECTION_OPTIONS)}."
+    try:
+        connection_options = validate_options(connection_options)
+    except ValueError as e:
+        return None, str(e)
+    # Clients may shorten the server's time budget but never lift it; a budget of 0 would disable the watchdog.
+    limit_ms = config.QUERY_TIMEOUT["timeout_ms"]
+    timeout_ms = data.get('timeout_ms', limit_ms)
+    if 'timeout_ms' in data and (isinstance(timeout_ms, bool) or not isinstance(timeout_ms, (int, float)) or not timeout_ms > 0):
+        return None, "timeout_ms must be a positive number of milliseconds."
+    if limit_ms:
+        timeout_ms = min(timeout_ms, limit_ms)
+    flags = {}
+    for name, default in (('plan_only', False), ('timings', False), ('profile', config.PROFILING["enabled"])):
+        flags[name] = _parse_flag(data.get(name, default))
+        if flags[name] is None:
+            return None, f"{name} must be true or false."
+
+    return {
+        "query" : query,
+        "db_path" : db_path,
+        "plan_only" : flags['plan_only'],
+        "connection_options" : connection_options,
+        "timings" : flags['timings'],
+        "profile" : flags['profile'],
+        "timeout_ms" : timeout_ms
+    }, None
+
+# Returns the shared batch worker pool, a thread or process pool depending on BATCH_CONFIG.
+def _get_batch_executor():
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            if config.BATCH_CONFIG["executor"] == "process":
+                _batch_executor = ProcessPoolExecutor(max_workers = config.BATCH_CONFIG["max_workers"])
+            else:
+                _batch_executor = ThreadPoolExecutor(max_workers = config.BATCH_CONFIG["max_workers"], thread_name_prefix = "analyze")
+        return _batch_executor
+
+# Runs analyze_query with keyword arguments, so it can be mapped over a worker pool.
+def _run_analysis(params):
+    return analyze_query(**params)
+
+# Runs analyze_query in a worker process, whose metrics never reach this process: the stage timings are always returned,
+# so the parent can record them.
+def _run_analysis_in_process(params):
+    return analyze_query(**dict(params, timings = True))
+
 # API endpoint to analyze the SQL query.
 @app.route('/analyze', methods = ['POST'])
 def analyze():
-    data = request.get_json()
-    raw_path = data.get('db_path', '').strip()
-    query = data.get('query', '').strip()
-
-    db_path = os.path.normpath(raw_path)
+    params, error = _parse_analysis_request(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
 
-    if not db_path:
-        return jsonify({"error": "Database path is required."}), 400
-    if not os.path.exists(db_path):
-        return jsonify({"error": f"Database file not found at path: {db_path}"}), 400
-    if not query:
-        return jsonify({"error": "SQL query is required."}), 400
+    config.DB_CONFIG["db_path"] = params["db_path"]
 
-    config.DB_CONFIG["db_path"] = db_path
+    result = analyze_query(**params)
+    with metrics.timed("serialize"):
+        response = jsonify(result)
+    return response
 
-    result = analyze_query(query, db_path)
+# API endpoint to analyze a list of {db_path, query} items in parallel; results keep the input order.
+# Top-level plan_only, timings, profile, timeout_ms and connection values are defaults that each item may override.
+@app.route('/analyze/batch', methods = ['POST'])
+def analyze_batch():
+    data = request.get_json()
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Batch requests need a non-empty list of items."}), 400
+    if len(items) > config.BATCH_CONFIG["max_items"]:
+        return jsonify({"error": f"Batch requests are limited to {config.BATCH_CONFIG['max_items']} items."}), 400
+
+    defaults = {key : data[key] for key in ('plan_only', 'timings', 'profile', 'timeout_ms', 'connection') if isinstance(data, dict) and key in data}
+    results = [None] * len(items)
+    pending = []
+    for index, item in enumerate(items):
+        params, error = _parse_analysis_request(dict(defaults, **item) if isinstance(item, dict) else item)
+        if error:
+            results[index] = {"index" : index, "status" : "error", "error" : error}
+        else:
+            pending.append((index, params))
+
+    executor = _get_batch_executor()
+    in_process = isinstance(executor, ProcessPoolExecutor)
+    outcomes = executor.map(_run_analysis_in_process if in_process else _run_analysis, [params for _, params in pending])
+    for (index, params), result in zip(pending, outcomes):
+        if in_process:
+            metrics.record_timings(result["timings"] if params["timings"] else result.pop("timings"))
+        if "error" in result:
+            results[index] = {"index" : index, "status" : "error", "error" : result["error"]}
+        else:
+            results[index] = {"index" : index, "status" : "ok", "result" : result}
+
+    failed = sum(1 for entry in results if entry["status"] == "error")
+    with metrics.timed("serialize"):
+        response = jsonify({"results" : results, "total" : len(results), "succeeded" : len(results) - failed, "failed" : failed})
+    return response
+
+# API endpoint checking that a rewritten query returns the same rows as the original, with both run times.
+@app.route('/rewrite/check', methods = ['POST'])
+def rewrite_check():
+    data = request.get_json()
+    params, error = _parse_analysis_request(data)
+    if error:
+        return jsonify({"error": error}), 400
+    rewritten = str(data.get('rewritten') or '').strip()
+    if not rewritten:
+        return jsonify({"error": "Rewritten SQL query is required."}), 400
+
+    result = check_rewrite(params["query"], rewritten, params["db_path"], connection_options = params["connection_options"], timeout_ms = params["timeout_ms"])
     return jsonify(result)
 
+# API endpoint reporting the in-memory latency histograms of each analysis stage.
+@app.route('/metrics', methods = ['GET'])
+def stage_metrics():
+    return jsonify(metrics.snapshot())
+
 
 if __name__ == '__main__':
     app.run(debug = True)
@@ -0,0 +1,141 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# cli.py
+
+# Resource importing and management.
+from pipeline import analyze_query
+from query_fingerprint import fingerprint
+from index_advisor import IndexAdvisor
+from schema_catalog import SchemaCatalog
+from multiprocessing import Pool
+import argparse
+import sqlite3
+import json
+import sys
+import os
+
+# Yields each complete statement of a SQL script, read line by line so large files are never loaded whole.
+def iter_statements(lines):
+    buffer = ""
+    for line in lines:
+        start = 0
+        end = line.find(";")
+        while end != -1:
+            candidate = buffer + line[start:end + 1]
+            if sqlite3.complete_statement(candidate):
+                if fingerprint(candidate):
+                    yield candidate.strip()
+                buffer = ""
+                start = end + 1
+            end = line.find(";", end + 1)
+        buffer += line[start:]
+    if fingerprint(buffer):
+        yield buffer.strip()
+
+# Yields each non-blank line of a newline-delimited query log as one query.
+def iter_log_queries(lines):
+    for line in lines:
+        query = line.strip()
+        if query:
+            yield query
+
+# Yields (source, index, query) for every query in the inputs; ".sql" files are scripts, anything else is a query log.
+def iter_queries(paths, input_format = "auto"):
+    for path in paths:
+        handle = sys.stdin if path == "-" else open(path, encoding = "utf-8")
+        try:
+            is_script = input_format == "sql" or (input_format == "auto" and path.lower().endswith(".sql"))
+            reader = iter_statements(handle) if is_script else iter_log_queries(handle)
+            for index, query in enumerate(reader, start = 1):
+                yield path, index, query
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+# Analyzes one query in a worker and returns its JSON Lines record.
+def analyze_record(task):
+    source, index, query, db_path, plan_only, connection_options = task
+    result = analyze_query(query, db_path, plan_only = plan_only, connection_options = connection_options)
+    record = {"source" : source, "index" : index, "query" : query}
+    if "error" in result:
+        record.update(status = "error", error = result["error"])
+    else:
+        record.update(status = "ok", result = result)
+    return record
+
+# Reads the DB's schema catalog, so the advisor skips access existing indexes already serve.
+def load_catalog(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return SchemaCatalog(conn)
+    finally:
+        conn.close()
+
+# Writes index recommendations as a SQL script, each statement preceded by its estimated benefit.
+def write_recommendations(recommendations, path):
+    with open(path, "w", encoding = "utf-8") as handle:
+        for recommendation in recommendations:
+            handle.write(f"-- benefit {recommendation['benefit']}, serves {recommendation['queries']} query shape(s)\n")
+            handle.write(recommendation["statement"] + "\n")
+    print(f"Wrote {len(recommendations)} index recommendations to {path}.", file = sys.stderr)
+
+# Parses the command-line arguments.
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(description = "Analyze the queries in SQL scripts or query logs against a SQLite database and write JSON Lines.")
+    parser.add_argument("inputs", nargs = "+", help = "SQL scripts or newline-delimited query logs; '-' reads standard input.")
+    parser.add_argument("--db", required = True, help = "Path to the SQLite database the queries run against.")
+    parser.add_argument("--format", choices = ("auto", "sql", "log"), default = "auto", help = "Input format; auto treats .sql files as scripts and everything else as logs.")
+    parser.add_argument("--output", "-o", default = "-", help = "JSON Lines output file; defaults to standard output.")
+    parser.add_argument("--workers", type = int, default = os.cpu_count() or 1, help = "Number of worker processes; 1 analyzes in-process.")
+    parser.add_argument("--chunksize", type = int, default = 16, help = "Queries handed to a worker at a time.")
+    parser.add_argument("--execute", action = "store_true", help = "Execute each query as well as planning it.")
+    parser.add_argument("--read-only", action = "store_true", help = "Open the database read-only.")
+    parser.add_argument("--advise", metavar = "FILE", help = "Write workload-wide CREATE INDEX recommendations to FILE.")
+    return parser.parse_args(argv)
+
+# Runs the bulk analysis and returns the process exit code.
+def main(argv = None):
+    args = parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"Database file not found at path: {args.db}", file = sys.stderr)
+        return 2
+
+    connection_options = {"read_only" : True} if args.read_only else {}
+    tasks = ((source, index, query, args.db, not args.execute, connection_options) for source, index, query in iter_queries(args.inputs, args.format))
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding = "utf-8")
+    advisor = IndexAdvisor(catalog = load_catalog(args.db)) if args.advise else None
+    total = failed = 0
+
+    pool = Pool(processes = args.workers) if args.workers > 1 else None
+
+    try:
+        records = pool.imap(analyze_record, tasks, chunksize = args.chunksize) if pool else map(analyze_record, tasks)
+        for record in records:
+            output.write(json.dumps(record, default = str) + "\n")
+            total += 1
+            failed += record["status"] == "error"
+            if advisor is not None and record["status"] == "ok":
+                advisor.add_query(record["query"])
+        if pool is not None:
+            pool.close()
+    except BaseException:
+        # On an error or Ctrl-C, stop the workers instead of waiting for every queued query.
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.join()
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"Analyzed {total} queries, {failed} failed.", file = sys.stderr)
+    if advisor is not None:
+        write_recommendations(advisor.recommend(), args.advise)
+        if advisor.skipped:
+            print(f"Index advisor skipped {len(advisor.skipped)} query shape(s) it could not parse.", file = sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,11 +3,17 @@
 # config.py 
 
 # DB connection details are stored here. 
+# read_only/immutable open the file through a "mode=ro" URI; mmap_size, cache_size and temp_store set the matching PRAGMAs.
 DB_CONFIG = {
-    "db_path" : "your_database.sqlite3"
+    "db_path" : "your_database.sqlite3",
+    "read_only" : False,
+    "immutable" : False,
+    "mmap_size" : None,
+    "cache_size" : None,
+    "temp_store" : None
 } 
 
-# Optimization thresholds defined here. 
+# Optimization thresholds defined here; each key enables the rule registered under that id in rules.py. 
 OPTIMIZATION_THRESHOLDS = { 
     "full_table_scan" : True,
     "unnecessary_filesort" : True,    
@@ -15,6 +21,110 @@ OPTIMIZATION_THRESHOLDS = {
     "like_without_index": True,          
     "inefficient_or_conditions": True,   
     "functions_on_indexed_columns": True, 
-    "distinct_without_index" : True
-} 
+    "distinct_without_index" : True,
+    "slow_execution" : True,
+    "excessive_vm_steps" : True
+}
+
+# Rule dispatch settings: each set of enabled rules keeps the classification of at most step_cache_size distinct plan-step details.
+RULE_DISPATCH = {
+    "step_cache_size" : 32768
+}
+
+# Parse/summary cache settings.
+QUERY_CACHE = {
+    "max_size" : 1024
+}
+
+# Result fetching limits: rows are fetched batch_size at a time and truncated at max_rows or max_bytes.
+RESULT_LIMITS = {
+    "batch_size" : 500,
+    "max_rows" : 1000,
+    "max_bytes" : 4 * 1024 * 1024
+}
+
+# Connection pool settings: up to max_size idle connections per DB path are kept for idle_timeout seconds,
+# in at most max_pools pools (one per DB path and option set).
+CONNECTION_POOL = {
+    "enabled" : True,
+    "max_size" : 4,
+    "idle_timeout" : 300,
+    "max_pools" : 16
+}
+
+# Batch analysis settings: items run on a "thread" or "process" pool of max_workers; larger batches are rejected.
+BATCH_CONFIG = {
+    "executor" : "thread",
+    "max_workers" : 4,
+    "max_items" : 500
+}
+
+# Index advisor settings: at most max_indexes recommendations of at most max_columns columns each.
+INDEX_ADVISOR = {
+    "max_indexes" : 10,
+    "max_columns" : 4
+}
+
+# Hypothetical index evaluation: candidate indexes are proven on an in-memory schema clone holding up to sample_rows rows per table.
+INDEX_EVALUATION = {
+    "enabled" : True,
+    "sample_rows" : 0
+}
+
+# Analysis result cache: plans, issues and suggestions are kept for ttl seconds, at most max_size entries.
+RESULT_CACHE = {
+    "enabled" : True,
+    "max_size" : 256,
+    "ttl" : 60
+}
+
+# Execution profiling: VM steps are counted every progress_interval instructions and at most max_statements traced statements are kept.
+# Measured issues rank "high" from slow_ms and "low" under fast_ms; steps_per_row flags runs of at least min_vm_steps doing that much work per returned row.
+PROFILING = {
+    "enabled" : False,
+    "progress_interval" : 1000,
+    "max_statements" : 50,
+    "fast_ms" : 10,
+    "slow_ms" : 1000,
+    "steps_per_row" : 10000,
+    "min_vm_steps" : 100000
+}
+
+# Statement time budget: execute_query cancels a run after timeout_ms (0 disables), checking the deadline every check_interval VM instructions.
+QUERY_TIMEOUT = {
+    "timeout_ms" : 10000,
+    "check_interval" : 1000
+}
+
+# Schema catalog cache: tables, indexes and foreign keys are read once per DB file and schema_version, at most max_size catalogs.
+# enabled lets the index-aware rules check the columns they flag against the real indexes.
+SCHEMA_CATALOG = {
+    "enabled" : True,
+    "max_size" : 64
+}
+
+# Statistics-based cost model: each range bound on an index column keeps 1/range_factor of the rows, and an equality lookup
+# on an index without statistics is assumed to match default_equality_rows rows, as SQLite itself assumes.
+COST_MODEL = {
+    "enabled" : True,
+    "range_factor" : 4,
+    "default_equality_rows" : 10
+}
+
+# Statistics sampling for tables without sqlite_stat1 rows: up to sample_rows rows, read in chunks spread evenly over the rowid range,
+# are copied to an in-memory DB and analyzed there, then scaled to the table size; sampling stops after time_budget_ms.
+# Sampled statistics are cached for at most cache_size DB states.
+STATISTICS_SAMPLING = {
+    "enabled" : False,
+    "sample_rows" : 10000,
+    "chunks" : 10,
+    "time_budget_ms" : 2000,
+    "cache_size" : 64
+}
 
+# Query rewriting: OR-to-UNION ALL, LOWER/UPPER-to-COLLATE NOCASE and LIKE-prefix-to-range rewrites are planned and kept only when better.
+# verify_results also runs the original and each rewrite, keeping only rewrites that return the same rows, with both timings.
+QUERY_REWRITE = {
+    "enabled" : True,
+    "verify_results" : False
+}
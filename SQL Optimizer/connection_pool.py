@@ -0,0 +1,242 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# connection_pool.py
+
+# Resource importing and management.
+from config import CONNECTION_POOL
+from collections import OrderedDict
+from pathlib import Path
+import threading
+import sqlite3
+import time
+import re
+import os
+
+# Values accepted by PRAGMA temp_store, and the integer form accepted for mmap_size and cache_size.
+TEMP_STORE_VALUES = {"DEFAULT", "FILE", "MEMORY", "0", "1", "2"}
+INTEGER_PATTERN = re.compile(r"\s*-?\d+\s*")
+
+# Builds the "mode=ro" URI that opens a DB file read-only, optionally flagged immutable.
+def read_only_uri(db_path, immutable = False):
+    return Path(db_path).resolve().as_uri() + "?mode=ro" + ("&immutable=1" if immutable else "")
+
+# Checks connection option values, returning them normalized: read_only and immutable must be booleans, mmap_size and cache_size
+# integers (or integer strings) and temp_store a PRAGMA temp_store value; None leaves an option unset. Raises ValueError otherwise.
+def validate_options(options):
+    validated = {}
+    for name, value in (options or {}).items():
+        if value is None:
+            validated[name] = None
+        elif name in ("read_only", "immutable"):
+            if not isinstance(value, bool):
+                raise ValueError(f"Invalid {name} value: {value!r} (expected true or false)")
+            validated[name] = value
+        elif name in ("mmap_size", "cache_size"):
+            if isinstance(value, bool) or not isinstance(value, (int, str)) or not INTEGER_PATTERN.fullmatch(str(value)):
+                raise ValueError(f"Invalid {name} value: {value!r} (expected an integer)")
+            validated[name] = int(value)
+            if name == "mmap_size" and validated[name] < 0:
+                raise ValueError(f"Invalid mmap_size value: {value!r} (expected a non-negative integer)")
+        elif name == "temp_store":
+            if isinstance(value, bool) or str(value).upper() not in TEMP_STORE_VALUES:
+                raise ValueError(f"Invalid temp_store value: {value!r}")
+            validated[name] = str(value).upper()
+        else:
+            validated[name] = value
+    return validated
+
+# Opens a connection honouring the read_only, immutable, mmap_size, cache_size and temp_store options.
+def open_connection(db_path, options = None):
+    options = validate_options(options)
+    read_only = options.get("read_only")
+    immutable = options.get("immutable")
+
+    if read_only or immutable:
+        conn = sqlite3.connect(read_only_uri(db_path, immutable), uri = True, check_same_thread = False)
+    else:
+        conn = sqlite3.connect(db_path, check_same_thread = False)
+
+    if options.get("mmap_size") is not None:
+        conn.execute(f"PRAGMA mmap_size = {options['mmap_size']}")
+    if options.get("cache_size") is not None:
+        conn.execute(f"PRAGMA cache_size = {options['cache_size']}")
+    if options.get("temp_store") is not None:
+        conn.execute(f"PRAGMA temp_store = {options['temp_store']}")
+    return conn
+
+# Identifies the file behind a DB path so a deleted or replaced file can be detected.
+def _file_identity(db_path):
+    try:
+        stat = os.stat(db_path)
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino)
+
+# Reads PRAGMA schema_version, or None when the connection cannot answer.
+def _schema_version(conn):
+    try:
+        return conn.execute("PRAGMA schema_version").fetchone()[0]
+    except sqlite3.Error:
+        return None
+
+
+# An idle pooled connection together with the bookkeeping used by health checks.
+class PooledConnection:
+
+    # Wraps a sqlite3 connection opened on the file identified by file_id, recording the schema version it was opened at.
+    def __init__(self, conn, file_id):
+        self.conn = conn
+        self.file_id = file_id
+        self.schema_version = _schema_version(conn)
+        self.last_used = time.monotonic()
+
+
+# Thread-safe pool of SQLite connections to a single database path.
+class ConnectionPool:
+
+    # Initializes an empty pool keeping at most max_size idle connections, opened with options, for idle_timeout seconds.
+    def __init__(self, db_path, max_size = 4, idle_timeout = 300, options = None):
+        self.db_path = db_path
+        self.options = dict(options or {})
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.idle = []
+        self.checked_out = {}
+        self.closed = False
+        self.lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    # Checks out a healthy connection, reusing the most recently returned one when possible.
+    def acquire(self):
+        while True:
+            with self.lock:
+                pooled = self.idle.pop() if self.idle else None
+            if pooled is None:
+                break
+            if self._is_healthy(pooled):
+                with self.lock:
+                    self.reused += 1
+                    self.checked_out[id(pooled.conn)] = pooled
+                return pooled.conn
+            self._discard(pooled)
+
+        pooled = PooledConnection(open_connection(self.db_path, self.options), _file_identity(self.db_path))
+        with self.lock:
+            self.created += 1
+            self.checked_out[id(pooled.conn)] = pooled
+        return pooled.conn
+
+    # Returns a connection to the pool, rolling back any open transaction; overflow connections, and any returned to a closed pool, are closed.
+    def release(self, conn):
+        with self.lock:
+            pooled = self.checked_out.pop(id(conn), None)
+        if pooled is None:
+            conn.close()
+            return
+        if self.closed:
+            self._discard(pooled)
+            return
+
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            self._discard(pooled)
+            return
+
+        pooled.last_used = time.monotonic()
+        with self.lock:
+            if len(self.idle) < self.max_size:
+                self.idle.append(pooled)
+                pooled = None
+        if pooled is not None:
+            self._discard(pooled)
+        self.prune()
+
+    # Closes idle connections that have exceeded the idle timeout.
+    def prune(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        with self.lock:
+            expired = [pooled for pooled in self.idle if pooled.last_used < cutoff]
+            self.idle = [pooled for pooled in self.idle if pooled.last_used >= cutoff]
+        for pooled in expired:
+            self._discard(pooled)
+
+    # Closes every idle connection and marks the pool closed, so connections still checked out are closed when released.
+    def close_all(self):
+        with self.lock:
+            self.closed = True
+            idle, self.idle = self.idle, []
+        for pooled in idle:
+            self._discard(pooled)
+
+    # Reports pool size and usage counters.
+    def stats(self):
+        with self.lock:
+            return {
+                "db_path" : self.db_path,
+                "options" : self.options,
+                "idle" : len(self.idle),
+                "checked_out" : len(self.checked_out),
+                "max_size" : self.max_size,
+                "created" : self.created,
+                "reused" : self.reused,
+                "discarded" : self.discarded
+            }
+
+    # A connection is healthy if it has not idled out, its file is unchanged and it still answers with the schema version it was opened at.
+    # A schema change retires the connection, since statements it has cached (EXPLAIN QUERY PLAN included) may describe the old schema.
+    def _is_healthy(self, pooled):
+        if time.monotonic() - pooled.last_used > self.idle_timeout:
+            return False
+        if pooled.file_id != _file_identity(self.db_path):
+            return False
+        schema_version = _schema_version(pooled.conn)
+        return schema_version is not None and schema_version == pooled.schema_version
+
+    # Closes a connection that is leaving the pool.
+    def _discard(self, pooled):
+        with self.lock:
+            self.discarded += 1
+        try:
+            pooled.conn.close()
+        except sqlite3.Error:
+            pass
+
+
+# Registry of pools keyed by normalized DB path and connection options, least recently used first.
+_pools = OrderedDict()
+_pools_lock = threading.Lock()
+
+# Returns the shared pool for a DB path and option set, creating it from CONNECTION_POOL settings on first use.
+# At most CONNECTION_POOL["max_pools"] pools are kept; the least recently used beyond that are closed, so varied options cannot leak connections.
+def get_pool(db_path, options = None):
+    path = os.path.abspath(db_path)
+    options = {name : value for name, value in validate_options(options).items() if value is not None and value is not False}
+    key = (path, tuple(sorted(options.items())))
+    evicted = []
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                path,
+                max_size = CONNECTION_POOL["max_size"],
+                idle_timeout = CONNECTION_POOL["idle_timeout"],
+                options = options
+            )
+            _pools[key] = pool
+        _pools.move_to_end(key)
+        while len(_pools) > CONNECTION_POOL["max_pools"]:
+            evicted.append(_pools.popitem(last = False)[1])
+    for stale in evicted:
+        stale.close_all()
+    return pool
+
+# Closes the idle connections of every pool and forgets them.
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
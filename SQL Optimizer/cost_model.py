@@ -0,0 +1,162 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# cost_model.py
+
+# Resource importing and management.
+from config import COST_MODEL, STATISTICS_SAMPLING
+from plan_tree import PlanTree, SCAN, SEARCH, MULTI_INDEX_OR, CORRELATED_SUBQUERY
+from query_cache import LRUCache
+
+# Constraint operators that pin an index column to one value, and those that bound a range of it.
+EQUALITY_OPERATORS = ("=", "IN", "IS")
+RANGE_OPERATORS = (">", "<", ">=", "<=")
+
+# Estimates the rows each plan step visits from the sqlite_stat1 statistics, and sqlite_stat4 samples when present.
+class CostModel:
+
+    # Initializes the model from rows per table, rows per index key prefix ([rows, rows per first-column key, ...]),
+    # from stat4 the most rows a sampled key prefix matched, and the table each index belongs to.
+    def __init__(self, table_rows = None, index_rows = None, index_max_rows = None, index_tables = None):
+        self.table_rows = {table.lower() : rows for table, rows in (table_rows or {}).items()}
+        self.index_rows = {index.lower() : rows for index, rows in (index_rows or {}).items()}
+        self.index_max_rows = {index.lower() : rows for index, rows in (index_max_rows or {}).items()}
+        self.index_tables = {index.lower() : table.lower() for index, table in (index_tables or {}).items()}
+
+    # Reads sqlite_stat1, and sqlite_stat4 when the DB has one; a DB that was never analyzed yields an empty model.
+    @classmethod
+    def load(cls, conn):
+        stat_tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE name IN ('sqlite_stat1', 'sqlite_stat4')")}
+        table_rows, index_rows, index_max_rows, index_tables = {}, {}, {}, {}
+        if "sqlite_stat1" in stat_tables:
+            for table, index, stat in conn.execute("SELECT tbl, idx, stat FROM sqlite_stat1"):
+                values = cls._integers(stat)
+                if not values:
+                    continue
+                table_rows[table] = max(table_rows.get(table, 0), values[0])
+                if index is not None:
+                    index_rows[index] = values
+                    index_tables[index] = table
+        if "sqlite_stat4" in stat_tables:
+            for index, neq in conn.execute("SELECT idx, neq FROM sqlite_stat4"):
+                counts = cls._integers(neq)
+                current = index_max_rows.setdefault(index, [0] * len(counts))
+                for position, count in enumerate(counts[:len(current)]):
+                    current[position] = max(current[position], count)
+        return cls(table_rows, index_rows, index_max_rows, index_tables)
+
+    # Parses the leading integers of a stat column, ignoring trailing options such as "unordered" or "sz=".
+    @staticmethod
+    def _integers(text):
+        values = []
+        for part in str(text or "").split():
+            if not part.isdigit():
+                break
+            values.append(int(part))
+        return values
+
+    # Whether any statistics were loaded.
+    @property
+    def has_statistics(self):
+        return bool(self.table_rows)
+
+    # Rescales statistics gathered on a sample to the full table sizes: each table's row counts grow by size / sampled rows,
+    # except rows per key of 1, since keys unique in the sample are taken to stay unique.
+    def scale(self, table_sizes):
+        factors = {}
+        for table, size in table_sizes.items():
+            sampled = self.table_rows.get(table.lower())
+            if sampled:
+                factors[table.lower()] = size / sampled
+                self.table_rows[table.lower()] = size
+        for index, values in self.index_rows.items():
+            factor = factors.get(self.index_tables.get(index))
+            if factor:
+                self.index_rows[index] = [round(values[0] * factor)] + [value if value <= 1 else round(value * factor) for value in values[1:]]
+                if index in self.index_max_rows:
+                    self.index_max_rows[index] = [round(value * factor) for value in self.index_max_rows[index]]
+
+    # Adds another model's statistics, which take precedence for the tables and indexes both describe.
+    def merge(self, other):
+        self.table_rows.update(other.table_rows)
+        self.index_rows.update(other.index_rows)
+        self.index_max_rows.update(other.index_max_rows)
+        self.index_tables.update(other.index_tables)
+        return self
+
+    # Estimates every plan step: a list aligned with the plan rows holding {"rows", "loops", "visited"} for table steps
+    # (plus "max_rows" when stat4 sampled a heavier key) and None for the rest. tables maps the aliases in the plan to table names.
+    # A join step runs once per row produced by the table steps before it at the same level, as does a correlated subquery.
+    def estimate(self, explain_plan, tables = None):
+        tree = explain_plan if isinstance(explain_plan, PlanTree) else PlanTree(explain_plan)
+        estimates = {}
+        self._estimate_level(tree.root, 1, tables or {}, estimates)
+        return [estimates.get(id(node)) for node in tree.nodes]
+
+    # Estimates the children of a node run loops times, returning the rows the level produces per loop.
+    # The branches of a MULTI-INDEX OR add up; an automatic index is built once, whatever the loop count.
+    def _estimate_level(self, node, loops, tables, estimates):
+        produced = 1
+        for child in node.children:
+            outer = loops * produced
+            if child.kind in (SCAN, SEARCH):
+                rows, max_rows = self._step_rows(child, tables)
+                if rows is None:
+                    estimates[id(child)] = None
+                    continue
+                if child.automatic:
+                    outer = 1
+                estimate = {"rows" : rows, "loops" : outer, "visited" : rows * outer}
+                if max_rows is not None and max_rows > rows:
+                    estimate["max_rows"] = max_rows
+                estimates[id(child)] = estimate
+                produced *= 1 if child.automatic else max(rows, 1)
+            elif child.kind == MULTI_INDEX_OR:
+                branches = sum(self._estimate_level(branch, outer, tables, estimates) for branch in child.children)
+                produced *= max(branches, 1)
+            else:
+                self._estimate_level(child, outer if child.kind == CORRELATED_SUBQUERY else 1, tables, estimates)
+        return produced
+
+    # Returns (rows per loop, most rows for a sampled key) for a SCAN or SEARCH step; rows is None without statistics for its table.
+    # An automatic index is costed as the full read that builds it.
+    def _step_rows(self, node, tables):
+        table = tables.get((node.table or "").lower(), node.table) or node.table
+        total = self.table_rows.get((table or "").lower())
+        if total is None:
+            return None, None
+        if node.kind == SCAN or node.automatic:
+            return total, None
+
+        equalities = 0
+        for column, operator in node.constraints:
+            if operator not in EQUALITY_OPERATORS:
+                break
+            equalities += 1
+        ranges = sum(1 for column, operator in node.constraints if operator in RANGE_OPERATORS)
+        divisor = COST_MODEL["range_factor"] ** ranges
+
+        if not equalities:
+            return max(total // divisor, 1), None
+        if node.index is None and node.constraint_columns[:1] == ["rowid"]:
+            return 1, None
+
+        # A WITHOUT ROWID table's primary key is analyzed under the table's own name.
+        index = (node.index or table).lower()
+        stats = self.index_rows.get(index)
+        if stats is None or len(stats) < 2:
+            return max(min(total, COST_MODEL["default_equality_rows"]) // divisor, 1), None
+        rows = stats[min(equalities, len(stats) - 1)]
+        sampled = self.index_max_rows.get(index)
+        max_rows = sampled[min(equalities, len(sampled)) - 1] if sampled else None
+        return max(rows // divisor, 1), max_rows
+
+
+# Shared cache of sampled statistics, so a DB is only sampled again once its file or schema changes.
+sample_cache = LRUCache(max_size = STATISTICS_SAMPLING["cache_size"])
+
+# Orders issues by estimated_rows, largest first, since fixing an issue can at most save the rows its step visits.
+# Issues without an estimate keep their order after the estimated ones; without any estimates the order is unchanged.
+def rank_by_savings(issues):
+    if not any(issue.get("estimated_rows") is not None for issue in issues):
+        return list(issues)
+    return sorted(issues, key = lambda issue: (issue.get("estimated_rows") is None, -(issue.get("estimated_rows") or 0)))
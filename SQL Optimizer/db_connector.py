@@ -4,25 +4,169 @@
 
 # Resource importing and management. 
 import sqlite3
-from config import DB_CONFIG
+import time
+import os
+from config import DB_CONFIG, RESULT_LIMITS, CONNECTION_POOL, PROFILING, QUERY_TIMEOUT, STATISTICS_SAMPLING
+from connection_pool import get_pool, open_connection, read_only_uri
+from schema_catalog import catalog_cache
+from cost_model import CostModel, sample_cache
+from result_cache import file_version
+
+# Connection options accepted by DBConnector and DB_CONFIG.
+CONNECTION_OPTIONS = ("read_only", "immutable", "mmap_size", "cache_size", "temp_store")
+
+# Raised when execute_query or stream_query cancels a run at its deadline; carries the rows execute_query fetched before the cancel.
+class QueryTimeoutError(Exception):
+
+    # Initializes the error with the timeout that expired and the partial rows.
+    def __init__(self, timeout_ms, rows):
+        super().__init__(f"Query cancelled after exceeding its {timeout_ms} ms time budget.")
+        self.timeout_ms = timeout_ms
+        self.rows = rows
+
 
 # Initialize the DBConnector class to encapsulatee methods that connect to the SQLite database and perform common operations.
 class DBConnector: 
 
-    # Establishes a connection to the DB using credentials outlined in DB_CONFIG.
-    def __init__(self, db_path = None):
+    # Establishes a connection to the DB using credentials outlined in DB_CONFIG, checking it out of the shared pool when pooling is enabled.
+    # Connection options (read_only, immutable, mmap_size, cache_size, temp_store) default to DB_CONFIG and may be overridden per call.
+    def __init__(self, db_path = None, pooled = None, **options):
+        unknown = set(options) - set(CONNECTION_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown connection options: {', '.join(sorted(unknown))}")
         self.db_path = db_path if db_path else DB_CONFIG["db_path"]
-        self.conn = sqlite3.connect(self.db_path)
+        self.options = {name : options.get(name, DB_CONFIG.get(name)) for name in CONNECTION_OPTIONS}
+        self.pool = get_pool(self.db_path, self.options) if (CONNECTION_POOL["enabled"] if pooled is None else pooled) else None
+        self.conn = self.pool.acquire() if self.pool else open_connection(self.db_path, self.options)
         self.conn.row_factory = sqlite3.Row
         self.cursor = self.conn.cursor()
+        self.truncated = False
+        self.bytes_fetched = 0
+        self.profile = None
+        self.timed_out = False
+
+    # Streams the rows of a query as dicts, fetching batch_size rows at a time on a dedicated cursor.
+    # With timeout_ms, a run still going after that many milliseconds is cancelled with QueryTimeoutError.
+    def stream_query(self, query : str, batch_size = None, timeout_ms = None):
+        batch_size = batch_size or RESULT_LIMITS["batch_size"]
+        hooked = self._install_hooks(False, timeout_ms) if timeout_ms else False
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(query)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+        except sqlite3.OperationalError:
+            if not hooked or not self._past_deadline():
+                raise
+            raise QueryTimeoutError(timeout_ms, [])
+        finally:
+            cursor.close()
+            if hooked:
+                self._remove_hooks(0)
+
+    # Executes a regular SQL query and returns its rows, stopping at the row cap or byte budget from RESULT_LIMITS.
+    # With profile (default PROFILING["enabled"]) the run's wall time, VM steps, rows and traced statements are kept in self.profile.
+    # A run still going after timeout_ms (default QUERY_TIMEOUT["timeout_ms"], 0 for none) is cancelled with QueryTimeoutError.
+    def execute_query(self, query : str, max_rows = None, max_bytes = None, batch_size = None, profile = None, timeout_ms = None):
+        max_rows = max_rows if max_rows is not None else RESULT_LIMITS["max_rows"]
+        max_bytes = max_bytes if max_bytes is not None else RESULT_LIMITS["max_bytes"]
+        profile = PROFILING["enabled"] if profile is None else profile
+        timeout_ms = QUERY_TIMEOUT["timeout_ms"] if timeout_ms is None else timeout_ms
+        results = []
+        total_bytes = 0
+        self.truncated = False
+        self.timed_out = False
+        self.profile = None
+
+        hooked = self._install_hooks(profile, timeout_ms)
+        rows = self.stream_query(query, batch_size = batch_size)
+        try:
+            for row in rows:
+                row_bytes = self._row_size(row)
+                if len(results) >= max_rows or total_bytes + row_bytes > max_bytes:
+                    self.truncated = True
+                    break
+                results.append(row)
+                total_bytes += row_bytes
+        except sqlite3.OperationalError:
+            if not self._past_deadline():
+                raise
+            self.timed_out = self.truncated = True
+        finally:
+            rows.close()
+            self.bytes_fetched = total_bytes
+            if hooked:
+                self._remove_hooks(len(results))
+
+        if self.timed_out:
+            raise QueryTimeoutError(timeout_ms, results)
+        return results
+
+    # Installs one progress handler serving both the profile's VM step count and the timeout deadline, plus the trace callback when profiling.
+    # SQLite calls the handler once every interval VM instructions, so vm_steps is counted in those steps; a true return cancels the run.
+    # A timeout-only install leaves self.profile, the last profiled run's, untouched.
+    def _install_hooks(self, profile, timeout_ms):
+        self._deadline = None
+        self._counters = None
+        if not profile and not timeout_ms:
+            return False
+
+        self._started = time.perf_counter_ns()
+        intervals = []
+        if profile:
+            intervals.append(PROFILING["progress_interval"])
+            self.profile = self._counters = {"wall_ms" : None, "vm_steps" : 0, "rows" : 0, "truncated" : False, "timed_out" : False, "statements" : []}
+        if timeout_ms:
+            intervals.append(QUERY_TIMEOUT["check_interval"])
+            self._deadline = self._started + int(timeout_ms * 1e6)
+        interval = min(intervals)
+        counters = self._counters
+        deadline = self._deadline
+
+        def on_progress():
+            if counters is not None:
+                counters["vm_steps"] += interval
+            return deadline is not None and time.perf_counter_ns() >= deadline
+
+        def trace(statement):
+            if len(counters["statements"]) < PROFILING["max_statements"]:
+                counters["statements"].append(statement)
+
+        self.conn.set_progress_handler(on_progress, interval)
+        if profile:
+            self.conn.set_trace_callback(trace)
+        return True
+
+    # Checks whether the current run's timeout deadline has passed.
+    def _past_deadline(self):
+        return self._deadline is not None and time.perf_counter_ns() >= self._deadline
+
+    # Removes the hooks and completes the run's profile, if it was profiled, with the wall time, rows returned and whether the result was truncated or timed out.
+    def _remove_hooks(self, rows):
+        self.conn.set_progress_handler(None, 0)
+        self.conn.set_trace_callback(None)
+        if self._counters is not None:
+            self._counters["wall_ms"] = round((time.perf_counter_ns() - self._started) / 1e6, 3)
+            self._counters["rows"] = rows
+            self._counters["truncated"] = self.truncated
+            self._counters["timed_out"] = self.timed_out
+            self._counters = None
+
+    # Approximates the in-memory size of a result row from its values.
+    @staticmethod
+    def _row_size(row):
+        size = 0
+        for value in row.values():
+            if isinstance(value, (str, bytes)):
+                size += len(value)
+            elif value is not None:
+                size += 8
+        return size
 
-    
-    # Executes a regular SQL query and returns all rows from the resulting query set. 
-    def execute_query(self, query : str): 
-        self.cursor.execute(query) 
-        rows = self.cursor.fetchall() 
-        return [dict(row) for row in rows]
-        
 
     # Returns SQLite's query plan illuminating how SQLite will execute the given query.
     def get_explain(self, query : str): 
@@ -31,7 +175,147 @@ class DBConnector:
         rows = self.cursor.fetchall()
         return [dict(row) for row in rows]
 
-    # Closes the cursor and the DB connection. 
+    # Returns PRAGMA schema_version, which SQLite bumps on every schema change.
+    def get_schema_version(self):
+        return self.conn.execute("PRAGMA schema_version").fetchone()[0]
+
+    # Returns the DB's SchemaCatalog, loaded once per schema_version and shared through the catalog cache.
+    def get_catalog(self):
+        return catalog_cache.load(self.conn, self.db_path)
+
+    # Returns a CostModel built from the DB's sqlite_stat1 and sqlite_stat4 tables. With sample (default STATISTICS_SAMPLING["enabled"]),
+    # the given tables that have no statistics are covered by sample_statistics instead.
+    def get_cost_model(self, tables = None, sample = None):
+        model = CostModel.load(self.conn)
+        sample = STATISTICS_SAMPLING["enabled"] if sample is None else sample
+        missing = [table for table in dict.fromkeys(tables or []) if table and table.lower() not in model.table_rows]
+        if sample and missing:
+            model.merge(self.sample_statistics(missing))
+        return model
+
+    # Estimates statistics for tables by sampling them into an in-memory DB and running ANALYZE there; the DB file is only read.
+    # Copying stops once time_budget_ms has passed, and ANALYZE then runs on the rows copied so far, at most sample_rows per table.
+    # Complete samples are cached until the file or schema changes.
+    def sample_statistics(self, tables, sample_rows = None, time_budget_ms = None):
+        sample_rows = sample_rows or STATISTICS_SAMPLING["sample_rows"]
+        time_budget_ms = time_budget_ms or STATISTICS_SAMPLING["time_budget_ms"]
+        key = (os.path.realpath(self.db_path), self.get_schema_version(), file_version(self.db_path),
+               tuple(sorted({table.lower() for table in tables})), sample_rows)
+        model = sample_cache.get(key)
+        if model is not None:
+            return model
+
+        # uri = True, so the read-only "file:" URI attached below is honoured even where SQLite is built without SQLITE_USE_URI.
+        sample = sqlite3.connect(":memory:", uri = True, check_same_thread = False)
+        deadline = time.perf_counter_ns() + int(time_budget_ms * 1e6)
+        complete = True
+        try:
+            sample.execute("ATTACH DATABASE ? AS source", (read_only_uri(self.db_path),))
+            sample.set_progress_handler(lambda: time.perf_counter_ns() >= deadline, QUERY_TIMEOUT["check_interval"])
+            sizes = {}
+            for table in tables:
+                try:
+                    size = self._sample_table(sample, table, sample_rows)
+                except sqlite3.Error:
+                    if time.perf_counter_ns() >= deadline:
+                        complete = False
+                        break
+                    continue
+                if size is not None:
+                    sizes[table] = size
+            sample.set_progress_handler(None, 0)
+            sample.execute("ANALYZE main")
+            model = CostModel.load(sample)
+            model.scale(sizes)
+        finally:
+            sample.close()
+
+        if complete:
+            sample_cache.put(key, model)
+        return model
+
+    # Copies a table's schema, indexes and up to sample_rows rows from the attached source into the sample DB, returning its estimated size.
+    # Small tables are copied whole. Larger rowid tables are read in STATISTICS_SAMPLING["chunks"] chunks over evenly spaced rowid ranges,
+    # each an index seek; WITHOUT ROWID tables keep their first rows, a lower bound on their size.
+    # A chunk that returns fewer rows than its share was read whole and counts exactly; a full chunk is scaled by the rowid density
+    # up to its last row, so sparse rowids (deletes, random keys) do not inflate the size to the rowid span.
+    @staticmethod
+    def _sample_table(sample, table, sample_rows):
+        found = sample.execute("SELECT name, sql FROM source.sqlite_master WHERE type = 'table' AND name = ? COLLATE NOCASE", (table,)).fetchone()
+        if found is None or found[0].lower().startswith("sqlite_"):
+            return None
+        name, sql = found
+        quoted = '"' + name.replace('"', '""') + '"'
+        sample.execute(sql)
+        for (index_sql,) in sample.execute("SELECT sql FROM source.sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (name,)).fetchall():
+            sample.execute(index_sql)
+
+        try:
+            low, high = sample.execute(f"SELECT min(rowid), max(rowid) FROM source.{quoted}").fetchone()
+        except sqlite3.OperationalError:
+            low = high = None
+        if low is None or high - low + 1 <= sample_rows:
+            sample.execute(f"INSERT INTO main.{quoted} SELECT * FROM source.{quoted} LIMIT ?", (sample_rows,))
+            return sample.execute(f"SELECT count(*) FROM main.{quoted}").fetchone()[0]
+
+        chunks = STATISTICS_SAMPLING["chunks"]
+        limit = max(sample_rows // chunks, 1)
+        span = high - low + 1
+        size = 0
+        for chunk in range(chunks):
+            start, end = low + span * chunk // chunks, low + span * (chunk + 1) // chunks
+            sample.execute(f"INSERT INTO main.{quoted} SELECT * FROM source.{quoted} WHERE rowid >= ? AND rowid < ? LIMIT ?", (start, end, limit))
+            copied, last = sample.execute(f"SELECT count(*), max(rowid) FROM (SELECT rowid FROM source.{quoted} WHERE rowid >= ? AND rowid < ? LIMIT ?)",
+                                          (start, end, limit)).fetchone()
+            size += copied if copied < limit else copied * (end - start) / (last - start + 1)
+        return round(size)
+
+    # Copies the schema, any sqlite_stat1 statistics and up to sample_rows rows per table into a new in-memory DB.
+    # The source file is attached through a read-only URI, so nothing done on the clone can reach it.
+    def clone_schema(self, sample_rows = 0):
+        clone = sqlite3.connect(":memory:", uri = True, check_same_thread = False)
+        clone.row_factory = sqlite3.Row
+        clone.execute("ATTACH DATABASE ? AS source", (read_only_uri(self.db_path),))
+
+        try:
+            objects = clone.execute(
+                "SELECT type, name, sql FROM source.sqlite_master "
+                "WHERE sql IS NOT NULL AND type IN ('table', 'index', 'view') AND name NOT LIKE 'sqlite_%' "
+                "ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END"
+            ).fetchall()
+            tables = []
+            for row in objects:
+                try:
+                    clone.execute(row["sql"])
+                except sqlite3.Error:
+                    continue
+                if row["type"] == "table":
+                    tables.append(row["name"])
+
+            if sample_rows:
+                for table in tables:
+                    quoted = '"' + table.replace('"', '""') + '"'
+                    try:
+                        clone.execute(f"INSERT INTO main.{quoted} SELECT * FROM source.{quoted} LIMIT ?", (int(sample_rows),))
+                    except sqlite3.Error:
+                        continue
+
+            if clone.execute("SELECT 1 FROM source.sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+                clone.execute("ANALYZE main")
+                clone.execute("DELETE FROM main.sqlite_stat1")
+                clone.execute("INSERT INTO main.sqlite_stat1 SELECT tbl, idx, stat FROM source.sqlite_stat1")
+                clone.execute("ANALYZE main.sqlite_master")
+            clone.commit()
+            clone.execute("DETACH DATABASE source")
+        except Exception:
+            clone.close()
+            raise
+        return clone
+
+    # Closes the cursor and returns the connection to its pool, or closes it when unpooled.
     def close(self): 
         self.cursor.close() 
-        self.conn.close() 
+        if self.pool:
+            self.pool.release(self.conn)
+        else:
+            self.conn.close() 
@@ -0,0 +1,98 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# equivalence_checker.py
+
+# Resource importing and management.
+from db_connector import QueryTimeoutError
+from config import QUERY_TIMEOUT
+import hashlib
+import sqlite3
+import time
+
+# Multisets are summed modulo 2^64, the size of each row hash.
+HASH_MODULUS = 1 << 64
+
+# Returns the 64-bit BLAKE2b hash of a row's values, in column order; repr keeps 1, 1.0, '1' and b'1' apart.
+def row_hash(values):
+    return int.from_bytes(hashlib.blake2b(repr(tuple(values)).encode("utf-8"), digest_size = 8).digest(), "big")
+
+
+# Order-insensitive hash of a multiset of rows: the row count plus the sum of the row hashes modulo 2^64.
+# Adding a row is constant time and memory, and duplicates count, so a rewrite that drops or repeats rows changes the hash.
+class MultisetHash:
+
+    # Initializes the hash of the empty multiset.
+    def __init__(self):
+        self.rows = 0
+        self.total = 0
+
+    # Adds one row's values.
+    def add(self, values):
+        self.rows += 1
+        self.total = (self.total + row_hash(values)) % HASH_MODULUS
+
+    # Returns the hash as a hex string.
+    def hexdigest(self):
+        return f"{self.total:016x}"
+
+    # Two multisets match when both their row counts and their hash sums do.
+    def __eq__(self, other):
+        return isinstance(other, MultisetHash) and (self.rows, self.total) == (other.rows, other.total)
+
+
+# Checks that a rewritten query returns the same multiset of rows as the original, timing both runs.
+class EquivalenceChecker:
+
+    # Initializes the checker for a DBConnector; rows are streamed batch_size at a time, and each run is cancelled with
+    # QueryTimeoutError after timeout_ms (default QUERY_TIMEOUT["timeout_ms"], 0 for none).
+    def __init__(self, db, batch_size = None, timeout_ms = None):
+        self.db = db
+        self.batch_size = batch_size
+        self.timeout_ms = QUERY_TIMEOUT["timeout_ms"] if timeout_ms is None else timeout_ms
+
+    # Streams a query's rows into a MultisetHash, returning it with the column names and the elapsed time.
+    # Only the running hash is kept, so memory stays constant however many rows the query returns.
+    def measure(self, query : str):
+        digest = MultisetHash()
+        columns = None
+        started = time.perf_counter_ns()
+        rows = self.db.stream_query(query, batch_size = self.batch_size, timeout_ms = self.timeout_ms)
+        try:
+            for row in rows:
+                if columns is None:
+                    columns = list(row)
+                digest.add(row.values())
+        finally:
+            rows.close()
+        elapsed_ms = round((time.perf_counter_ns() - started) / 1e6, 3)
+        return digest, {"rows" : digest.rows, "hash" : digest.hexdigest(), "columns" : columns or [], "elapsed_ms" : elapsed_ms}
+
+    # Runs the original query once and each rewrite after it, annotating every rewrite with its "equivalence" report;
+    # returns only the rewrites whose results match. A rewrite that fails or runs out of time is dropped as unverified.
+    def verify(self, query : str, rewrites):
+        original_digest, original_run = self.measure(query)
+        verified = []
+        for rewrite in rewrites:
+            try:
+                rewritten_digest, rewritten_run = self.measure(rewrite["query"])
+            except (sqlite3.Error, QueryTimeoutError):
+                continue
+            if rewritten_digest == original_digest:
+                verified.append(dict(rewrite, equivalence = self._report(original_run, rewritten_run, True)))
+        return verified
+
+    # Runs both queries and reports whether their results match, with each run's rows, hash and time and the rewrite's speedup.
+    def compare(self, original : str, rewritten : str):
+        original_digest, original_run = self.measure(original)
+        rewritten_digest, rewritten_run = self.measure(rewritten)
+        return self._report(original_run, rewritten_run, original_digest == rewritten_digest)
+
+    # Builds the comparison report for two runs; speedup is the original's time over the rewrite's.
+    @staticmethod
+    def _report(original_run, rewritten_run, equivalent):
+        return {
+            "equivalent" : equivalent,
+            "original" : original_run,
+            "rewritten" : rewritten_run,
+            "speedup" : round(original_run["elapsed_ms"] / rewritten_run["elapsed_ms"], 2) if rewritten_run["elapsed_ms"] else None
+        }
@@ -3,128 +3,169 @@
 # explain_analyzer.py
 
 # Resource importing and management
-from config import OPTIMIZATION_THRESHOLDS
+from config import OPTIMIZATION_THRESHOLDS, PROFILING
+from plan_tree import SCAN, OR_BRANCH, MULTI_INDEX_OR
+from rules import RULES, dispatch_table
+from cost_model import rank_by_savings
 import re
 
+# Precompiled raw-query patterns, used when no parser-derived query features are supplied; the raw query is
+# upper-cased on input, so they match case-sensitively.
+LIKE_PATTERN = re.compile(r"LIKE\s+['\"](.*?)['\"]")
+OR_PATTERN = re.compile(r"\bOR\b")
+FUNCTION_PATTERN = re.compile(r"\b[A-Z]+\s*\([^)]*\)")
+
 # Analyzes output from get_explain and flags inefficiencies based on thresholds confined in config.py.
 class ExplainAnalyzer:
 
-    # Initializes the explain output from SQLite as input.
-    def __init__(self, explain_plan, raw_query = ""):
+    # Initializes the explain output from SQLite as input, plus parser-derived query features, a DBConnector profile,
+    # the DB's SchemaCatalog and a CostModel when available; without a catalog the index-aware rules cannot check which columns are indexed.
+    # A caller that already built the plan's PlanTree can pass it as plan_tree, so the cost model does not build it again.
+    def __init__(self, explain_plan, raw_query = "", query_features = None, profile = None, catalog = None, cost_model = None, plan_tree = None):
         self.explain_plan = explain_plan
-        self.raw_query = raw_query.upper() 
+        self.raw_query = raw_query.upper()
+        self.query_features = query_features
+        self.profile = profile
+        self.catalog = catalog
+        self.cost_model = cost_model
+        self.plan_tree = plan_tree
+        self._plan_estimates = None
         self.issues = []
 
-    # Main analysis method that runs all checks based on OPTIMIZATION_THRESHOLDS from config.py
-    def analyze(self):
-        if OPTIMIZATION_THRESHOLDS.get("full_table_scan"):
-            self._check_full_table_scan()
-
-        if OPTIMIZATION_THRESHOLDS.get("unnecessary_filesort"):
-            self._check_unnecessary_filesort() 
-
-        if OPTIMIZATION_THRESHOLDS.get("inefficient GROUP BY"):
-            self._check_inefficient_group_by() 
-
-        if OPTIMIZATION_THRESHOLDS.get("like_without_index"):
-            self._check_like_without_index()
-
-        if OPTIMIZATION_THRESHOLDS.get("inefficient_or_conditions"):
-            self._check_inefficient_or_conditions()
-
-        if OPTIMIZATION_THRESHOLDS.get("functions_on_indexed_columns"):
-            self._check_functions_on_indexed_columns()
+    # The CostModel estimate for each plan row, computed on first use; None without a cost model.
+    @property
+    def plan_estimates(self):
+        if self._plan_estimates is None and self.cost_model is not None:
+            plan = self.plan_tree if self.plan_tree is not None else self.explain_plan
+            self._plan_estimates = self.cost_model.estimate(plan, self._features().get("tables"))
+        return self._plan_estimates
 
-        if OPTIMIZATION_THRESHOLDS.get("distinct_without_index"):
-            self._check_distinct_without_index()
+    # Main analysis method that runs all registered rules enabled in OPTIMIZATION_THRESHOLDS from config.py
+    def analyze(self):
+        self._run_rules([rule.id for rule in RULES if OPTIMIZATION_THRESHOLDS.get(rule.id)])
+        if self.profile and self.profile.get("wall_ms") is not None:
+            self._apply_profile()
+        if self.cost_model is not None:
+            self.issues = rank_by_savings(self.issues)
 
-        return {
+        result = {
             "issues_detected": self.issues,
             "total_issues": len(self.issues)
         }
+        if self.cost_model is not None:
+            result["plan_estimates"] = self.plan_estimates
+        return result
+
+    # Runs the given rules in one pass over the plan, handing each step only to the rules registered for its kind and purpose.
+    # Steps are classified by classify_step through the StepDispatch; a step's query level is its parent id, the root (0) for rows without one.
+    # The rules read the flat rows rather than a PlanTree, which costs several times the whole pass to build; nesting is
+    # tracked through the parent ids instead, with MULTI-INDEX OR branches credited to the level holding them.
+    # With a cost model, each issue carries estimated_rows: the rows its step visits, or the whole plan's for query rules.
+    def _run_rules(self, rule_ids):
+        rules, dispatch, query_rules = dispatch_table(rule_ids)
+        found = [[] for _ in rules]
+
+        state = {"full_scan" : False, "index_used" : False, "indexed_levels" : set(), "or_levels" : {}, "profile" : self.profile, "catalog" : self.catalog}
+        indexed_levels = state["indexed_levels"]
+        estimates = self.plan_estimates
+        for position, row in enumerate(self.explain_plan):
+            detail = row.get("detail") or ""
+            kind, uses_index, purpose, visits = dispatch[detail]
+            if visits:
+                level = row.get("parent", 0)
+                for rule_position, detect, issue in visits:
+                    message = detect(detail, uses_index, purpose, level, state)
+                    if message:
+                        issue = issue(message)
+                        if estimates is not None:
+                            issue["estimated_rows"] = estimates[position]["visited"] if estimates[position] else None
+                        found[rule_position].append(issue)
+            if uses_index:
+                level = row.get("parent", 0)
+                if level not in indexed_levels:
+                    state["index_used"] = True
+                    self._mark_indexed_level(level, state)
+            elif kind == SCAN:
+                state["full_scan"] = True
+            elif kind == OR_BRANCH or kind == MULTI_INDEX_OR:
+                state["or_levels"][row.get("id")] = row.get("parent", 0)
+
+        features = self._features() if query_rules else None
+        total = self._total_estimate(estimates) if query_rules and estimates is not None else None
+        for rule_position, rule in query_rules:
+            messages = rule.detect(features, state)
+            if messages:
+                issues = found[rule_position]
+                issues.extend(map(rule.issue, messages))
+                if estimates is not None:
+                    for issue in issues:
+                        issue["estimated_rows"] = total
+
+        for issues in found:
+            if issues:
+                self.issues.extend(issues)
+
+    # Sums the rows visited over every estimated step, or None when no step could be estimated.
+    @staticmethod
+    def _total_estimate(estimates):
+        visited = [estimate["visited"] for estimate in estimates if estimate]
+        return sum(visited) if visited else None
+
+    # Attaches the measured cost to every issue and ranks it by that cost: "low" under fast_ms, "high" from slow_ms, the rule's severity between.
+    def _apply_profile(self):
+        wall_ms = self.profile["wall_ms"]
+        for issue in self.issues:
+            issue["cost_ms"] = wall_ms
+            issue["vm_steps"] = self.profile["vm_steps"]
+            if wall_ms < PROFILING["fast_ms"]:
+                issue["severity"] = "low"
+            elif wall_ms >= PROFILING["slow_ms"]:
+                issue["severity"] = "high"
+
+    # Records that a query level has used an index; steps under a MULTI-INDEX OR also count for the level holding it.
+    @staticmethod
+    def _mark_indexed_level(level, state):
+        state["indexed_levels"].add(level)
+        while level in state["or_levels"]:
+            level = state["or_levels"][level]
+            state["indexed_levels"].add(level)
+
+    # Returns the query features, derived from the raw query with the precompiled patterns when the parser supplied none.
+    def _features(self):
+        if self.query_features is not None:
+            return self.query_features
+        where_clause = self.raw_query.split("WHERE")[1] if "WHERE" in self.raw_query else ""
+        return {
+            "like_patterns" : [f"'{pattern}'" for pattern in LIKE_PATTERN.findall(self.raw_query)],
+            "where_functions" : FUNCTION_PATTERN.findall(where_clause) if "(" in where_clause else [],
+            "has_or" : OR_PATTERN.search(self.raw_query) is not None,
+            "has_distinct" : "DISTINCT" in self.raw_query
+        }
 
     # Detects if any part of the plan indicates a full table scan
     def _check_full_table_scan(self):
-        for row in self.explain_plan:
-            detail = row.get("detail", "").upper()
-            if "SCAN" in detail and "USING INDEX" not in detail:
-                self.issues.append({
-                    "type": "Full Table Scan",
-                    "message": f"Query performs full table scan: '{row['detail']}'"
-                })
-            
-    # Heuristically detect potential use of filesort.
+        self._run_rules(["full_table_scan"])
+
+    # Heuristically detect potential use of filesort: a temp B-tree for ORDER BY with no index used earlier at the same query level.
     def _check_unnecessary_filesort(self):
-        index_seen = False
-        for row in self.explain_plan:
-            detail = row.get("detail", "").upper()
-            if "USING INDEX" in detail:
-                index_seen = True
-            if "USE TEMP B-TREE FOR ORDER BY" in detail and not index_seen:
-                self.issues.append({
-                    "type": "Unnecessary Filesort",
-                    "message": f"Query may be using an unnecessary filesort: '{row['detail']}'"
-                })
+        self._run_rules(["unnecessary_filesort"])
 
     # Detects inefficient GROUP BY statements that yield temporary B-Trees.
     def _check_inefficient_group_by(self):
-        index_seen = False
-        for row in self.explain_plan:
-            detail = row.get("detail", "").upper()
-            if "USING INDEX" in detail:
-                index_seen = True
-            if "USE TEMP B-TREE FOR GROUP BY" in detail and not index_seen:
-                self.issues.append({
-                    "type": "Inefficient GROUP BY",
-                    "message": f"Query may be using a temporary B-Tree for the GROUP BY Clause: '{row['detail']}'"
-                })
-
-    
+        self._run_rules(["inefficient GROUP BY"])
+
     # Detects inefficiencies surrounding the "LIKE" clause.
     def _check_like_without_index(self):
-        like_patterns = re.findall(r"LIKE\s+['\"](.*?)['\"]", self.raw_query, flags = re.IGNORECASE)
-        for pattern in like_patterns:
-            if pattern.startswith('%'):
-                self.issues.append({
-                    "type": "LIKE without index",
-                    "message": f"LIKE pattern starts with wildcard '{pattern}', index likely not used."
-                })
-
+        self._run_rules(["like_without_index"])
 
     # Checks for inefficiencies pertaining to "OR" conditions.
     def _check_inefficient_or_conditions(self):
-        if re.search(r'\bOR\b', self.raw_query, re.IGNORECASE):
-            for row in self.explain_plan:
-                detail = row.get("detail", "").upper()
-                if ("SCAN" in detail) and ("INDEX" not in detail):
-                    self.issues.append({
-                        "type": "Inefficient OR Conditions",
-                        "message": "OR condition detected that may prevent index usage."
-                    })
-                    break
+        self._run_rules(["inefficient_or_conditions"])
 
     # Checks for function usage in WHERE clauses that disable indexes.
     def _check_functions_on_indexed_columns(self):
-        where_clause = ""
-        if "WHERE" in self.raw_query:
-            where_clause = self.raw_query.split("WHERE")[1]
-        func_calls = re.findall(r"\b[A-Z]+\s*\([^)]*\)", where_clause, re.IGNORECASE)
-        if func_calls:
-            self.issues.append({
-                "type": "Functions on Indexed Columns",
-                "message": f"Functions used in WHERE clause may disable index usage: {func_calls}"
-            })
+        self._run_rules(["functions_on_indexed_columns"])
 
     # Detects if DISTINCT is used without an index, which can lead to inefficient execution
     def _check_distinct_without_index(self):
-        if "DISTINCT" in self.raw_query:
-            index_used = any(
-                "INDEX" in row.get("detail", "").upper() or
-                "USING" in row.get("detail", "").upper()
-                for row in self.explain_plan
-            )
-            if not index_used:
-                self.issues.append({
-                    "type": "DISTINCT Without Index",
-                    "message": "DISTINCT clause is used but no index was detected in the query plan."
-                })
+        self._run_rules(["distinct_without_index"])
@@ -0,0 +1,280 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# index_advisor.py
+
+# Resource importing and management.
+from config import INDEX_ADVISOR
+from query_parser import QueryParser
+from query_fingerprint import normalize_query
+from sqlparse.exceptions import SQLParseError
+import re
+
+# Column reference, optionally qualified by a table or alias, with optional identifier quoting.
+COLUMN_REFERENCE = r"""(?:[`"\[]?(\w+)[`"\]]?\s*\.\s*)?[`"\[]?(\w+)[`"\]]?"""
+
+# A WHERE or ON condition of the form "column operator value".
+CONDITION_PATTERN = re.compile(
+    r"^\s*" + COLUMN_REFERENCE + r"\s*(==|=|<=|>=|<>|!=|<|>|\bNOT\b|\bIN\b|\bIS\b|\bBETWEEN\b)\s*(.*)$",
+    re.IGNORECASE | re.DOTALL
+)
+
+# The right-hand side of a condition when it is itself a column reference (a join predicate).
+COLUMN_VALUE_PATTERN = re.compile(r"^" + COLUMN_REFERENCE + r"$")
+
+# The ON and USING parts of a JOIN clause.
+JOIN_ON_PATTERN = re.compile(r"\bON\b(.*)$", re.IGNORECASE | re.DOTALL)
+JOIN_USING_PATTERN = re.compile(r"\bUSING\s*\(([^)]*)\)", re.IGNORECASE)
+AND_SPLIT_PATTERN = re.compile(r"\s+AND\s+", re.IGNORECASE)
+
+# Operators an index can serve as an equality lookup or as a range scan.
+EQUALITY_OPERATORS = {"=", "==", "IN", "IS"}
+RANGE_OPERATORS = {"<", ">", "<=", ">=", "BETWEEN"}
+
+# Plain identifiers that can be written into DDL unquoted.
+PLAIN_IDENTIFIER = re.compile(r"^[A-Za-z_]\w*$")
+
+
+# The index access one query shape could make on one table: equality columns, then a range or sort.
+class IndexCandidate:
+
+    # Initializes a candidate for table from its equality, range and sort columns.
+    def __init__(self, table, equality, range_column, sort_columns, weight):
+        self.table = table
+        self.equality = equality
+        self.range_column = range_column
+        self.sort_columns = sort_columns
+        self.weight = weight
+
+    # Orders the columns for an index: equality columns first, then the range column, otherwise the sort columns.
+    def columns(self, max_columns):
+        tail = (self.range_column,) if self.range_column else self.sort_columns
+        columns = []
+        for column in self.equality + tail:
+            if column not in columns:
+                columns.append(column)
+        return tuple(columns[:max_columns])
+
+    # Scores how much of this access an index on columns serves: 2 per equality column, 1 for the range or sort.
+    def score(self, columns):
+        matched = 0
+        while matched < len(columns) and columns[matched] in self.equality:
+            matched += 1
+        score = 2 * matched
+        if matched == len(self.equality) and matched < len(columns):
+            rest = columns[matched:]
+            if self.range_column and rest[0] == self.range_column:
+                score += 1
+            elif not self.range_column and self.sort_columns and rest[:len(self.sort_columns)] == self.sort_columns:
+                score += 1
+        return score
+
+
+# Recommends a small set of CREATE INDEX statements that serve a weighted workload of queries.
+class IndexAdvisor:
+
+    # Initializes an empty workload; with a SchemaCatalog, access the DB's existing indexes and rowid aliases already give is not advised again.
+    def __init__(self, max_indexes = None, max_columns = None, catalog = None):
+        self.max_indexes = INDEX_ADVISOR["max_indexes"] if max_indexes is None else max_indexes
+        self.max_columns = INDEX_ADVISOR["max_columns"] if max_columns is None else max_columns
+        self.catalog = catalog
+        self.workload = {}
+        self.skipped = []
+
+    # Adds a query to the workload; queries of the same shape share one parse and accumulate their weights.
+    def add_query(self, query : str, weight = 1):
+        fingerprint = normalize_query(query)[0]
+        if fingerprint in self.workload:
+            self.workload[fingerprint][1] += weight
+        else:
+            self.workload[fingerprint] = [query, weight]
+
+    # Returns the recommended indexes, ranked by estimated weighted benefit, each with its CREATE INDEX statement.
+    # Queries that cannot be parsed are left out and recorded in skipped with their error.
+    def recommend(self):
+        candidates = []
+        self.skipped = []
+        for query, weight in self.workload.values():
+            try:
+                candidates.extend(self._query_candidates(QueryParser(query), weight))
+            except (SQLParseError, IndexError, ValueError) as e:
+                self.skipped.append({"query" : query, "error" : str(e) or type(e).__name__})
+
+        # Order equality columns by workload frequency so shapes that share columns share an index prefix.
+        frequency = {}
+        for candidate in candidates:
+            for column in candidate.equality:
+                key = (candidate.table, column)
+                frequency[key] = frequency.get(key, 0) + candidate.weight
+        for candidate in candidates:
+            candidate.equality = tuple(sorted(candidate.equality, key = lambda column: (-frequency[(candidate.table, column)], column)))
+
+        options = {}
+        for candidate in candidates:
+            columns = candidate.columns(self.max_columns)
+            if columns:
+                options.setdefault((candidate.table, columns), None)
+
+        # Greedily pick the index with the largest marginal benefit until nothing more is gained, starting from what the DB already serves.
+        served = [self._existing_score(candidate) for candidate in candidates]
+        chosen = []
+        while options and (self.max_indexes is None or len(chosen) < self.max_indexes):
+            best = None
+            for table, columns in options:
+                gains = [
+                    max(candidate.score(columns) - served[index], 0) * candidate.weight if candidate.table == table else 0
+                    for index, candidate in enumerate(candidates)
+                ]
+                benefit = sum(gains)
+                if benefit > 0 and (best is None or (benefit, -len(columns)) > (best[0], -len(best[2]))):
+                    best = (benefit, table, columns, gains)
+            if best is None:
+                break
+
+            benefit, table, columns, gains = best
+            del options[(table, columns)]
+            for index, candidate in enumerate(candidates):
+                if gains[index]:
+                    served[index] = candidate.score(columns)
+            chosen.append({
+                "table" : table,
+                "columns" : list(columns),
+                "benefit" : benefit,
+                "queries" : sum(1 for gain in gains if gain),
+                "statement" : self._create_statement(table, columns)
+            })
+        return chosen
+
+    # Collects the candidates of a query and of every nested subquery.
+    def _query_candidates(self, parser, weight):
+        aliases = parser.get_table_aliases()
+        tables = [table for table in parser.get_tables() if table and aliases.get(table.lower()) == table]
+        accesses = {}
+
+        # Only AND-connected predicates can be served together; each OR branch is a separate access.
+        branches = [[]]
+        for condition in parser.get_conditions():
+            if condition == "OR":
+                branches.append([])
+            elif condition != "AND":
+                branches[-1].append(condition)
+
+        for join in parser.get_joins():
+            using = JOIN_USING_PATTERN.search(join)
+            joined = self._joined_table(join, aliases)
+            if using and joined:
+                for column in using.group(1).split(","):
+                    self._access(accesses, joined, 0)["equality"].append(column.strip().strip('`"[]'))
+            on = JOIN_ON_PATTERN.search(join)
+            if on:
+                for condition in AND_SPLIT_PATTERN.split(on.group(1)):
+                    self._add_condition(accesses, 0, condition, aliases, tables, inner = joined)
+
+        for branch_index, branch in enumerate(branches):
+            for condition in branch:
+                self._add_condition(accesses, branch_index, condition, aliases, tables)
+
+        # A sort can only be read from an index when all ORDER BY (or GROUP BY) columns come from one table.
+        sort_columns = [entry.rsplit(" ", 1)[0] for entry in parser.get_order_by()] or parser.get_group_by()
+        sort = self._resolve_columns(sort_columns, aliases, tables)
+        if sort and len(branches) == 1:
+            self._access(accesses, sort[0], 0)["sort"] = sort[1]
+
+        candidates = []
+        for (table, _), access in accesses.items():
+            equality = tuple(dict.fromkeys(access["equality"]))
+            range_column = next((column for column in access["range"] if column not in equality), None)
+            sort_columns = access["sort"] or ()
+            if equality or range_column or sort_columns:
+                candidates.append(IndexCandidate(table, equality, range_column, sort_columns, weight))
+
+        for subparser in parser.get_subquery_parsers():
+            candidates.extend(self._query_candidates(subparser, weight))
+        return candidates
+
+    # Returns the access record of a table within one OR branch, creating it when absent.
+    @staticmethod
+    def _access(accesses, table, branch):
+        return accesses.setdefault((table, branch), {"equality" : [], "range" : [], "sort" : ()})
+
+    # Classifies one predicate as an equality or range access on its table. A column-to-column equality is a join predicate
+    # only the inner table's index can serve: the joined table of an ON clause, otherwise the later table in FROM order.
+    def _add_condition(self, accesses, branch, condition, aliases, tables, inner = None):
+        match = CONDITION_PATTERN.match(condition.strip().strip("()"))
+        if not match:
+            return
+        qualifier, column, operator, value = match.groups()
+        operator = operator.upper()
+        table = self._resolve_table(qualifier, aliases, tables)
+
+        if operator in ("=", "=="):
+            other = COLUMN_VALUE_PATTERN.match(value.strip().rstrip(";").strip())
+            if other and other.group(1):
+                other_table = self._resolve_table(other.group(1), aliases, tables)
+                if other_table == table:
+                    return
+                if other_table and self._inner_table(table, other_table, inner, tables) == other_table:
+                    table, column = other_table, other.group(2)
+        if table is None or column.lower() == "rowid":
+            return
+        if operator == "IS" and value.strip().upper().startswith("NOT"):
+            return
+        if operator in EQUALITY_OPERATORS:
+            self._access(accesses, table, branch)["equality"].append(column)
+        elif operator in RANGE_OPERATORS:
+            self._access(accesses, table, branch)["range"].append(column)
+
+    # Picks the inner side of a join predicate between two tables: the given inner table when it is one of them, otherwise the later in FROM order.
+    @staticmethod
+    def _inner_table(table, other_table, inner, tables):
+        if inner is not None and inner in (table, other_table):
+            return inner
+        order = {name : position for position, name in enumerate(tables)}
+        return max((table, other_table), key = lambda name: order.get(name, -1))
+
+    # Scores the access a candidate already gets from the catalog's existing non-partial indexes and its table's INTEGER PRIMARY KEY.
+    def _existing_score(self, candidate):
+        entry = self.catalog.table(candidate.table) if self.catalog else None
+        if entry is None:
+            return 0
+        keys = [(entry["rowid"],)] if entry["rowid"] else []
+        for index in entry["indexes"]:
+            if not index["partial"]:
+                columns = index["columns"]
+                keys.append(tuple(columns[:columns.index(None)] if None in columns else columns))
+        spelling = {column.lower() : column for column in candidate.equality + candidate.sort_columns + (candidate.range_column,) if column}
+        return max((candidate.score(tuple(spelling.get(column.lower(), column) for column in key)) for key in keys), default = 0)
+
+    # Resolves a qualifier to its table, or an unqualified column to the query's only table.
+    @staticmethod
+    def _resolve_table(qualifier, aliases, tables):
+        if qualifier:
+            return aliases.get(qualifier.lower())
+        return tables[0] if len(tables) == 1 else None
+
+    # Resolves ORDER BY / GROUP BY columns to (table, columns) when they all belong to one table.
+    def _resolve_columns(self, references, aliases, tables):
+        table = None
+        columns = []
+        for reference in references:
+            match = COLUMN_VALUE_PATTERN.match(reference.strip())
+            if not match:
+                return None
+            column_table = self._resolve_table(match.group(1), aliases, tables)
+            if column_table is None or (table is not None and column_table != table):
+                return None
+            table = column_table
+            columns.append(match.group(2))
+        return (table, tuple(columns)) if table else None
+
+    # Finds the real table a JOIN clause joins in.
+    @staticmethod
+    def _joined_table(join, aliases):
+        match = re.search(r"\bJOIN\s+[`\"\[]?(\w+)", join, re.IGNORECASE)
+        return aliases.get(match.group(1).lower()) if match else None
+
+    # Builds the CREATE INDEX statement for a recommendation.
+    @staticmethod
+    def _create_statement(table, columns):
+        quote = lambda name: name if PLAIN_IDENTIFIER.match(name) else '"' + name.replace('"', '""') + '"'
+        index_name = "idx_" + "_".join([table] + list(columns)).lower()
+        return f"CREATE INDEX IF NOT EXISTS {quote(index_name)} ON {quote(table)} ({', '.join(quote(column) for column in columns)});"
@@ -0,0 +1,103 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# index_evaluator.py
+
+# Resource importing and management.
+from config import INDEX_EVALUATION
+from index_advisor import IndexAdvisor
+from collections import Counter
+import sqlite3
+import re
+
+# Name of the index a CREATE INDEX statement creates.
+INDEX_NAME_PATTERN = re.compile(r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?("(?:[^"]|"")+"|[^\s(]+)', re.IGNORECASE)
+
+# Issue types a new index can fix, and so are worth measuring.
+EVALUATED_ISSUES = {"Full Table Scan", "Unnecessary Filesort", "Inefficient GROUP BY"}
+
+# A plan step that reads a whole table without any index.
+def is_full_scan(detail):
+    detail = detail.upper()
+    return detail.startswith("SCAN ") and "USING" not in detail and "CONSTANT ROW" not in detail
+
+# A plan step that sorts or groups through a temporary B-tree.
+def is_temp_btree(detail):
+    return "USE TEMP B-TREE" in detail.upper()
+
+# Compares the plans before and after creating an index, listing the full scans and temp B-trees it removed.
+# The index must appear as a whole name, so idx_a is not taken for idx_ab.
+def compare_plans(before, after, index_name):
+    before_details = [row.get("detail", "") for row in before]
+    after_details = [row.get("detail", "") for row in after]
+    scans_removed = Counter(filter(is_full_scan, before_details)) - Counter(filter(is_full_scan, after_details))
+    temp_btrees_removed = Counter(filter(is_temp_btree, before_details)) - Counter(filter(is_temp_btree, after_details))
+    index_pattern = re.compile(rf"\bINDEX {re.escape(index_name)}(?![^\s(])")
+    uses_index = any(index_pattern.search(detail) for detail in after_details)
+    return {
+        "uses_index" : uses_index,
+        "scans_removed" : list(scans_removed.elements()),
+        "temp_btrees_removed" : list(temp_btrees_removed.elements()),
+        "verified" : uses_index and bool(scans_removed or temp_btrees_removed),
+        "plan" : after_details
+    }
+
+
+# Proves candidate indexes on an in-memory clone of the schema by re-running EXPLAIN QUERY PLAN with each one in place.
+class IndexEvaluator:
+
+    # Initializes the evaluator for a DBConnector; the clone is built on first use.
+    def __init__(self, db, sample_rows = None):
+        self.db = db
+        self.sample_rows = INDEX_EVALUATION["sample_rows"] if sample_rows is None else sample_rows
+        self.clone = None
+
+    # Returns the query plan of a query on the clone.
+    def explain(self, query : str):
+        if self.clone is None:
+            self.clone = self.db.clone_schema(sample_rows = self.sample_rows)
+        return [dict(row) for row in self.clone.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()]
+
+    # Measures each CREATE INDEX statement, defaulting to the IndexAdvisor recommendations for the query.
+    def evaluate(self, query : str, statements = None):
+        if statements is None:
+            advisor = IndexAdvisor()
+            advisor.add_query(query)
+            statements = [recommendation["statement"] for recommendation in advisor.recommend()]
+
+        baseline = self.explain(query)
+        candidates = []
+        for statement in statements:
+            candidates.append(self._evaluate_statement(query, statement, baseline))
+        return {"baseline_plan" : [row.get("detail", "") for row in baseline], "candidates" : candidates}
+
+    # Creates one index on the clone, re-plans the query and drops the index again.
+    def _evaluate_statement(self, query, statement, baseline):
+        result = {"statement" : statement, "verified" : False}
+        match = INDEX_NAME_PATTERN.match(statement.strip())
+        if not match:
+            result["error"] = "Not a CREATE INDEX statement."
+            return result
+
+        name = match.group(1)
+        bare_name = name[1:-1].replace('""', '"') if name.startswith('"') else name
+        if self.clone.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (bare_name,)).fetchone():
+            result["error"] = f"Index {bare_name} already exists."
+            return result
+
+        try:
+            self.clone.execute(statement)
+            after = self.explain(query)
+        except sqlite3.Error as e:
+            result["error"] = str(e)
+            return result
+        finally:
+            self.clone.execute(f"DROP INDEX IF EXISTS {name}")
+
+        result.update(compare_plans(baseline, after, bare_name))
+        return result
+
+    # Discards the in-memory clone.
+    def close(self):
+        if self.clone is not None:
+            self.clone.close()
+            self.clone = None
@@ -0,0 +1,136 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# instrumentation.py
+
+# Resource importing and management.
+from contextlib import contextmanager
+import threading
+import bisect
+import time
+
+# Upper bounds, in milliseconds, of the latency histogram buckets; the last bucket is unbounded.
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Fixed-bucket latency histogram with running count, total, min and max.
+class LatencyHistogram:
+
+    # Initializes an empty histogram.
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    # Adds one observation.
+    def record(self, duration_ms):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.min_ms = duration_ms if self.min_ms is None else min(self.min_ms, duration_ms)
+        self.max_ms = duration_ms if self.max_ms is None else max(self.max_ms, duration_ms)
+
+    # Estimates a percentile as the upper bound of the bucket that contains it.
+    def percentile(self, fraction):
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    # Returns the histogram as a JSON-friendly dict.
+    def snapshot(self):
+        labels = [f"<={bound}ms" for bound in BUCKET_BOUNDS_MS] + [f">{BUCKET_BOUNDS_MS[-1]}ms"]
+        return {
+            "count" : self.count,
+            "total_ms" : round(self.total_ms, 3),
+            "mean_ms" : round(self.total_ms / self.count, 3) if self.count else None,
+            "min_ms" : self.min_ms,
+            "max_ms" : self.max_ms,
+            "p50_ms" : self.percentile(0.5),
+            "p95_ms" : self.percentile(0.95),
+            "p99_ms" : self.percentile(0.99),
+            "buckets" : {label : count for label, count in zip(labels, self.counts) if count}
+        }
+
+
+# Records the duration of each stage of a single request, plus optional row and byte counts.
+class StageTimer:
+
+    # Initializes a timer with no stages recorded.
+    def __init__(self):
+        self.stages = {}
+        self.started = time.perf_counter_ns()
+
+    # Times the enclosed block as the named stage; the yielded dict may be given "rows" and "bytes".
+    @contextmanager
+    def stage(self, name):
+        counters = {}
+        start = time.perf_counter_ns()
+        try:
+            yield counters
+        finally:
+            record = {"duration_ms" : (time.perf_counter_ns() - start) / 1e6}
+            record.update(counters)
+            self.stages[name] = record
+
+    # Returns the recorded stages and the total elapsed time in milliseconds.
+    def as_dict(self):
+        timings = {name : dict(record, duration_ms = round(record["duration_ms"], 3)) for name, record in self.stages.items()}
+        timings["total"] = {"duration_ms" : round((time.perf_counter_ns() - self.started) / 1e6, 3)}
+        return timings
+
+
+# Process-wide, thread-safe collection of per-stage latency histograms.
+class MetricsRegistry:
+
+    # Initializes an empty registry.
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    # Adds one duration to the histogram of the named stage.
+    def record(self, name, duration_ms):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.record(duration_ms)
+
+    # Adds every stage of a finished StageTimer, and its total, to the histograms.
+    def record_timer(self, timer):
+        for name, record in timer.stages.items():
+            self.record(name, record["duration_ms"])
+        self.record("total", (time.perf_counter_ns() - timer.started) / 1e6)
+
+    # Adds every stage of a StageTimer.as_dict() block, such as one returned from a worker process, to the histograms.
+    def record_timings(self, timings):
+        for name, record in timings.items():
+            self.record(name, record["duration_ms"])
+
+    # Times the enclosed block directly into the named stage histogram.
+    @contextmanager
+    def timed(self, name):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter_ns() - start) / 1e6)
+
+    # Returns a snapshot of every histogram.
+    def snapshot(self):
+        with self.lock:
+            return {name : histogram.snapshot() for name, histogram in self.histograms.items()}
+
+    # Clears every histogram.
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+
+# Shared registry used by the analyze pipeline.
+metrics = MetricsRegistry()
@@ -0,0 +1,159 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# pipeline.py
+
+# Resource importing and management.
+from db_connector import DBConnector, QueryTimeoutError
+from query_cache import summary_cache
+from suggestions import Suggestions
+from explain_analyzer import ExplainAnalyzer
+from plan_tree import PlanTree
+from index_evaluator import IndexEvaluator, EVALUATED_ISSUES
+from result_cache import result_cache
+from query_rewriter import QueryRewriter, REWRITE_ISSUES
+from equivalence_checker import EquivalenceChecker
+from config import INDEX_EVALUATION, RESULT_CACHE, PROFILING, SCHEMA_CATALOG, COST_MODEL, QUERY_REWRITE
+from instrumentation import StageTimer, metrics
+
+# Provides analysis of a SQL query given a SQLite DB; plan_only skips executing the query itself.
+# connection_options override the DB_CONFIG connection modes (read_only, immutable, mmap_size, cache_size, temp_store).
+# Every stage is timed into the shared latency histograms; timings adds the per-stage block to the response.
+# profile (default PROFILING["enabled"]) measures the execution and feeds the measured cost to the analyzer.
+# timeout_ms (default QUERY_TIMEOUT["timeout_ms"]) bounds the execution; a cancelled run still returns the plan, summary,
+# issues and the rows fetched before the cancel, with timed_out set.
+# The plan, issues and suggestions come from the result cache while the DB file and schema are unchanged; query results never do,
+# and profiled analyses are neither served from nor stored in the cache, since their issues depend on the measurement.
+# With QUERY_REWRITE["verify_results"] an executed analysis also runs each rewrite and keeps only those returning the same rows;
+# these analyses bypass the cache too, and a query that timed out gets no rewrites, as they could not be checked.
+def analyze_query(query, db_path, plan_only = False, connection_options = None, timings = False, profile = None, timeout_ms = None):
+    timer = StageTimer()
+    db = None
+    profile = (PROFILING["enabled"] if profile is None else profile) and not plan_only
+    verify = QUERY_REWRITE["verify_results"] and not plan_only
+
+    try:
+        with timer.stage("connect"):
+            db = DBConnector(db_path = db_path, **(connection_options or {}))
+
+        query_results = []
+        timed_out = False
+        if not plan_only:
+            with timer.stage("execute") as stage:
+                try:
+                    query_results = db.execute_query(query, profile = profile, timeout_ms = timeout_ms)
+                except QueryTimeoutError as e:
+                    query_results = e.rows
+                    timed_out = stage["timed_out"] = True
+                stage["rows"] = len(query_results)
+                stage["bytes"] = db.bytes_fetched
+
+        cache_key = None
+        analysis = None
+        cached = False
+        if RESULT_CACHE["enabled"] and not profile and not verify:
+            with timer.stage("cache") as stage:
+                cache_key = result_cache.key(query, db.db_path, db.get_schema_version())
+                analysis = result_cache.get(cache_key)
+                cached = stage["hit"] = analysis is not None
+
+        if analysis is None:
+            analysis = _analyze_plan(query, db, timer, profile = db.profile, verify = verify and not timed_out, timeout_ms = timeout_ms)
+            if cache_key is not None:
+                result_cache.put(cache_key, analysis)
+
+        result = dict(analysis)
+        result.update({
+            "query_results": query_results,
+            "results_truncated": db.truncated,
+            "plan_only": plan_only,
+            "cached": cached,
+            "timed_out": timed_out
+        })
+        if profile:
+            result["profile"] = db.profile
+
+    except Exception as e:
+        result = {"error": str(e)}
+    finally:
+        if db is not None:
+            db.close()
+        metrics.record_timer(timer)
+
+    if timings:
+        result["timings"] = timer.as_dict()
+    return result
+
+# Explains, parses and analyzes a query and builds its suggestions: everything the result cache holds, but not the query results.
+# verify keeps only the rewrites the EquivalenceChecker finds return the same rows, within timeout_ms per run.
+def _analyze_plan(query, db, timer, profile = None, verify = False, timeout_ms = None):
+    with timer.stage("explain") as stage:
+        explain_rows = db.get_explain(query)
+        stage["rows"] = len(explain_rows)
+
+    with timer.stage("parse"):
+        parsed = summary_cache.lookup(query)
+
+    with timer.stage("analyze"):
+        catalog = db.get_catalog() if SCHEMA_CATALOG["enabled"] else None
+        cost_model = db.get_cost_model(tables = parsed["features"]["tables"].values()) if COST_MODEL["enabled"] else None
+        plan_tree = PlanTree(explain_rows)
+        analyzer = ExplainAnalyzer(explain_rows, raw_query = query, query_features = parsed["features"], profile = profile,
+                                   catalog = catalog, cost_model = cost_model, plan_tree = plan_tree)
+        analysis = analyzer.analyze()
+        issues_detected = analysis.get("issues_detected", [])
+
+    index_candidates = []
+    if INDEX_EVALUATION["enabled"] and any(issue["type"] in EVALUATED_ISSUES for issue in issues_detected):
+        with timer.stage("evaluate"):
+            evaluator = IndexEvaluator(db)
+            try:
+                index_candidates = evaluator.evaluate(query)["candidates"]
+            finally:
+                evaluator.close()
+
+    rewrites = []
+    if QUERY_REWRITE["enabled"] and any(issue["type"] in REWRITE_ISSUES.values() for issue in issues_detected):
+        with timer.stage("rewrite") as stage:
+            rewrites = QueryRewriter(db, cost_model = cost_model).rewrite(query)["rewrites"]
+            stage["rewrites"] = len(rewrites)
+
+    if rewrites and verify:
+        with timer.stage("verify") as stage:
+            try:
+                verified = EquivalenceChecker(db, timeout_ms = timeout_ms).verify(query, rewrites)
+            except QueryTimeoutError:
+                verified = []
+                stage["timed_out"] = True
+            stage["dropped"] = len(rewrites) - len(verified)
+            rewrites = verified
+
+    with timer.stage("suggest"):
+        suggestions = Suggestions(issues_detected, index_candidates = index_candidates, rewrites = rewrites).generate_suggestions()
+
+    return {
+        "query_summary": parsed["summary"],
+        "issues": issues_detected,
+        "suggestions": suggestions,
+        "index_candidates": index_candidates,
+        "rewrites": rewrites,
+        "explain_plan": explain_rows,
+        "plan_tree": plan_tree.to_dict(),
+        "plan_estimates": analysis.get("plan_estimates")
+    }
+
+# Checks that a rewritten query returns the same rows as the original, timing both runs as a before/after benchmark.
+def check_rewrite(query, rewritten, db_path, connection_options = None, timeout_ms = None):
+    timer = StageTimer()
+    db = None
+    try:
+        with timer.stage("connect"):
+            db = DBConnector(db_path = db_path, **(connection_options or {}))
+        with timer.stage("verify"):
+            result = EquivalenceChecker(db, timeout_ms = timeout_ms).compare(query, rewritten)
+    except Exception as e:
+        result = {"error": str(e)}
+    finally:
+        if db is not None:
+            db.close()
+        metrics.record_timer(timer)
+    return result
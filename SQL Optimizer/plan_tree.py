@@ -0,0 +1,189 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# plan_tree.py
+
+# Resource importing and management.
+from functools import lru_cache
+import re
+
+# Node kinds recognized in EXPLAIN QUERY PLAN output.
+ROOT = "ROOT"
+SCAN = "SCAN"
+SEARCH = "SEARCH"
+TEMP_BTREE = "TEMP B-TREE"
+SUBQUERY = "SUBQUERY"
+CORRELATED_SUBQUERY = "CORRELATED SUBQUERY"
+CO_ROUTINE = "CO-ROUTINE"
+MATERIALIZE = "MATERIALIZE"
+MULTI_INDEX_OR = "MULTI-INDEX OR"
+OR_BRANCH = "OR BRANCH"
+COMPOUND = "COMPOUND"
+BLOOM_FILTER = "BLOOM FILTER"
+CONSTANT_ROW = "CONSTANT ROW"
+OTHER = "OTHER"
+
+# Table access steps: "SCAN t", "SEARCH t AS a USING COVERING INDEX i (x=? AND y>?)", "SCAN TABLE t" on older SQLite.
+ACCESS_PATTERN = re.compile(
+    r"^(?P<operation>SCAN|SEARCH)\s+(?:TABLE\s+|SUBQUERY\s+)?(?P<table>\S+)(?:\s+AS\s+(?P<alias>\S+))?"
+    r"(?:\s+USING\s+(?P<using>.*?)|\s+VIRTUAL TABLE INDEX\s+(?P<virtual>.*?))?\s*(?:\((?P<constraints>[^()]*)\))?\s*$",
+    re.IGNORECASE
+)
+INDEX_NAME_PATTERN = re.compile(r"\bINDEX\s+(\S+)", re.IGNORECASE)
+CONSTRAINT_PATTERN = re.compile(r"^\s*(?P<column>[^=<>!\s]+)\s*(?P<operator>=|>=|<=|>|<|\bIN\b|\bIS\b)", re.IGNORECASE)
+CONSTRAINT_SPLIT_PATTERN = re.compile(r"\s+AND\s+", re.IGNORECASE)
+
+# Patterns for the remaining step kinds and their attributes.
+SUBQUERY_PATTERN = re.compile(r"^(?:EXECUTE\s+)?(?P<correlated>CORRELATED\s+)?(?:SCALAR|LIST)\s+SUBQUERY(?:\s+(?P<number>\d+))?", re.IGNORECASE)
+COMPOUND_PATTERN = re.compile(r"^(?:COMPOUND QUERY|LEFT-MOST SUBQUERY|UNION ALL|(?:UNION|INTERSECT|EXCEPT) USING TEMP B-TREE)\s*$", re.IGNORECASE)
+BLOOM_FILTER_PATTERN = re.compile(r"^BLOOM FILTER ON\s+(?P<table>\S+)\s*(?:\((?P<constraints>[^()]*)\))?", re.IGNORECASE)
+OR_BRANCH_PATTERN = re.compile(r"^INDEX\s+\d+\s*$", re.IGNORECASE)
+
+
+# Classifies a plan step from its detail text with plain string tests, returning (kind, uses_index, purpose).
+# This is the one place step kinds are decided, shared by PlanNode and the single-pass ExplainAnalyzer rules;
+# details such as "SCAN users" recur across plans and queries, so results are memoized.
+@lru_cache(maxsize = 16384)
+def classify_step(detail):
+    upper = detail.upper()
+    head, _, rest = upper.partition(" ")
+    if head == "SEARCH":
+        return SEARCH, " USING " in rest or " VIRTUAL TABLE INDEX" in rest, None
+    if head == "SCAN":
+        if rest.startswith("CONSTANT ROW"):
+            return CONSTANT_ROW, False, None
+        return SCAN, " USING " in rest or " VIRTUAL TABLE INDEX" in rest, None
+    if head == "USE" and rest.startswith("TEMP B-TREE FOR "):
+        return TEMP_BTREE, False, " ".join(rest[16:].split())
+    upper = upper.strip()
+    if upper == "MULTI-INDEX OR":
+        return MULTI_INDEX_OR, False, None
+    if OR_BRANCH_PATTERN.match(upper):
+        return OR_BRANCH, False, None
+    if COMPOUND_PATTERN.match(upper):
+        return COMPOUND, False, " ".join(upper.split())
+    if SUBQUERY_PATTERN.match(upper):
+        return (CORRELATED_SUBQUERY if "CORRELATED" in upper else SUBQUERY), False, None
+    if upper.startswith("CO-ROUTINE"):
+        return CO_ROUTINE, False, None
+    if upper.startswith("MATERIALIZE"):
+        return MATERIALIZE, False, None
+    if upper.startswith("BLOOM FILTER ON"):
+        return BLOOM_FILTER, False, None
+    return OTHER, False, None
+
+
+# One step of a query plan, classified by kind and carrying its table, index and constraint columns.
+class PlanNode:
+
+    # Initializes a node from its plan row id, parent id and detail text.
+    def __init__(self, node_id, parent_id, detail):
+        self.id = node_id
+        self.parent_id = parent_id
+        self.detail = detail
+        self.parent = None
+        self.children = []
+        self.kind = OTHER
+        self.table = None
+        self.alias = None
+        self.index = None
+        self.covering = False
+        self.automatic = False
+        self.primary_key = False
+        self.virtual = False
+        self.constraints = []
+        self.purpose = None
+        self.subquery = None
+        self.correlated = False
+        self.uses_index = False
+        self._classify()
+
+    # Sets the kind and attributes of the node from its detail text.
+    def _classify(self):
+        self.kind, self.uses_index, self.purpose = classify_step(self.detail)
+        detail = " ".join(self.detail.split())
+
+        if self.kind in (SCAN, SEARCH):
+            match = ACCESS_PATTERN.match(detail)
+            if match:
+                self.table = match.group("table")
+                self.alias = match.group("alias")
+                using = (match.group("using") or "").upper()
+                self.covering = "COVERING" in using
+                self.automatic = "AUTOMATIC" in using
+                self.primary_key = "PRIMARY KEY" in using
+                self.virtual = match.group("virtual") is not None
+                index = INDEX_NAME_PATTERN.search(match.group("using") or "")
+                if index and not self.automatic:
+                    self.index = index.group(1)
+                self.constraints = self._parse_constraints(match.group("constraints"))
+
+        elif self.kind in (SUBQUERY, CORRELATED_SUBQUERY):
+            match = SUBQUERY_PATTERN.match(detail)
+            self.correlated = self.kind == CORRELATED_SUBQUERY
+            self.subquery = int(match.group("number")) if match and match.group("number") else None
+
+        elif self.kind in (CO_ROUTINE, MATERIALIZE):
+            self.table = detail.split(None, 1)[1] if " " in detail else None
+
+        elif self.kind == BLOOM_FILTER:
+            match = BLOOM_FILTER_PATTERN.match(detail)
+            if match:
+                self.table = match.group("table")
+                self.constraints = self._parse_constraints(match.group("constraints"))
+
+    # Splits "a=? AND b>?" into (column, operator) pairs.
+    @staticmethod
+    def _parse_constraints(text):
+        constraints = []
+        for part in CONSTRAINT_SPLIT_PATTERN.split(text or ""):
+            match = CONSTRAINT_PATTERN.match(part)
+            if match:
+                constraints.append((match.group("column"), match.group("operator").upper()))
+        return constraints
+
+    # The constrained columns, in plan order and without repeats.
+    @property
+    def constraint_columns(self):
+        return list(dict.fromkeys(column for column, _ in self.constraints))
+
+    # Returns the node and its subtree as JSON-friendly dicts.
+    def to_dict(self):
+        return {
+            "id" : self.id,
+            "kind" : self.kind,
+            "detail" : self.detail,
+            "table" : self.table,
+            "index" : self.index,
+            "constraints" : self.constraint_columns,
+            "purpose" : self.purpose,
+            "children" : [child.to_dict() for child in self.children]
+        }
+
+
+# A query plan rebuilt as a tree from the id/parent columns of EXPLAIN QUERY PLAN.
+class PlanTree:
+
+    # Builds the tree from plan rows; rows without id/parent (older output or hand-made plans) hang flat off the root in order.
+    def __init__(self, rows):
+        self.root = PlanNode(0, None, "QUERY PLAN")
+        self.root.kind = ROOT
+        self.nodes = []
+        by_id = {}
+        linked = all("id" in row and "parent" in row for row in rows)
+
+        for position, row in enumerate(rows):
+            node = PlanNode(row["id"] if linked else position + 1, row["parent"] if linked else 0, row.get("detail", "") or "")
+            parent = by_id.get(node.parent_id, self.root) if linked else self.root
+            node.parent = parent
+            parent.children.append(node)
+            self.nodes.append(node)
+            if linked:
+                by_id[node.id] = node
+
+    # Iterates the nodes in plan order.
+    def __iter__(self):
+        return iter(self.nodes)
+
+    # Returns the plan as nested JSON-friendly dicts.
+    def to_dict(self):
+        return [child.to_dict() for child in self.root.children]
@@ -0,0 +1,155 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# query_cache.py
+
+# Resource importing and management.
+from collections import OrderedDict
+from config import QUERY_CACHE
+from query_parser import QueryParser
+from query_fingerprint import normalize_query, LITERAL_PATTERN
+import threading
+import copy
+
+# Thread-safe, bounded least-recently-used cache with hit/miss/eviction counters.
+class LRUCache:
+
+    # Initializes an empty cache holding at most max_size entries.
+    def __init__(self, max_size = 1024):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Returns the cached value for key, or None when absent, and records the lookup.
+    def get(self, key):
+        value = self.peek(key)
+        self.record(value is not None)
+        return value
+
+    # Returns the cached value for key and marks it as recently used, without touching the counters.
+    def peek(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    # Counts a lookup as a hit or a miss.
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    # Stores a value, evicting the least recently used entries beyond max_size.
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last = False)
+                self.evictions += 1
+
+    # Removes every entry and resets the counters.
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    # Reports the current size and counters.
+    def stats(self):
+        with self.lock:
+            return {
+                "size" : len(self.entries),
+                "max_size" : self.max_size,
+                "hits" : self.hits,
+                "misses" : self.misses,
+                "evictions" : self.evictions
+            }
+
+
+# Caches query summaries and analyzer features by shape so repeated queries that differ only in literals skip sqlparse.parse.
+class SummaryCache(LRUCache):
+
+    # Returns the profile ({"summary", "features"}) for a query, re-binding a cached profile of the same shape to this query's literals.
+    # The key is the query's text with its literals taken out, since summaries echo that text, comments and all;
+    # callers get their own copy of the cached profile.
+    def lookup(self, query : str):
+        fingerprint, literals = normalize_query(query, verbatim = True)
+        entry = self.peek(fingerprint)
+
+        if entry is not None:
+            profile, cached_literals, rebindable = entry
+            if literals == cached_literals:
+                self.record(True)
+                return copy.deepcopy(profile)
+            mapping = self._literal_mapping(cached_literals, literals) if rebindable else None
+            if mapping is not None:
+                self.record(True)
+                return self._rebind(profile, mapping)
+
+        self.record(False)
+        parser = QueryParser(query)
+        profile = {"summary" : parser.summarize_query(), "features" : parser.get_query_features()}
+        rebindable = self._is_rebindable(profile, literals) and not LITERAL_PATTERN.search(fingerprint)
+        self.put(fingerprint, (profile, literals, rebindable))
+        return copy.deepcopy(profile)
+
+    # Returns the summary for a query, served from the cache when a query of the same shape was seen.
+    def summarize(self, query : str):
+        return self.lookup(query)["summary"]
+
+    # Pairs old literals with new ones, returning None when a pairing changes literal kind or is ambiguous.
+    @staticmethod
+    def _literal_mapping(old_literals, new_literals):
+        if len(old_literals) != len(new_literals):
+            return None
+        mapping = {}
+        for old, new in zip(old_literals, new_literals):
+            if old.endswith("'") != new.endswith("'") or old.isdigit() != new.isdigit():
+                return None
+            if mapping.setdefault(old, new) != new:
+                return None
+        return mapping
+
+    # Checks that every string in a summary holds whole literals and every integer is written exactly as one of the literals,
+    # so they can be substituted safely. Text left in the key that looks like a literal, such as a number in a comment, also blocks re-binding.
+    @classmethod
+    def _is_rebindable(cls, value, literals):
+        if isinstance(value, str):
+            return value.count("'") % 2 == 0
+        if isinstance(value, bool) or value is None:
+            return True
+        if isinstance(value, int):
+            return str(value) in literals
+        if isinstance(value, dict):
+            return all(cls._is_rebindable(item, literals) for item in value.values())
+        if isinstance(value, (list, tuple)):
+            return all(cls._is_rebindable(item, literals) for item in value)
+        return True
+
+    # Rebuilds a summary with each cached literal replaced by its counterpart from the new query.
+    @classmethod
+    def _rebind(cls, value, mapping):
+        if isinstance(value, str):
+            return LITERAL_PATTERN.sub(lambda match: mapping.get(match.group(), match.group()), value)
+        if isinstance(value, bool) or value is None:
+            return value
+        if isinstance(value, int):
+            return int(mapping.get(str(value), str(value)))
+        if isinstance(value, dict):
+            return {key : cls._rebind(item, mapping) for key, item in value.items()}
+        if isinstance(value, tuple):
+            return tuple(cls._rebind(item, mapping) for item in value)
+        if isinstance(value, list):
+            return [cls._rebind(item, mapping) for item in value]
+        return value
+
+
+# Shared summary cache sized from config.py.
+summary_cache = SummaryCache(max_size = QUERY_CACHE["max_size"])
@@ -0,0 +1,65 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# query_fingerprint.py
+
+# Resource importing and management.
+import hashlib
+import re
+
+# Single precompiled tokenizer covering every token kind that fingerprinting treats specially.
+TOKEN_PATTERN = re.compile(
+    r"(?P<comment>--[^\n]*|/\*.*?(?:\*/|$))"
+    r"|(?P<string>[xX]?'(?:[^']|'')*')"
+    r"|(?P<quoted>\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\])"
+    r"|(?P<number>(?<![\w.])(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)(?![\w.]))"
+    r"|(?P<space>\s+)",
+    re.DOTALL
+)
+
+# Literals as they appear in query text or in fragments of it.
+LITERAL_PATTERN = re.compile(
+    r"[xX]?'(?:[^']|'')*'"
+    r"|(?<![\w.])(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)(?![\w.])"
+)
+
+# IN-lists made up only of placeholders, matched after literals have been replaced.
+IN_LIST_PATTERN = re.compile(r"\bin \( ?\?(?: ?, ?\?)* ?\)", re.IGNORECASE)
+
+# Normalizes a query into its fingerprint and the ordered literals that were stripped from it.
+# verbatim keeps everything but the literals exactly as written, comments and whitespace included, for keys whose cached values echo the query's text.
+def normalize_query(query : str, verbatim = False):
+    fold = str if verbatim else str.lower
+    literals = []
+    parts = []
+    position = 0
+
+    for match in TOKEN_PATTERN.finditer(query):
+        parts.append(fold(query[position:match.start()]))
+        kind = match.lastgroup
+        if kind == "string" or kind == "number":
+            literals.append(match.group())
+            parts.append("?")
+        elif kind == "quoted" or verbatim:
+            parts.append(match.group())
+        else:
+            parts.append(" ")
+        position = match.end()
+
+    parts.append(fold(query[position:]))
+    if verbatim:
+        return "".join(parts), tuple(literals)
+    fingerprint = " ".join("".join(parts).split()).rstrip("; ")
+    fingerprint = IN_LIST_PATTERN.sub(lambda match: match.group()[:2] + " (?)", fingerprint)
+    return fingerprint, tuple(literals)
+
+# Returns the stable fingerprint of a query: literals become "?", IN-lists collapse, comments and extra whitespace go.
+def fingerprint(query : str):
+    return normalize_query(query)[0]
+
+# Returns a short fixed-length digest of the fingerprint, suitable as a compact key.
+def fingerprint_id(query : str):
+    return hashlib.blake2b(fingerprint(query).encode("utf-8"), digest_size = 8).hexdigest()
+
+# Returns the literals of a query in the order they appear.
+def extract_literals(query : str):
+    return normalize_query(query)[1]
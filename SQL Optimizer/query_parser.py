@@ -1,229 +1,366 @@
-# Ryan Gallagher 
-# SQL Query Optimization Tool 
+# Ryan Gallagher
+# SQL Query Optimization Tool
 # query_parser.py
 
-# Resource importing and management. 
-import sqlparse 
-from sqlparse.sql import IdentifierList, Identifier, TokenList
-from sqlparse.tokens import DML, Keyword, Whitespace, Wildcard, Punctuation, Name, Number
-import re 
+# Resource importing and management.
+import sqlparse
+from sqlparse.sql import IdentifierList, Identifier, Parenthesis, Where, Function
+from sqlparse.tokens import DML, Keyword, Whitespace, Wildcard, Punctuation, Name, Comment, String, Comparison
+import re
 
-# Defines the query parser class and its pertainent methods. 
-class QueryParser: 
+# Keywords that introduce a table reference.
+TABLE_KEYWORDS = {
+    "JOIN", "INNER JOIN", "LEFT JOIN", "LEFT OUTER JOIN",
+    "RIGHT JOIN", "RIGHT OUTER JOIN", "FULL JOIN", "FULL OUTER JOIN",
+    "CROSS JOIN", "NATURAL JOIN", "FROM"
+}
 
-    # Constructs a parsed SQL query.
-    def __init__(self, query : str): 
-        self.query = query 
-        self.parsed = sqlparse.parse(query)[0]
-    
-    # Extracts the tables in the SQL query.
-    def get_tables(self):
-        tables = []
-        expecting_table = False
-    
-        join_keywords = {
-            "JOIN", "INNER JOIN", "LEFT JOIN", "LEFT OUTER JOIN",
-            "RIGHT JOIN", "RIGHT OUTER JOIN", "FULL JOIN", "FULL OUTER JOIN",
-            "CROSS JOIN", "NATURAL JOIN", "FROM"
+# Keywords that open a JOIN clause.
+JOIN_KEYWORDS = TABLE_KEYWORDS - {"FROM"}
+
+# Keywords that end the JOIN section of a query.
+JOIN_STOP_KEYWORDS = {"GROUP BY", "HAVING", "ORDER BY", "LIMIT", "OFFSET"}
+
+# Keywords that open a new top-level clause and therefore close the current one.
+CLAUSE_KEYWORDS = {
+    "ORDER BY", "GROUP BY", "HAVING", "LIMIT", "OFFSET", "FETCH", "WINDOW",
+    "UNION", "UNION ALL", "INTERSECT", "EXCEPT", "RETURNING"
+}
+
+# Clauses whose raw text is collected during the single pass.
+TEXT_CLAUSES = ("ORDER BY", "GROUP BY", "HAVING", "LIMIT")
+
+# Precompiled patterns used to format clause text.
+LIMIT_PATTERN = re.compile(r'\s*([^\s;]+(?:\s*,\s*[^\s;]+)?(?:\s+OFFSET\s+[^\s;]+)?)', re.IGNORECASE)
+LIMIT_OFFSET_PATTERN = re.compile(r'(\d+)\s+OFFSET\s+(\d+)', re.IGNORECASE)
+HAVING_SPLIT_PATTERN = re.compile(r'\s+(AND|OR)\s+', re.IGNORECASE)
+
+# Locates a nested SELECT by its character offsets in the outermost query and links it to its parent and children.
+class SubqueryNode:
+
+    # Initializes a node spanning query[start:end], brackets included.
+    def __init__(self, group, query, start, depth, parent = None):
+        self.group = group
+        self.query = query
+        self.start = start
+        self.end = None
+        self.depth = depth
+        self.parent = parent
+        self.children = []
+
+    # Returns the node and its descendants as nested dicts.
+    def to_dict(self):
+        return {
+            "query" : self.query,
+            "start" : self.start,
+            "end" : self.end,
+            "depth" : self.depth,
+            "parent_start" : self.parent.start if self.parent is not None and self.parent.depth > 0 else None,
+            "subqueries" : [child.to_dict() for child in self.children]
         }
-    
-        parsed = self.parsed
+
+# Defines the query parser class and its pertainent methods.
+class QueryParser:
+
+    # Constructs a parsed SQL query, or wraps an already parsed subquery group and its tree node without re-parsing it.
+    def __init__(self, query : str, parsed = None, node = None):
+        self.query = query
+        self.parsed = parsed if parsed is not None else sqlparse.parse(query)[0]
+        self.tokens = self._statement_tokens(self.parsed)
+        self.node = node
+        self._components = None
+        self._features = None
+        self._aliases = None
+
+    # Returns the statement-level tokens, dropping the enclosing brackets of a subquery group.
+    @staticmethod
+    def _statement_tokens(parsed):
         tokens = parsed.tokens
-        i = 0
-    
-        while i < len(tokens):
-            token = tokens[i]
-            
-            if token.ttype is Keyword:
-                max_lookahead = 3
-                combined_keyword = token.value.upper()
-                j = i + 1
-                while j < len(tokens) and max_lookahead > 0:
-                    next_token = tokens[j]
-                    if next_token.ttype is Keyword:
-                        combined_keyword += " " + next_token.value.upper()
-                        j += 1
-                        max_lookahead -= 1
-                    else:
-                        break
-    
-                if combined_keyword in join_keywords:
+        if isinstance(parsed, Parenthesis):
+            end = -1 if tokens and tokens[-1].match(Punctuation, ')') else len(tokens)
+            return tokens[1:end]
+        return tokens
+
+    # Determines whether a parenthesised group holds a SELECT statement.
+    @staticmethod
+    def _is_subquery(group):
+        for token in group.tokens[1:]:
+            if token.is_whitespace:
+                continue
+            return token.ttype is DML and token.value.upper() == "SELECT"
+        return False
+
+    # Walks the whole token tree once, building the subquery tree and collecting the query features ExplainAnalyzer checks.
+    def _walk(self):
+        root = SubqueryNode(self.parsed, self.query, 0, 0)
+        features = {"like_patterns" : [], "where_functions" : [], "function_columns" : [], "has_or" : False, "has_distinct" : False}
+        position = 0
+        after_like = False
+
+        def walk(token, node, in_where, in_function):
+            nonlocal position, after_like
+            if not token.is_group:
+                position += len(token.value)
+                if token.is_whitespace:
+                    return
+                if after_like:
+                    after_like = False
+                    if token.ttype in String.Single or token.ttype in String.Symbol:
+                        features["like_patterns"].append(token.value)
+                if token.ttype is Keyword or token.ttype is Comparison:
+                    value = " ".join(token.value.upper().split())
+                    if value in ("LIKE", "NOT LIKE"):
+                        after_like = True
+                    elif value == "OR":
+                        features["has_or"] = True
+                    elif value == "DISTINCT":
+                        features["has_distinct"] = True
+                return
+
+            if isinstance(token, Parenthesis) and self._is_subquery(token):
+                node = SubqueryNode(token, None, position, node.depth + 1, node)
+                node.parent.children.append(node)
+            in_where = in_where or isinstance(token, Where)
+            if in_where and not in_function and isinstance(token, Function):
+                features["where_functions"].append(str(token))
+                features["function_columns"].append(tuple(self._function_columns(token, [])))
+                in_function = True
+            for child in token.tokens:
+                walk(child, node, in_where, in_function)
+            if node.group is token:
+                node.end = position
+                node.query = self.query[node.start + 1:node.end - 1].strip()
+
+        walk(self.parsed, root, False, False)
+        root.end = position
+        return root, features
+
+    # Returns the subquery tree node for this parser, building the tree on first use.
+    def _subquery_node(self):
+        if self.node is None:
+            self.node, self._features = self._walk()
+        return self.node
+
+    # Collects the (qualifier, column) references among a function's arguments, looking inside nested calls but skipping their names.
+    @classmethod
+    def _function_columns(cls, token, columns):
+        for child in token.tokens:
+            if isinstance(token, Function) and not isinstance(child, Parenthesis):
+                continue
+            if isinstance(child, Identifier) and child.token_first().ttype in Name:
+                columns.append((child.get_parent_name(), child.get_real_name()))
+            elif child.is_group:
+                cls._function_columns(child, columns)
+        return columns
+
+    # Returns the LIKE patterns, WHERE-clause function calls (with the columns each one reads) and OR/DISTINCT usage
+    # found anywhere in the query, plus the table aliases of every query level and the DISTINCT columns.
+    def get_query_features(self):
+        if self._features is None:
+            self._features = self._walk()[1]
+        if "tables" not in self._features:
+            tables = self._all_table_aliases()
+            distinct_columns = tuple(self._extract()["Columns"]) if self._features["has_distinct"] else ()
+            self._features.update({"tables" : tables, "distinct_columns" : distinct_columns})
+        return self._features
+
+    # Maps the table names and aliases of this query and all of its subqueries, outer names taking precedence.
+    def _all_table_aliases(self):
+        aliases = dict(self.get_table_aliases())
+        for subparser in self.get_subquery_parsers():
+            for alias, table in subparser._all_table_aliases().items():
+                aliases.setdefault(alias, table)
+        return aliases
+
+    # Appends a column reference, expanding qualified wildcards such as "u.*".
+    @staticmethod
+    def _add_column(identifier, columns):
+        if isinstance(identifier, Identifier) and identifier.get_real_name() == '*':
+            parent = identifier.get_parent_name()
+            columns.append(f"{parent}.*" if parent else '*')
+        elif identifier.is_group:
+            name = identifier.get_real_name()
+            if name:
+                columns.append(name)
+        elif identifier.ttype in Name or identifier.ttype is Keyword:
+            columns.append(identifier.value)
+
+    # Appends a table reference, recording its alias and name in the alias map.
+    @staticmethod
+    def _add_table(identifier, tables, aliases):
+        name = identifier.get_real_name()
+        tables.append(name)
+        if isinstance(identifier, Identifier) and isinstance(identifier.token_first(), Parenthesis):
+            name = None
+        alias = identifier.get_alias() if isinstance(identifier, Identifier) else None
+        if name is not None:
+            aliases[name.lower()] = name
+        if alias:
+            aliases[alias.lower()] = name
+
+    # Walks the token stream once and extracts every query component together.
+    def _extract(self):
+        if self._components is not None:
+            return self._components
+
+        tables, columns, joins = [], [], []
+        aliases = {}
+        clause_text = {}
+        where = None
+
+        select_seen = False
+        columns_done = False
+        expecting_table = False
+        joins_done = False
+        join_clause = None
+        current_clause = None
+
+        for token in self.tokens:
+            ttype = token.ttype
+            is_keyword = ttype is Keyword
+            keyword = " ".join(token.value.upper().split()) if is_keyword else ""
+
+            # Tables follow FROM and every flavour of JOIN.
+            if is_keyword:
+                if keyword in TABLE_KEYWORDS:
                     expecting_table = True
-                    i = j - 1  
-    
-            elif token.ttype is Keyword and token.value.upper() == "FROM":
-                expecting_table = True
-    
             elif expecting_table:
                 if isinstance(token, Identifier):
-                    tables.append(token.get_real_name())
+                    self._add_table(token, tables, aliases)
                     expecting_table = False
                 elif isinstance(token, IdentifierList):
                     for identifier in token.get_identifiers():
-                        tables.append(identifier.get_real_name())
+                        self._add_table(identifier, tables, aliases)
                     expecting_table = False
-    
-            i += 1
-    
-        return tables
-    
-    # Extracts the column names used in the SQL query. 
-    def get_columns(self):
-        columns = []
-    
-        select_seen = False
-        for token in self.parsed.tokens:
-            if token.ttype is DML and token.value.upper() == 'SELECT':
-                select_seen = True
-                continue
-            if select_seen and token.ttype is Keyword and token.value.upper() == 'FROM':
-                break
-            if select_seen:
-                if isinstance(token, IdentifierList):
-                    for identifier in token.get_identifiers():
-                        if isinstance(identifier, Identifier) and identifier.get_real_name() == '*':
-                            parent = identifier.get_parent_name()
-                            if parent:
-                                columns.append(f"{parent}.*")
-                            else:
-                                columns.append('*')
-                        else:
-                            name = identifier.get_real_name()
-                            if name:
-                                columns.append(name)
-                elif isinstance(token, Identifier):
-                    if token.get_real_name() == '*':
-                        parent = token.get_parent_name()
-                        if parent:
-                            columns.append(f"{parent}.*")
-                        else:
-                            columns.append('*')
+
+            # Columns are read from the SELECT list up to the first FROM.
+            if not columns_done:
+                if ttype is DML and token.value.upper() == "SELECT":
+                    select_seen = True
+                elif select_seen and is_keyword and keyword == "FROM":
+                    columns_done = True
+                elif select_seen:
+                    if isinstance(token, IdentifierList):
+                        for identifier in token.get_identifiers():
+                            self._add_column(identifier, columns)
+                    elif isinstance(token, Identifier):
+                        self._add_column(token, columns)
+                    elif ttype is Wildcard:
+                        columns.append('*')
+
+            # Joins run from their keyword until the next join, WHERE or closing clause.
+            if not joins_done:
+                if join_clause is not None:
+                    ends_join = (is_keyword and (keyword in JOIN_STOP_KEYWORDS or keyword in JOIN_KEYWORDS)) \
+                        or token.value.upper().strip().startswith("WHERE")
+                    if ends_join:
+                        joins.append(join_clause.strip())
+                        join_clause = None
                     else:
-                        name = token.get_real_name()
-                        if name:
-                            columns.append(name)
-                elif token.ttype is Wildcard:
-                    columns.append('*')
-    
-        return columns
-    
-    # Extracts the joins used in the SQL query.
-    def get_joins(self): 
-        joins = []
-        tokens = self.parsed.tokens
-        idx = 0
-    
-        join_keywords = {
-            "JOIN", "INNER JOIN", "LEFT JOIN", "LEFT OUTER JOIN", 
-            "RIGHT JOIN", "RIGHT OUTER JOIN", "FULL JOIN", 
-            "FULL OUTER JOIN", "CROSS JOIN", "NATURAL JOIN"
+                        if not join_clause.endswith(' ') and not token.value.startswith(' '):
+                            join_clause += ' '
+                        join_clause += token.value
+                if join_clause is None and is_keyword:
+                    if keyword in JOIN_STOP_KEYWORDS:
+                        joins_done = True
+                    elif keyword in JOIN_KEYWORDS:
+                        join_clause = token.value.strip()
+
+            # WHERE conditions come from the first top-level WHERE group.
+            if isinstance(token, Where) and where is None:
+                where = token
+
+            # ORDER BY, GROUP BY, HAVING and LIMIT text runs until the next clause boundary.
+            closes_clause = isinstance(token, Where) or token.match(Punctuation, ';') \
+                or (keyword in CLAUSE_KEYWORDS and not (current_clause == "LIMIT" and keyword == "OFFSET"))
+            if closes_clause:
+                current_clause = None
+                if keyword in TEXT_CLAUSES and keyword not in clause_text:
+                    current_clause = keyword
+                    clause_text[keyword] = []
+            elif current_clause is not None and ttype not in Comment:
+                clause_text[current_clause].append(token.value)
+
+        if join_clause is not None:
+            joins.append(join_clause.strip())
+
+        self._aliases = aliases
+        self._components = {
+            "Tables" : tables,
+            "Columns" : columns,
+            "Joins" : [join.rstrip(';').rstrip(',').strip() for join in joins],
+            "Conditions" : self._format_conditions(where),
+            "ORDER BY clauses" : self._format_order_by("".join(clause_text.get("ORDER BY", []))),
+            "GROUP BY clauses" : self._format_group_by("".join(clause_text.get("GROUP BY", []))),
+            "HAVING clauses" : self._format_having("".join(clause_text.get("HAVING", []))),
+            "Limit" : self._format_limit("".join(clause_text.get("LIMIT", []))) if "LIMIT" in clause_text else None,
+            "Subqueries" : self._summarize_subqueries()
         }
-    
-        stop_keywords = {"GROUP BY", "HAVING", "ORDER BY", "LIMIT", "OFFSET", ";"}
-    
-        while idx < len(tokens):
-            token = tokens[idx]
-            token_value_upper = token.value.upper().strip()
-    
-            if token.ttype is Keyword and token_value_upper in stop_keywords:
-                break
-    
-            if token.ttype is Keyword and any(token_value_upper == join or token_value_upper.startswith(join + ' ') for join in join_keywords):
-                join_clause = token.value.strip()
-                next_idx = idx + 1
-    
-                while next_idx < len(tokens):
-                    next_token = tokens[next_idx]
-                    next_token_value_upper = next_token.value.upper().strip()
-    
-                    if (next_token.ttype is Keyword and
-                        (next_token_value_upper in stop_keywords or
-                         any(next_token_value_upper == join or next_token_value_upper.startswith(join + ' ') for join in join_keywords)) or 
-                         next_token_value_upper.startswith("WHERE")):
-                        break
-    
-                    if not join_clause.endswith(' ') and not next_token.value.startswith(' '):
-                        join_clause += ' '
-                    join_clause += next_token.value
-                    next_idx += 1
-    
-                joins.append(join_clause.strip())
-                idx = next_idx
-            else:
-                idx += 1
-    
-        joins = [join.rstrip(';').rstrip(',').strip() for join in joins]
-        return joins
-    
-    # Returns the conditions specified by the WHERE clause.
-    def get_conditions(self):
+        return self._components
+
+    # Summarizes each child subquery from the shared token tree, listing nested subqueries after their parent.
+    def _summarize_subqueries(self):
+        subqueries = []
+        for subparser in self.get_subquery_parsers():
+            summary = subparser.summarize_query()
+            subqueries.append(summary)
+            subqueries.extend(summary["Subqueries"])
+        return subqueries
+
+    # Splits a WHERE group into its conditions and AND/OR connectives.
+    def _format_conditions(self, where):
         conditions = []
-    
-        for token in self.parsed.tokens:
-            if isinstance(token, sqlparse.sql.Where):
-                condition_tokens = token.tokens[2:]  
-                current_condition = ""
+        if where is None:
+            return conditions
+
+        condition_tokens = where.tokens[2:]
+        current_condition = ""
+        skip_next = False
+        inside_between = False
+
+        for i, subtoken in enumerate(condition_tokens):
+            if skip_next:
                 skip_next = False
-                inside_between = False
-                
-                for i, subtoken in enumerate(condition_tokens):
-                    if skip_next:
-                        skip_next = False
-                        continue
-                    if subtoken.ttype is sqlparse.tokens.Whitespace:
-                        current_condition += " "
-                        continue
-    
-                    val = subtoken.value
-    
-                    if val.upper() == "BETWEEN":
-                        inside_between = True
-                        current_condition += "BETWEEN"
-                        continue
-    
-                    if inside_between and val.upper() == "AND":
-                        current_condition += "AND"
-                        continue
-                    if subtoken.ttype is Keyword and val.upper() in ("AND", "OR") and not inside_between:
-                        if current_condition.strip():
-                            conditions.append(current_condition.strip().rstrip(";"))
-                        conditions.append(val.upper())
-                        current_condition = ""
-                    else:
-                        current_condition += val
-                        if inside_between:
-                            next_tok = condition_tokens[i + 1] if i + 1 < len(condition_tokens) else None
-                            if next_tok is None or (
-                                next_tok.ttype is Keyword and next_tok.value.upper() not in ("AND", "OR")
-                            ):
-                                inside_between = False
-    
+                continue
+            if subtoken.ttype is Whitespace:
+                current_condition += " "
+                continue
+
+            val = subtoken.value
+
+            if val.upper() == "BETWEEN":
+                inside_between = True
+                current_condition += "BETWEEN"
+                continue
+
+            if inside_between and val.upper() == "AND":
+                current_condition += "AND"
+                continue
+            if subtoken.ttype is Keyword and val.upper() in ("AND", "OR") and not inside_between:
                 if current_condition.strip():
                     conditions.append(current_condition.strip().rstrip(";"))
-                break
-    
+                conditions.append(val.upper())
+                current_condition = ""
+            else:
+                current_condition += val
+                if inside_between:
+                    next_tok = condition_tokens[i + 1] if i + 1 < len(condition_tokens) else None
+                    if next_tok is None or (
+                        next_tok.ttype is Keyword and next_tok.value.upper() not in ("AND", "OR")
+                    ):
+                        inside_between = False
+
+        if current_condition.strip():
+            conditions.append(current_condition.strip().rstrip(";"))
+
         return conditions
-    
-    
-    # Extracts ORDER BY conditions, which typically denote the presence of a "filesort" operation.  
-    def get_order_by(self):
+
+    # Formats ORDER BY text into "column DIRECTION" entries.
+    @staticmethod
+    def _format_order_by(order_by_clause):
         order_by_columns = []
-        query_upper = self.query.upper()
-        
-        if "ORDER BY" not in query_upper:
-            return []
-    
-        order_by_index = query_upper.find("ORDER BY")
-        order_by_clause = self.query[order_by_index + len("ORDER BY"):]
-    
-        for end_keyword in ["ORDER BY", "LIMIT", "OFFSET", "FETCH", "FOR", "HAVING", ";", "WINDOW", "UNION", "INTERSECT", "EXCEPT", "RETURNING", "WHERE"]:
-            end_index = order_by_clause.upper().find(end_keyword)
-            if end_index != -1:
-                order_by_clause = order_by_clause[:end_index]
-                break
-    
         columns = [col.strip() for col in order_by_clause.strip().split(",")]
-    
+
         for col in columns:
             parts = col.split()
             if len(parts) == 0:
@@ -231,73 +368,38 @@ class QueryParser:
             column_name = parts[0]
             direction = parts[1].upper() if len(parts) > 1 and parts[1].upper() in ("ASC", "DESC") else "ASC"
             order_by_columns.append(f"{column_name} {direction}")
-    
+
         return order_by_columns
-    
 
-    # Extracts GROUP BY columns from the SQL query.
-    def get_group_by(self):
-        group_by_columns = []
-        query_upper = self.query.upper()
-        
-        if "GROUP BY" not in query_upper:
-            return []
-    
-        group_by_index = query_upper.find("GROUP BY")
-        group_by_clause = self.query[group_by_index + len("GROUP BY"):]
-    
-        for end_keyword in ["ORDER BY", "LIMIT", "OFFSET", "FETCH", "FOR", "HAVING", ";","WINDOW", "UNION", "INTERSECT", "EXCEPT", "RETURNING", "WHERE"]:
-            end_index = group_by_clause.upper().find(end_keyword)
-            if end_index != -1:
-                group_by_clause = group_by_clause[:end_index]
-                break
-    
-        group_by_clause = group_by_clause.split('HAVING')[0]
+    # Formats GROUP BY text into its column list.
+    @staticmethod
+    def _format_group_by(group_by_clause):
         columns = [col.strip() for col in group_by_clause.strip().split(",")]
-    
-        for col in columns:
-            if col:
-                group_by_columns.append(col)
-    
-        return group_by_columns
-    
-    # Returns the conditions specified by the HAVING clause.
-    def get_having(self):
+        return [col for col in columns if col]
+
+    # Formats HAVING text into its conditions and AND/OR connectives.
+    @staticmethod
+    def _format_having(having_clause):
         having_conditions = []
-        query_upper = self.query.upper()
-    
-        if "HAVING" not in query_upper:
-            return []
-    
-        having_index = query_upper.find("HAVING")
-        having_clause = self.query[having_index + len("HAVING"):]
-    
-        for end_keyword in ["ORDER BY", "LIMIT", "OFFSET", "FETCH", "FOR", ";"]:
-            end_index = having_clause.upper().find(end_keyword)
-            if end_index != -1:
-                having_clause = having_clause[:end_index]
-                break
-    
-        tokens = re.split(r'\s+(AND|OR)\s+', having_clause, flags=re.IGNORECASE)
-    
-        for token in tokens:
+
+        for token in HAVING_SPLIT_PATTERN.split(having_clause):
             token_strip = token.strip()
             if token_strip.upper() in ("AND", "OR"):
                 having_conditions.append(token_strip.upper())
             elif token_strip:
                 having_conditions.append(token_strip)
-    
+
         return having_conditions
-    
-    # Returns any limit specifications.
-    def get_limit(self):
-        query = re.sub(r'--.*?(\n|$)', ' ', self.query, flags=re.IGNORECASE)
-        match = re.search(r'\bLIMIT\b\s*([^\s;]+(?:\s*,\s*[^\s;]+)?(?:\s+OFFSET\s+[^\s;]+)?)', query, re.IGNORECASE)
+
+    # Formats LIMIT text into a count or an (offset, count) pair.
+    @staticmethod
+    def _format_limit(limit_text):
+        match = LIMIT_PATTERN.match(limit_text)
         if not match:
             return None
         limit_clause = match.group(1).strip()
         limit_clause = limit_clause.strip('()')
-    
+
         if ',' in limit_clause:
             parts = [p.strip() for p in limit_clause.split(',')]
             if len(parts) == 2 and all(p.isdigit() for p in parts):
@@ -305,87 +407,67 @@ class QueryParser:
                 return (offset, count)
             else:
                 return None
-    
-        offset_match = re.match(r'(\d+)\s+OFFSET\s+(\d+)', limit_clause, re.IGNORECASE)
+
+        offset_match = LIMIT_OFFSET_PATTERN.match(limit_clause)
         if offset_match:
             count = int(offset_match.group(1))
             offset = int(offset_match.group(2))
             return (offset, count)
-    
+
         if limit_clause.isdigit():
             return int(limit_clause)
-    
+
         return None
-    
+
+    # Extracts the tables in the SQL query.
+    def get_tables(self):
+        return self._extract()["Tables"]
+
+    # Extracts the column names used in the SQL query.
+    def get_columns(self):
+        return self._extract()["Columns"]
+
+    # Extracts the joins used in the SQL query.
+    def get_joins(self):
+        return self._extract()["Joins"]
+
+    # Returns the conditions specified by the WHERE clause.
+    def get_conditions(self):
+        return self._extract()["Conditions"]
+
+    # Extracts ORDER BY conditions, which typically denote the presence of a "filesort" operation.
+    def get_order_by(self):
+        return self._extract()["ORDER BY clauses"]
+
+    # Extracts GROUP BY columns from the SQL query.
+    def get_group_by(self):
+        return self._extract()["GROUP BY clauses"]
+
+    # Returns the conditions specified by the HAVING clause.
+    def get_having(self):
+        return self._extract()["HAVING clauses"]
+
+    # Returns any limit specifications.
+    def get_limit(self):
+        return self._extract()["Limit"]
+
     # Handles parsing subqueries.
     def get_subqueries(self):
-        subqueries = []
-        query_str = str(self.parsed)
-    
-        def extract_subqueries(sql):
-            subqueries_found = []
-            stack = []
-            start_idx = None
-            length = len(sql)
-    
-            i = 0
-            while i < length:
-                char = sql[i]
-    
-                if char == '(':
-                    if start_idx is None:
-                        j = i + 1
-                        while j < length and sql[j].isspace():
-                            j += 1
-                        if sql[j:j + 6].upper() == 'SELECT':
-                            start_idx = i
-                    stack.append(char)
-    
-                elif char == ')':
-                    if stack:
-                        stack.pop()
-                        if not stack and start_idx is not None:
-                            subquery = sql[start_idx + 1:i]
-                            subqueries_found.append(subquery.strip())
-                            subqueries_found.extend(extract_subqueries(subquery.strip()))
-                            start_idx = None
-                i += 1
-    
-            return subqueries_found
-    
-        raw_subqueries = extract_subqueries(query_str)
-    
-        for raw in raw_subqueries:
-            subparser = QueryParser(raw)
-            subqueries.append(subparser.summarize_query())
-    
-        return subqueries
-    
-       
-    # Returns a summary of the key components of the query.
-    def summarize_query(self): 
-    
-        return { 
-            "Tables" : self.get_tables(), 
-            "Columns" : self.get_columns(), 
-            "Joins" : self.get_joins(), 
-            "Conditions" : self.get_conditions(), 
-            "ORDER BY clauses" : self.get_order_by(), 
-            "GROUP BY clauses" : self.get_group_by(), 
-            "HAVING clauses" : self.get_having(), 
-            "Limit" : self.get_limit(),
-            "Subqueries" : self.get_subqueries()
-        }
-
-        
+        return self._extract()["Subqueries"]
 
-    
-    
+    # Maps each table name and alias in the FROM and JOIN clauses to the real table name (None for derived tables).
+    def get_table_aliases(self):
+        self._extract()
+        return self._aliases
 
+    # Returns parsers for the direct child subqueries, sharing this query's token tree.
+    def get_subquery_parsers(self):
+        return [QueryParser(child.query, parsed = child.group, node = child) for child in self._subquery_node().children]
 
+    # Returns the nested subqueries as a tree carrying each one's offsets within the outermost query.
+    def get_subquery_tree(self):
+        return [child.to_dict() for child in self._subquery_node().children]
 
-    
-        
-        
-            
-        
\ No newline at end of file
+    # Returns a summary of the key components of the query, extracted in a single pass over the tokens.
+    def summarize_query(self):
+        return dict(self._extract())
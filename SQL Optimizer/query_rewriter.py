@@ -0,0 +1,186 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# query_rewriter.py
+
+# Resource importing and management.
+from query_parser import QueryParser
+from index_evaluator import is_temp_btree
+from plan_tree import classify_step, SCAN
+from sqlparse.sql import Where
+from sqlparse.tokens import Keyword, Punctuation, Whitespace, Comment
+import sqlite3
+import re
+
+# A LOWER()/UPPER() call on a bare column compared to a string literal, and a LIKE whose pattern is a literal prefix then '%'.
+CASE_FUNCTION_PATTERN = re.compile(r"^(?P<function>LOWER|UPPER)\s*\(\s*(?P<column>[\w.\"]+)\s*\)\s*=\s*(?P<literal>'(?:[^']|'')*')$", re.IGNORECASE)
+LIKE_PREFIX_PATTERN = re.compile(r"^(?P<column>[\w.\"]+)\s+LIKE\s+'(?P<prefix>[A-Za-z][^'%_]*)%'$", re.IGNORECASE)
+
+# Top-level keywords that keep an OR from being split into UNION ALL branches.
+COMPOUND_KEYWORDS = {"UNION", "UNION ALL", "INTERSECT", "EXCEPT"}
+
+# The issue each rewrite addresses, for Suggestions.
+REWRITE_ISSUES = {
+    "or_to_union" : "Inefficient OR Conditions",
+    "function_to_collate_nocase" : "Functions on Indexed Columns",
+    "like_prefix_to_range" : "Full Table Scan"
+}
+
+# Rewrites LOWER(col) = 'x' (or UPPER with an upper-case literal) as col = 'x' COLLATE NOCASE, which can use a NOCASE index.
+# A literal that LOWER/UPPER could never produce is left alone, since the original condition is then always false.
+def function_to_collate_nocase(condition):
+    match = CASE_FUNCTION_PATTERN.match(condition)
+    if not match:
+        return None
+    literal = match.group("literal")
+    folded = literal.lower() if match.group("function").upper() == "LOWER" else literal.upper()
+    if literal != folded:
+        return None
+    return f"{match.group('column')} = {literal} COLLATE NOCASE"
+
+# Rewrites col LIKE 'abc%' as a range an index can seek, keeping the LIKE as an exact filter: matches of the case-insensitive LIKE
+# all sort between the upper-cased prefix and the lower-cased prefix with its last character incremented.
+def like_prefix_to_range(condition):
+    match = LIKE_PREFIX_PATTERN.match(condition)
+    if not match or not match.group("prefix").isascii() or not match.group("prefix").isprintable():
+        return None
+    column, prefix = match.group("column"), match.group("prefix")
+    lower = prefix.lower()
+    return f"({column} >= '{prefix.upper()}' AND {column} < '{lower[:-1] + chr(ord(lower[-1]) + 1)}' AND {condition})"
+
+# Condition-level rewrites in the order they are applied.
+CONDITION_REWRITES = {
+    "function_to_collate_nocase" : function_to_collate_nocase,
+    "like_prefix_to_range" : like_prefix_to_range
+}
+
+
+# Produces rewritten forms of a query from its QueryParser output and keeps those whose plan is measurably better.
+class QueryRewriter:
+
+    # Initializes the rewriter for a DBConnector, plus a CostModel for comparing estimated rows when one is available.
+    def __init__(self, db, cost_model = None):
+        self.db = db
+        self.cost_model = cost_model
+
+    # Returns the baseline plan measurements and the rewrites that beat them, best first, each with its SQL, measured plan
+    # and the issue types it addresses.
+    def rewrite(self, query : str):
+        baseline = self.measure(query)
+        rewrites = []
+        for name, candidate in self.candidates(query):
+            try:
+                measured = self.measure(candidate)
+            except sqlite3.Error:
+                continue
+            if self._improves(baseline, measured):
+                issue_types = [REWRITE_ISSUES[part] for part in name.split("+")]
+                rewrites.append(dict(measured, rewrite = name, query = candidate, issue_types = issue_types))
+        rewrites.sort(key = lambda rewrite: (rewrite["estimated_rows"] or 0, rewrite["scans"], rewrite["temp_btrees"]))
+        return {"baseline" : baseline, "rewrites" : rewrites}
+
+    # Explains a query and counts its scans (of a table or a whole index) and temp B-trees, plus the rows the cost model estimates it visits.
+    def measure(self, query : str):
+        plan = self.db.get_explain(query)
+        details = [row.get("detail", "") for row in plan]
+        estimated_rows = None
+        if self.cost_model is not None and self.cost_model.has_statistics:
+            features = QueryParser(query).get_query_features()
+            visited = [estimate["visited"] for estimate in self.cost_model.estimate(plan, features["tables"]) if estimate]
+            estimated_rows = sum(visited) if visited else None
+        return {
+            "plan" : details,
+            "scans" : sum(1 for detail in details if classify_step(detail)[0] == SCAN),
+            "temp_btrees" : sum(1 for detail in details if is_temp_btree(detail)),
+            "estimated_rows" : estimated_rows
+        }
+
+    # A rewrite is better when it is estimated to visit fewer rows, or without estimates when it removes a scan
+    # (or a temp B-tree) without adding the other.
+    @staticmethod
+    def _improves(baseline, measured):
+        if baseline["estimated_rows"] is not None and measured["estimated_rows"] is not None:
+            return measured["estimated_rows"] < baseline["estimated_rows"]
+        fewer_scans = measured["scans"] < baseline["scans"] and measured["temp_btrees"] <= baseline["temp_btrees"]
+        fewer_sorts = measured["temp_btrees"] < baseline["temp_btrees"] and measured["scans"] <= baseline["scans"]
+        return fewer_scans or fewer_sorts
+
+    # Yields (rewrite name, SQL) for each applicable rewrite, and for all of them together when more than one applies.
+    def candidates(self, query : str):
+        parser = QueryParser(query)
+        parts = self._split(parser)
+        if parts is None:
+            return
+        prefix, conditions, suffix = parts
+        summary = parser.summarize_query()
+
+        applied = []
+        combined = conditions
+        for name, rewrite_condition in CONDITION_REWRITES.items():
+            rewritten = self._apply(rewrite_condition, conditions)
+            if rewritten != conditions:
+                applied.append(name)
+                combined = self._apply(rewrite_condition, combined)
+                yield name, f"{prefix}WHERE {' '.join(rewritten)}{suffix}"
+
+        if self._splittable(parser, summary, conditions, suffix):
+            applied.append("or_to_union")
+            yield "or_to_union", self._union(prefix, conditions)
+            if len(applied) > 1:
+                yield "+".join(applied), self._union(prefix, combined)
+        elif len(applied) > 1:
+            yield "+".join(applied), f"{prefix}WHERE {' '.join(combined)}{suffix}"
+
+    # Rewrites each condition a rewrite applies to, leaving the others and the AND/OR connectives as they are.
+    @staticmethod
+    def _apply(rewrite_condition, conditions):
+        return [condition if condition in ("AND", "OR") else rewrite_condition(condition) or condition for condition in conditions]
+
+    # Splits a query into the text before its top-level WHERE, the WHERE conditions and connectives, and the text after it.
+    @staticmethod
+    def _split(parser):
+        for position, token in enumerate(parser.tokens):
+            if isinstance(token, Where):
+                conditions = parser.summarize_query()["Conditions"]
+                if not conditions:
+                    return None
+                prefix = "".join(str(part) for part in parser.tokens[:position])
+                suffix = "".join(str(part) for part in parser.tokens[position + 1:]).strip().rstrip(";").strip()
+                return prefix, conditions, (" " + suffix if suffix else "")
+        return None
+
+    # An OR is split only in a plain SELECT whose result does not depend on grouping, ordering, limits or aggregates.
+    @staticmethod
+    def _splittable(parser, summary, conditions, suffix):
+        if "OR" not in conditions or suffix:
+            return False
+        if summary["GROUP BY clauses"] or summary["HAVING clauses"] or summary["ORDER BY clauses"] or summary["Limit"] is not None:
+            return False
+        for token in parser.tokens:
+            if isinstance(token, Where):
+                break
+            if token.ttype is Keyword and " ".join(token.value.upper().split()) in COMPOUND_KEYWORDS:
+                return False
+            if token.ttype not in (Keyword, Punctuation, Whitespace) and token.ttype not in Comment and "(" in str(token):
+                return False
+        return True
+
+    # Builds the UNION ALL form of an OR: branch i keeps the rows matching OR-group i and none of the earlier groups,
+    # so each row is returned once, as before; "IS NOT 1" also keeps rows where an earlier group is NULL.
+    # SELECT DISTINCT queries use UNION instead.
+    @staticmethod
+    def _union(prefix, conditions):
+        groups, current = [], []
+        for condition in conditions:
+            if condition == "OR":
+                groups.append(" ".join(current))
+                current = []
+            else:
+                current.append(condition)
+        groups.append(" ".join(current))
+
+        branches = []
+        for position, group in enumerate(groups):
+            excluded = "".join(f" AND ({earlier}) IS NOT 1" for earlier in groups[:position])
+            branches.append(f"{prefix}WHERE ({group}){excluded}")
+        distinct = QueryParser(prefix).get_query_features()["has_distinct"]
+        return (" UNION " if distinct else " UNION ALL ").join(branch.strip() for branch in branches)
@@ -0,0 +1,75 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# result_cache.py
+
+# Resource importing and management.
+from config import RESULT_CACHE
+from query_cache import LRUCache
+from query_fingerprint import normalize_query
+import hashlib
+import time
+import os
+
+# Returns (mtime_ns, size) of the DB file and of its WAL file, which holds commits not yet checkpointed into the main file.
+def file_version(db_path):
+    version = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+# Caches analysis results for ttl seconds, keyed by query and DB state, evicting the least recently used beyond max_size.
+class ResultCache(LRUCache):
+
+    # Initializes an empty cache whose entries expire ttl seconds after they are stored.
+    def __init__(self, max_size = 256, ttl = 60):
+        super().__init__(max_size = max_size)
+        self.ttl = ttl
+        self.expirations = 0
+
+    # Builds the cache key: the query's text without its literals, a digest of the literals, the DB path, its schema_version and file version.
+    # The literals and the query's text, comments included, are part of the key because the plan, the issue messages and the summary echo them.
+    @staticmethod
+    def key(query : str, db_path, schema_version):
+        fingerprint, literals = normalize_query(query, verbatim = True)
+        digest = hashlib.blake2b(repr(literals).encode("utf-8"), digest_size = 16).hexdigest()
+        return (fingerprint, digest, os.path.realpath(db_path), schema_version, file_version(db_path))
+
+    # Returns the cached value for key unless it has expired, dropping expired entries.
+    def peek(self, key):
+        entry = super().peek(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= time.monotonic():
+            with self.lock:
+                if self.entries.get(key) is entry:
+                    del self.entries[key]
+                    self.expirations += 1
+            return None
+        return value
+
+    # Stores a value with its expiry time.
+    def put(self, key, value):
+        super().put(key, (time.monotonic() + self.ttl, value))
+
+    # Removes every entry and resets the counters.
+    def clear(self):
+        super().clear()
+        with self.lock:
+            self.expirations = 0
+
+    # Reports the current size and counters, including TTL expirations.
+    def stats(self):
+        stats = super().stats()
+        with self.lock:
+            stats.update({"ttl" : self.ttl, "expirations" : self.expirations})
+        return stats
+
+
+# Shared result cache sized from config.py.
+result_cache = ResultCache(max_size = RESULT_CACHE["max_size"], ttl = RESULT_CACHE["ttl"])
@@ -0,0 +1,260 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# rules.py
+
+# Resource importing and management.
+from config import PROFILING, RULE_DISPATCH
+from plan_tree import SCAN, TEMP_BTREE, classify_step
+
+# A detection rule: its OPTIMIZATION_THRESHOLDS key, the issue type and severity it reports, the plan-step kinds it visits
+# (none for query-level rules) and, optionally, the step purposes it is limited to, its detection function and the suggestion template for its issues.
+class Rule:
+
+    # Initializes the rule; plan-step rules detect from (detail, uses_index, purpose, level, state), query rules from (features, state).
+    def __init__(self, rule_id, issue_type, severity, detect, suggestion, kinds = (), purposes = ()):
+        self.id = rule_id
+        self.issue_type = issue_type
+        self.severity = severity
+        self.detect = detect
+        self.suggestion = suggestion
+        self.kinds = tuple(kinds)
+        self.purposes = tuple(purposes)
+        self._template = {"type": issue_type, "message": None, "severity": severity}
+
+    # Checks whether the rule visits a classified plan step.
+    def visits(self, kind, purpose):
+        return kind in self.kinds and (not self.purposes or purpose in self.purposes)
+
+    # Builds an issue of this rule's type, copied from a prebuilt template since plan-step rules may raise one per row.
+    def issue(self, message):
+        issue = self._template.copy()
+        issue["message"] = message
+        return issue
+
+    # Fills the suggestion template from the issue's fields.
+    def suggest(self, issue):
+        return self.suggestion.format(**issue)
+
+
+# Registered rules in reporting order, indexed by id, by issue type and by the plan-step kinds they visit.
+RULES = []
+RULES_BY_ID = {}
+RULES_BY_TYPE = {}
+RULES_BY_KIND = {}
+
+# Dispatch tables built by dispatch_table, keyed by the enabled rule ids; cleared whenever the registry changes.
+_DISPATCH_TABLES = {}
+
+# Adds a rule to the registry; a rule runs only while its id is enabled in OPTIMIZATION_THRESHOLDS.
+def register(rule):
+    if rule.id in RULES_BY_ID:
+        raise ValueError(f"Rule {rule.id} is already registered.")
+    RULES.append(rule)
+    RULES_BY_ID[rule.id] = rule
+    RULES_BY_TYPE[rule.issue_type] = rule
+    for kind in rule.kinds:
+        RULES_BY_KIND.setdefault(kind, []).append(rule)
+    clear_dispatch_tables()
+    return rule
+
+# Removes a rule from the registry and its indexes.
+def unregister(rule_id):
+    rule = RULES_BY_ID.pop(rule_id)
+    RULES.remove(rule)
+    if RULES_BY_TYPE.get(rule.issue_type) is rule:
+        del RULES_BY_TYPE[rule.issue_type]
+    for kind in rule.kinds:
+        RULES_BY_KIND[kind].remove(rule)
+        if not RULES_BY_KIND[kind]:
+            del RULES_BY_KIND[kind]
+    clear_dispatch_tables()
+    return rule
+
+# Drops every dispatch table and the step classifications they hold, so the next analysis resolves its steps afresh.
+def clear_dispatch_tables():
+    _DISPATCH_TABLES.clear()
+
+# Maps a plan step's detail text to (kind, uses_index, purpose, visits): its classify_step result plus the (position, detect, issue)
+# triples of the rules visiting it, empty when none does. Details are resolved on first lookup, so a row costs one dict hit;
+# the details of a long-running server are unbounded, so the map starts over once it holds RULE_DISPATCH["step_cache_size"] of them.
+class StepDispatch(dict):
+
+    # Initializes an empty dispatch over the rules in reporting order.
+    def __init__(self, rules):
+        super().__init__()
+        self.rules = rules
+        self.visits = {}
+
+    # Classifies a detail seen for the first time and resolves the visits of its (kind, purpose).
+    def __missing__(self, detail):
+        kind, uses_index, purpose = classify_step(detail)
+        visits = self.visits.get((kind, purpose))
+        if visits is None:
+            visits = self.visits[(kind, purpose)] = tuple(
+                (position, rule.detect, rule.issue) for position, rule in enumerate(self.rules) if rule.visits(kind, purpose)
+            )
+        if len(self) >= RULE_DISPATCH["step_cache_size"]:
+            self.clear()
+        entry = self[detail] = (kind, uses_index, purpose, visits)
+        return entry
+
+
+# Returns (rules, dispatch, query_rules) for the given enabled rule ids: the rules in reporting order, their StepDispatch,
+# and the (position, rule) pairs of the query-level rules. Built once per set of ids, so analyzing a short plan
+# does not pay for rebuilding the dispatch on every call.
+def dispatch_table(rule_ids):
+    key = rule_ids if isinstance(rule_ids, frozenset) else frozenset(rule_ids)
+    table = _DISPATCH_TABLES.get(key)
+    if table is None:
+        rules = tuple(rule for rule in RULES if rule.id in key)
+        query_rules = tuple((position, rule) for position, rule in enumerate(rules) if not rule.kinds)
+        table = _DISPATCH_TABLES[key] = (rules, StepDispatch(rules), query_rules)
+    return table
+
+# Flags a scan that reads a whole table without an index.
+def detect_full_table_scan(detail, uses_index, purpose, level, state):
+    if uses_index:
+        return None
+    return f"Query performs full table scan: '{detail}'"
+
+# Flags a temp B-tree for ORDER BY when no index was used earlier at the same query level.
+def detect_unnecessary_filesort(detail, uses_index, purpose, level, state):
+    if purpose != "ORDER BY" or level in state["indexed_levels"]:
+        return None
+    return f"Query may be using an unnecessary filesort: '{detail}'"
+
+# Flags a temp B-tree for GROUP BY when no index was used earlier at the same query level.
+def detect_inefficient_group_by(detail, uses_index, purpose, level, state):
+    if purpose != "GROUP BY" or level in state["indexed_levels"]:
+        return None
+    return f"Query may be using a temporary B-Tree for the GROUP BY Clause: '{detail}'"
+
+# Flags LIKE patterns that start with a wildcard.
+def detect_like_without_index(features, state):
+    messages = []
+    for pattern in features["like_patterns"]:
+        pattern = pattern[1:-1]
+        if pattern.startswith('%'):
+            messages.append(f"LIKE pattern starts with wildcard '{pattern}', index likely not used.")
+    return messages
+
+# Flags OR conditions when the plan still contains a full table scan.
+def detect_inefficient_or_conditions(features, state):
+    if not (features["has_or"] and state["full_scan"]):
+        return []
+    return ["OR condition detected that may prevent index usage."]
+
+# Returns the query's tables holding a column: the table its qualifier names, or every query table with that column.
+def _column_tables(catalog, tables, qualifier, column):
+    if qualifier:
+        table = tables.get(qualifier.lower(), qualifier)
+        return [table] if table else []
+    return [table for table in dict.fromkeys(tables.values()) if table and catalog.has_column(table, column)]
+
+# Checks whether any of a function's (qualifier, column) arguments is an indexed column of its table.
+def _reads_indexed_column(catalog, tables, columns):
+    for qualifier, column in columns:
+        if any(catalog.is_indexed(table, column) for table in _column_tables(catalog, tables, qualifier, column)):
+            return True
+    return False
+
+# Flags function calls in the WHERE clause; with a schema catalog, only calls reading a column that is really indexed.
+def detect_functions_on_indexed_columns(features, state):
+    func_calls = features["where_functions"]
+    catalog = state["catalog"]
+    if func_calls and catalog is not None and "function_columns" in features:
+        func_calls = [
+            call for call, columns in zip(func_calls, features["function_columns"])
+            if _reads_indexed_column(catalog, features["tables"], columns)
+        ]
+    if not func_calls:
+        return []
+    return [f"Functions used in WHERE clause may disable index usage: {func_calls}"]
+
+# Flags DISTINCT when no step of the plan uses an index; with a schema catalog, not when an index already leads with the DISTINCT columns.
+def detect_distinct_without_index(features, state):
+    if not features["has_distinct"] or state["index_used"]:
+        return []
+    catalog = state["catalog"]
+    columns = features.get("distinct_columns")
+    if catalog is not None and columns:
+        tables = [table for table in dict.fromkeys(features["tables"].values()) if table]
+        if any(catalog.leading_index(table, columns) for table in tables if all(catalog.has_column(table, column) for column in columns)):
+            return []
+    return ["DISTINCT clause is used but no index was detected in the query plan."]
+
+# Flags a profiled run that took at least PROFILING["slow_ms"].
+def detect_slow_execution(features, state):
+    profile = state["profile"]
+    if not profile or profile["wall_ms"] is None or profile["wall_ms"] < PROFILING["slow_ms"]:
+        return []
+    return [f"Query took {profile['wall_ms']} ms and about {profile['vm_steps']} VM steps to return {profile['rows']} rows."]
+
+# Flags a complete profiled run doing at least PROFILING["steps_per_row"] VM steps per returned row, a sign of rows read and discarded.
+def detect_excessive_vm_steps(features, state):
+    profile = state["profile"]
+    if not profile or profile["truncated"] or profile["vm_steps"] < PROFILING["min_vm_steps"]:
+        return []
+    per_row = profile["vm_steps"] // max(profile["rows"], 1)
+    if per_row < PROFILING["steps_per_row"]:
+        return []
+    return [f"Query ran about {per_row} VM steps per row returned ({profile['vm_steps']} steps for {profile['rows']} rows)."]
+
+
+# Built-in rules, registered once at import.
+register(Rule(
+    "full_table_scan", "Full Table Scan", "high", detect_full_table_scan,
+    "The query performs a full table scan without using any index. "
+    "Consider adding indexes to avoid full table scans.",
+    kinds = (SCAN,)
+))
+
+register(Rule(
+    "unnecessary_filesort", "Unnecessary Filesort", "medium", detect_unnecessary_filesort,
+    "The query performs a sort operation using a temporary B-tree (filesort) without utilizing an index. "
+    "Consider creating an index on the column(s) used in the ORDER BY clause to avoid this inefficiency.",
+    kinds = (TEMP_BTREE,), purposes = ("ORDER BY",)
+))
+
+register(Rule(
+    "inefficient GROUP BY", "Inefficient GROUP BY", "medium", detect_inefficient_group_by,
+    "SQLite is using a temporary B-tree for GROUP BY, which indicates an index is not being used. "
+    "Add an index on the GROUP BY columns to improve performance.",
+    kinds = (TEMP_BTREE,), purposes = ("GROUP BY",)
+))
+
+register(Rule(
+    "like_without_index", "LIKE without index", "medium", detect_like_without_index,
+    "A LIKE clause uses a leading wildcard (e.g., '%value'), which prevents index usage. "
+    "If possible, avoid leading wildcards or use full-text search for better performance."
+))
+
+register(Rule(
+    "inefficient_or_conditions", "Inefficient OR Conditions", "medium", detect_inefficient_or_conditions,
+    "OR conditions can prevent index use if not carefully structured. "
+    "Consider breaking the query into separate indexed queries combined with UNION."
+))
+
+register(Rule(
+    "functions_on_indexed_columns", "Functions on Indexed Columns", "medium", detect_functions_on_indexed_columns,
+    "Functions are applied to columns in the WHERE clause, which disables index use. "
+    "Consider rewriting conditions to compare raw column values directly when possible."
+))
+
+register(Rule(
+    "distinct_without_index", "DISTINCT Without Index", "low", detect_distinct_without_index,
+    "The DISTINCT clause is used, but no index is present to support it. "
+    "Consider adding an index on the column(s) used with DISTINCT to avoid unnecessary sorting or deduplication overhead."
+))
+
+register(Rule(
+    "slow_execution", "Slow Execution", "high", detect_slow_execution,
+    "The query was measured running slowly. "
+    "Fix the plan issues reported alongside it first; their severity reflects this measured cost."
+))
+
+register(Rule(
+    "excessive_vm_steps", "Excessive VM Steps", "medium", detect_excessive_vm_steps,
+    "SQLite did far more work than the rows returned would need, reading rows only to discard them. "
+    "Add an index matching the WHERE or JOIN columns so rows are filtered before they are read."
+))
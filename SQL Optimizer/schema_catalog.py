@@ -0,0 +1,137 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# schema_catalog.py
+
+# Resource importing and management.
+from config import SCHEMA_CATALOG
+from query_cache import LRUCache
+import sqlite3
+import os
+
+# Quotes a name for use inside a PRAGMA call.
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+# A DB's tables, columns, indexes and foreign keys, read once from sqlite_master and the PRAGMAs.
+# Names are looked up case-insensitively; every lookup is a dict access.
+class SchemaCatalog:
+
+    # Loads the catalog through an open connection, recording the schema_version it describes.
+    # A table or index SQLite cannot describe, such as a virtual table whose module is not loaded, is left out.
+    def __init__(self, conn):
+        self.schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        self.tables = {}
+        self.indexes = {}
+        self.coverage = {}
+
+        for name, sql in conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table' ORDER BY name").fetchall():
+            try:
+                self._load_table(conn, name, sql)
+            except sqlite3.Error:
+                continue
+        for table in list(self.tables.values()):
+            try:
+                self._load_indexes(conn, table)
+            except sqlite3.Error:
+                continue
+
+    # Reads a table's columns, its INTEGER PRIMARY KEY (an alias of the rowid, so indexed without an index) and its foreign keys.
+    def _load_table(self, conn, name, sql):
+        info = conn.execute(f"PRAGMA table_info({_quote(name)})").fetchall()
+        columns = [row[1] for row in info]
+        primary_key = [row for row in info if row[5]]
+        rowid = primary_key[0][1].lower() if len(primary_key) == 1 and primary_key[0][2].upper() == "INTEGER" else None
+        foreign_keys = [
+            {"table" : row[2], "from" : row[3], "to" : row[4]}
+            for row in conn.execute(f"PRAGMA foreign_key_list({_quote(name)})")
+        ]
+        self.tables[name.lower()] = {
+            "name" : name,
+            "sql" : sql,
+            "columns" : columns,
+            "column_names" : {column.lower() for column in columns},
+            "rowid" : rowid,
+            "foreign_keys" : foreign_keys,
+            "indexes" : []
+        }
+
+    # Reads a table's indexes and their key columns, indexing each column's coverage.
+    # Expression key columns are recorded as None, so an index only covers the plain columns it names.
+    def _load_indexes(self, conn, table):
+        for row in conn.execute(f"PRAGMA index_list({_quote(table['name'])})").fetchall():
+            name, unique, origin, partial = row[1], bool(row[2]), row[3], bool(row[4])
+            try:
+                columns = [info[2] for info in conn.execute(f"PRAGMA index_xinfo({_quote(name)})") if info[5]]
+            except sqlite3.Error:
+                continue
+            index = {
+                "name" : name,
+                "table" : table["name"],
+                "unique" : unique,
+                "origin" : origin,
+                "partial" : partial,
+                "columns" : columns
+            }
+            self.indexes[name.lower()] = index
+            table["indexes"].append(index)
+            for position, column in enumerate(columns):
+                if column is not None:
+                    self.coverage.setdefault((table["name"].lower(), column.lower()), []).append((index, position))
+
+    # Returns the table entry for a name, or None.
+    def table(self, name):
+        return self.tables.get(name.lower()) if name else None
+
+    # Returns the indexes defined on a table.
+    def table_indexes(self, table):
+        entry = self.table(table)
+        return entry["indexes"] if entry else []
+
+    # Returns the (index, key position) pairs of every index containing a table's column.
+    def column_indexes(self, table, column):
+        if not table or not column:
+            return []
+        return self.coverage.get((table.lower(), column.lower()), [])
+
+    # Checks whether any index contains a table's column, or the column is the table's rowid alias.
+    def is_indexed(self, table, column):
+        if self.column_indexes(table, column):
+            return True
+        entry = self.table(table)
+        return entry is not None and column is not None and entry["rowid"] == column.lower()
+
+    # Checks whether a table has a column.
+    def has_column(self, table, column):
+        entry = self.table(table)
+        return entry is not None and column.lower() in entry["column_names"]
+
+    # Returns the name of an index on a table whose leading key columns are exactly the given columns, in any order, or None.
+    def leading_index(self, table, columns):
+        wanted = {column.lower() for column in columns}
+        if not wanted:
+            return None
+        for index in self.table_indexes(table):
+            leading = index["columns"][:len(wanted)]
+            if not index["partial"] and None not in leading and {column.lower() for column in leading} == wanted:
+                return index["name"]
+        return None
+
+
+# Caches one SchemaCatalog per DB file and schema_version, so the PRAGMAs run once until the schema changes.
+class SchemaCatalogCache(LRUCache):
+
+    # Returns the catalog for a connection's DB, loading it on a miss; in-memory DBs are private to a connection and never cached.
+    def load(self, conn, db_path):
+        if db_path == ":memory:" or str(db_path).startswith("file::memory:"):
+            return SchemaCatalog(conn)
+        path = os.path.realpath(db_path)
+        catalog = self.get((path, conn.execute("PRAGMA schema_version").fetchone()[0]))
+        if catalog is None:
+            catalog = SchemaCatalog(conn)
+            self.put((path, catalog.schema_version), catalog)
+        return catalog
+
+
+# Shared catalog cache sized from config.py.
+catalog_cache = SchemaCatalogCache(max_size = SCHEMA_CATALOG["max_size"])
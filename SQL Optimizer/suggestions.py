@@ -2,64 +2,60 @@
 # SQL Query Optimization Tool
 # suggestions.py
 
+# Resource importing and management.
+from rules import RULES_BY_TYPE
+from cost_model import rank_by_savings
 
 # Constructs a list of dicts describing detected query inefficiencies from ExplainAnalyzer.
 class Suggestions:
 
-    # Initializes issues_detected.
-    def __init__(self, issues_detected):
+    # Initializes issues_detected, plus any index candidates measured by IndexEvaluator and rewrites verified by QueryRewriter.
+    def __init__(self, issues_detected, index_candidates = None, rewrites = None):
         self.issues = issues_detected
+        self.verified_indexes = [candidate for candidate in (index_candidates or []) if candidate.get("verified")]
+        self.rewrites = rewrites or []
 
-    # Constructs a set of suggestions to improve the efficiency of the user's query based on the flagged issue type.
+    # Finds a verified index whose plan change removes the scan or temp B-tree named in the issue message.
+    def _verified_index(self, message):
+        for candidate in self.verified_indexes:
+            for detail in candidate["scans_removed"] + candidate["temp_btrees_removed"]:
+                if f"'{detail}'" in message:
+                    return candidate, detail
+        return None
+
+    # Finds a rewrite addressing the issue's type whose plan no longer contains the step named in the issue message.
+    def _verified_rewrite(self, issue_type, message):
+        for rewrite in self.rewrites:
+            if issue_type in rewrite["issue_types"] and not any(f"'{detail}'" in message for detail in rewrite["plan"]):
+                return rewrite
+        return None
+
+    # Constructs a set of suggestions to improve the efficiency of the user's query, looking up the registered rule for each issue type.
+    # Issues carrying a cost estimate are handled largest expected savings first.
     def generate_suggestions(self):
         suggestions = []
 
-        for issue in self.issues:
+        for issue in rank_by_savings(self.issues):
             issue_type = issue.get("type")
             message = issue.get("message", "")
+            verified = self._verified_index(message)
+            rewrite = None if verified else self._verified_rewrite(issue_type, message)
 
-            if issue_type == "Full Table Scan":
-                suggestions.append(
-                    "The query performs a full table scan without using any index. "
-                    "Consider adding indexes to avoid full table scans."
-                )
-
-            elif issue_type == "Unnecessary Filesort":
-                suggestions.append(
-                    "The query performs a sort operation using a temporary B-tree (filesort) without utilizing an index. "
-                    "Consider creating an index on the column(s) used in the ORDER BY clause to avoid this inefficiency."
-                )
-
-            elif issue_type == "Inefficient GROUP BY":
+            if verified:
+                candidate, detail = verified
                 suggestions.append(
-                     "SQLite is using a temporary B-tree for GROUP BY, which indicates an index is not being used. "
-                    "Add an index on the GROUP BY columns to improve performance."
+                    f"Measured on an in-memory copy of the schema, {candidate['statement'].rstrip(';')} removes '{detail}' from the plan. "
+                    "Create this index to fix the issue."
                 )
 
-    
-            elif issue_type == "LIKE without index":
+            elif rewrite:
                 suggestions.append(
-                    "A LIKE clause uses a leading wildcard (e.g., '%value'), which prevents index usage. "
-                    "If possible, avoid leading wildcards or use full-text search for better performance."
+                    f"Measured with EXPLAIN QUERY PLAN, rewriting the query as {rewrite['query']} gives the plan {rewrite['plan']}. "
+                    "Use the rewritten query to fix the issue."
                 )
 
-            elif issue_type == "Inefficient OR Conditions":
-                suggestions.append(
-                    "OR conditions can prevent index use if not carefully structured. "
-                    "Consider breaking the query into separate indexed queries combined with UNION."
-                )
-
-            elif issue_type == "Functions on Indexed Columns":
-                suggestions.append(
-                    "Functions are applied to columns in the WHERE clause, which disables index use. "
-                    "Consider rewriting conditions to compare raw column values directly when possible."
-                )
-
-            elif issue_type == "DISTINCT Without Index":
-                suggestions.append(
-                "The DISTINCT clause is used, but no index is present to support it. "
-                "Consider adding an index on the column(s) used with DISTINCT to avoid unnecessary sorting or deduplication overhead."
-            )
+            elif issue_type in RULES_BY_TYPE:
+                suggestions.append(RULES_BY_TYPE[issue_type].suggest(issue))
 
             else:
                 suggestions.append(f"No specific suggestion available for issue: {message}")
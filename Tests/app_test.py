@@ -0,0 +1,186 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# app_test.py
+
+# Resource importing and management.
+import unittest
+from unittest.mock import patch
+import tempfile
+import sqlite3
+import time
+import os
+from app import app, analyze_query
+import app as app_module
+from db_connector import DBConnector
+from instrumentation import metrics
+
+# Testing suite for the analyze_query pipeline and its endpoints.
+class TestAnalyzeQuery(unittest.TestCase):
+
+    # Creates a temporary DB with a small unindexed table.
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix = ".sqlite3")
+        os.close(handle)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, age INTEGER)")
+        conn.executemany("INSERT INTO users (name, age) VALUES (?, ?)", [("Alice", 30), ("Bob", 25), ("Charlie", 35)])
+        conn.commit()
+        conn.close()
+        self.client = app.test_client()
+
+    # Removes the temporary DB.
+    def tearDown(self):
+        os.remove(self.path)
+
+    # Tests a full analysis returns results alongside the diagnostics.
+    def test_full_analysis(self):
+        result = analyze_query("SELECT * FROM users WHERE age > 26", self.path)
+        self.assertEqual(len(result["query_results"]), 2)
+        self.assertFalse(result["plan_only"])
+        self.assertIn("Full Table Scan", [issue["type"] for issue in result["issues"]])
+
+    # Tests that plan-only analysis never executes the query.
+    def test_plan_only_skips_execution(self):
+        with patch.object(DBConnector, "execute_query") as execute_query:
+            result = analyze_query("SELECT * FROM users WHERE age > 26", self.path, plan_only = True)
+        execute_query.assert_not_called()
+        self.assertEqual(result["query_results"], [])
+        self.assertTrue(result["plan_only"])
+        self.assertTrue(result["explain_plan"])
+        self.assertIn("Full Table Scan", [issue["type"] for issue in result["issues"]])
+
+    # Tests the plan_only flag on the /analyze endpoint.
+    def test_plan_only_endpoint(self):
+        response = self.client.post("/analyze", json = {"db_path" : self.path, "query" : "SELECT * FROM users", "plan_only" : True})
+        result = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(result["query_results"], [])
+        self.assertTrue(result["plan_only"])
+
+    # Tests that the optional timings block reports each stage with row and byte counts.
+    def test_timings_block(self):
+        result = analyze_query("SELECT * FROM users", self.path, timings = True)
+        timings = result["timings"]
+        for stage in ("explain", "execute", "analyze", "parse", "suggest", "total"):
+            self.assertIn(stage, timings)
+        self.assertEqual(timings["execute"]["rows"], 3)
+        self.assertGreater(timings["execute"]["bytes"], 0)
+        self.assertNotIn("timings", analyze_query("SELECT * FROM users", self.path))
+
+    # Tests that a repeated analysis is served from the result cache, with fresh query results, until the schema changes.
+    def test_result_cache(self):
+        query = "SELECT * FROM users WHERE age = 30"
+        first = analyze_query(query, self.path)
+        with patch.object(DBConnector, "get_explain") as get_explain:
+            second = analyze_query(query, self.path, timings = True)
+        get_explain.assert_not_called()
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["issues"], first["issues"])
+        self.assertEqual(len(second["query_results"]), 1)
+        self.assertNotIn("explain", second["timings"])
+
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE INDEX idx_users_age ON users (age)")
+        conn.commit()
+        conn.close()
+        third = analyze_query(query, self.path)
+        self.assertFalse(third["cached"])
+        self.assertNotEqual(third["explain_plan"], first["explain_plan"])
+        self.assertFalse(analyze_query("SELECT * FROM users WHERE age = 35", self.path)["cached"])
+
+    # Tests that a profiled analysis reports the measured run, attaches its cost to the issues and bypasses the result cache.
+    def test_profiled_analysis(self):
+        analyze_query("SELECT * FROM users WHERE age > 26", self.path)
+        response = self.client.post("/analyze", json = {"db_path" : self.path, "query" : "SELECT * FROM users WHERE age > 26", "profile" : True})
+        result = response.get_json()
+        self.assertFalse(result["cached"])
+        self.assertEqual(result["profile"]["rows"], 2)
+        self.assertIn("cost_ms", result["issues"][0])
+        self.assertNotIn("profile", analyze_query("SELECT * FROM users", self.path, plan_only = True, profile = True))
+
+    # Tests that a runaway query is cancelled at its time budget while the plan and issues are still returned.
+    def test_timeout_returns_partial_diagnostics(self):
+        query = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT x FROM c WHERE x < 0"
+        response = self.client.post("/analyze", json = {"db_path" : self.path, "query" : query, "timeout_ms" : 50, "profile" : True})
+        result = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(result["timed_out"])
+        self.assertEqual(result["query_results"], [])
+        self.assertTrue(result["explain_plan"])
+        self.assertTrue(result["profile"]["timed_out"])
+        self.assertIn("Full Table Scan", [issue["type"] for issue in result["issues"]])
+        self.assertEqual(self.client.post("/analyze", json = {"db_path" : self.path, "query" : query, "timeout_ms" : -1}).status_code, 400)
+
+    # Tests that a client cannot disable or lift the server's time budget: 0 and negative budgets are rejected, larger ones clamped.
+    def test_timeout_bounds(self):
+        query = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT x FROM c WHERE x < 0"
+        for value in (0, -5, "100"):
+            response = self.client.post("/analyze", json = {"db_path" : self.path, "query" : query, "timeout_ms" : value})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("timeout_ms", response.get_json()["error"])
+        with patch.dict("config.QUERY_TIMEOUT", {"timeout_ms" : 50}):
+            started = time.perf_counter()
+            response = self.client.post("/analyze", json = {"db_path" : self.path, "query" : query, "timeout_ms" : 10 ** 9})
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertTrue(response.get_json()["timed_out"])
+
+    # Tests that boolean flags accept their usual string forms, so "false" stays false, and reject anything else.
+    def test_boolean_flags(self):
+        response = self.client.post("/analyze", json = {"db_path" : self.path, "query" : "SELECT * FROM users", "plan_only" : "false", "timings" : "0"})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.get_json()["plan_only"])
+        response = self.client.post("/analyze", json = {"db_path" : self.path, "query" : "SELECT * FROM users", "plan_only" : "TRUE"})
+        self.assertTrue(response.get_json()["plan_only"])
+        for value in ("maybe", 2, [], {}):
+            response = self.client.post("/analyze", json = {"db_path" : self.path, "query" : "SELECT * FROM users", "profile" : value})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("profile", response.get_json()["error"])
+
+    # Tests that the /metrics endpoint exposes the stage histograms.
+    def test_metrics_endpoint(self):
+        self.client.post("/analyze", json = {"db_path" : self.path, "query" : "SELECT * FROM users"})
+        snapshot = self.client.get("/metrics").get_json()
+        self.assertGreaterEqual(snapshot["execute"]["count"], 1)
+        self.assertIn("serialize", snapshot)
+
+    # Tests that batch results keep input order and report per-item errors.
+    def test_batch_endpoint(self):
+        items = [
+            {"db_path" : self.path, "query" : "SELECT * FROM users"},
+            {"db_path" : self.path, "query" : ""},
+            {"db_path" : self.path, "query" : "SELECT * FROM missing_table"},
+            {"db_path" : self.path, "query" : "SELECT name FROM users WHERE age > 26", "plan_only" : False}
+        ]
+        response = self.client.post("/analyze/batch", json = {"items" : items, "plan_only" : True})
+        body = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry["status"] for entry in body["results"]], ["ok", "error", "error", "ok"])
+        self.assertEqual([entry["index"] for entry in body["results"]], [0, 1, 2, 3])
+        self.assertTrue(body["results"][0]["result"]["plan_only"])
+        self.assertEqual(len(body["results"][3]["result"]["query_results"]), 2)
+        self.assertEqual((body["succeeded"], body["failed"]), (2, 2))
+
+    # Tests that malformed or oversized batches are rejected.
+    def test_batch_validation(self):
+        self.assertEqual(self.client.post("/analyze/batch", json = {"items" : []}).status_code, 400)
+        with patch.dict("config.BATCH_CONFIG", {"max_items" : 1}):
+            items = [{"db_path" : self.path, "query" : "SELECT 1"}] * 2
+            self.assertEqual(self.client.post("/analyze/batch", json = {"items" : items}).status_code, 400)
+
+    # Tests that a batch also runs on a process pool, with the workers' stage timings recorded in this process's metrics.
+    def test_batch_process_pool(self):
+        metrics.reset()
+        with patch.dict("config.BATCH_CONFIG", {"executor" : "process", "max_workers" : 2}), patch("app._batch_executor", None):
+            items = [{"db_path" : self.path, "query" : f"SELECT * FROM users WHERE age > {age}"} for age in (20, 26, 31)]
+            items[2]["timings"] = True
+            body = self.client.post("/analyze/batch", json = {"items" : items}).get_json()
+            app_module._batch_executor.shutdown()
+        self.assertEqual([len(entry["result"]["query_results"]) for entry in body["results"]], [3, 2, 1])
+        self.assertEqual(["timings" in entry["result"] for entry in body["results"]], [False, False, True])
+        snapshot = metrics.snapshot()
+        self.assertEqual((snapshot["execute"]["count"], snapshot["total"]["count"]), (3, 3))
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestAnalyzeQuery))
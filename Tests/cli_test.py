@@ -0,0 +1,99 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# cli_test.py
+
+# Resource importing and management.
+import unittest
+import tempfile
+import sqlite3
+import json
+import os
+from unittest.mock import patch
+from cli import iter_statements, iter_log_queries, main
+
+# Testing suite for splitting script and log inputs into queries.
+class TestQueryReaders(unittest.TestCase):
+
+    # Tests that statements split on semicolons outside strings and comments, across and within lines.
+    def test_iter_statements(self):
+        lines = [
+            "-- audit script\n",
+            "SELECT * FROM users WHERE name = 'a;b'; SELECT id\n",
+            "  FROM orders /* ; */ WHERE total > 5;\n",
+            "SELECT 1\n"
+        ]
+        self.assertEqual(list(iter_statements(lines)), [
+            "-- audit script\nSELECT * FROM users WHERE name = 'a;b';",
+            "SELECT id\n  FROM orders /* ; */ WHERE total > 5;",
+            "SELECT 1"
+        ])
+
+    # Tests that comment-only and empty statements are skipped.
+    def test_iter_statements_skips_empty(self):
+        self.assertEqual(list(iter_statements(["SELECT 1;;\n", "-- done\n"])), ["SELECT 1;"])
+
+    # Tests that each non-blank log line is one query.
+    def test_iter_log_queries(self):
+        self.assertEqual(list(iter_log_queries(["SELECT 1\n", "\n", "  SELECT 2  \n"])), ["SELECT 1", "SELECT 2"])
+
+
+# Testing suite for the end-to-end command-line run.
+class TestMain(unittest.TestCase):
+
+    # Creates a temporary DB and script file.
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directory.name, "audit.sqlite3")
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.commit()
+        conn.close()
+        self.script = os.path.join(self.directory.name, "queries.sql")
+        with open(self.script, "w") as handle:
+            handle.write("SELECT * FROM users;\nSELECT * FROM missing;\nSELECT name FROM users WHERE name LIKE '%a';\n")
+        self.output = os.path.join(self.directory.name, "out.jsonl")
+
+    # Removes the temporary files.
+    def tearDown(self):
+        self.directory.cleanup()
+
+    # Reads the JSON Lines output.
+    def read_output(self):
+        with open(self.output) as handle:
+            return [json.loads(line) for line in handle]
+
+    # Tests that records come back in input order with per-query status, in-process and on a worker pool.
+    def test_main_writes_json_lines(self):
+        for workers in ("1", "2"):
+            self.assertEqual(main([self.script, "--db", self.db_path, "-o", self.output, "--workers", workers]), 0)
+            records = self.read_output()
+            self.assertEqual([record["index"] for record in records], [1, 2, 3])
+            self.assertEqual([record["status"] for record in records], ["ok", "error", "ok"])
+            self.assertTrue(records[0]["result"]["plan_only"])
+            self.assertIn("LIKE without index", [issue["type"] for issue in records[2]["result"]["issues"]])
+
+    # Tests that Ctrl-C terminates the worker pool instead of closing it and waiting for the queued queries.
+    def test_main_interrupt_terminates_pool(self):
+        with patch("cli.Pool") as pool_class:
+            pool = pool_class.return_value
+            pool.imap.side_effect = KeyboardInterrupt
+            with self.assertRaises(KeyboardInterrupt):
+                main([self.script, "--db", self.db_path, "-o", self.output, "--workers", "2"])
+        pool.terminate.assert_called_once()
+        pool.close.assert_not_called()
+        pool.join.assert_called_once()
+
+    # Tests that --advise writes the workload's index recommendations as a SQL script.
+    def test_main_advise(self):
+        advice = os.path.join(self.directory.name, "indexes.sql")
+        log = os.path.join(self.directory.name, "queries.log")
+        with open(log, "w") as handle:
+            handle.write("SELECT * FROM users WHERE name = 'a'\nSELECT * FROM users WHERE name = 'b'\n")
+        main([log, "--db", self.db_path, "-o", self.output, "--workers", "1", "--advise", advice])
+        with open(advice) as handle:
+            self.assertIn("CREATE INDEX IF NOT EXISTS idx_users_name ON users (name);", handle.read())
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestQueryReaders))
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestMain))
@@ -0,0 +1,170 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# connection_pool_test.py
+
+# Resource importing and management.
+import unittest
+import tempfile
+import sqlite3
+import time
+import os
+from unittest.mock import patch
+from connection_pool import ConnectionPool, get_pool, close_all_pools
+from config import CONNECTION_POOL
+from app import app
+from db_connector import DBConnector
+
+# Testing suite for the ConnectionPool class.
+class TestConnectionPool(unittest.TestCase):
+
+    # Creates a temporary DB with one table.
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix = ".sqlite3")
+        os.close(handle)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.commit()
+        conn.close()
+
+    # Closes pooled connections and removes the temporary DB.
+    def tearDown(self):
+        close_all_pools()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    # Tests that a released connection is reused by the next checkout.
+    def test_connection_reused(self):
+        pool = ConnectionPool(self.path)
+        first = pool.acquire()
+        pool.release(first)
+        second = pool.acquire()
+        self.assertIs(first, second)
+        self.assertEqual(pool.stats()["reused"], 1)
+        pool.release(second)
+
+    # Tests that connections beyond max_size are closed on release.
+    def test_overflow_closed(self):
+        pool = ConnectionPool(self.path, max_size = 1)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        self.assertEqual(pool.stats()["idle"], 1)
+        self.assertEqual(pool.stats()["discarded"], 1)
+
+    # Tests that idle connections past the timeout are not handed out again.
+    def test_idle_timeout(self):
+        pool = ConnectionPool(self.path, idle_timeout = 0.01)
+        first = pool.acquire()
+        pool.release(first)
+        time.sleep(0.05)
+        second = pool.acquire()
+        self.assertIsNot(first, second)
+        pool.release(second)
+
+    # Tests that a replaced DB file invalidates pooled connections.
+    def test_replaced_file_detected(self):
+        pool = ConnectionPool(self.path)
+        first = pool.acquire()
+        pool.release(first)
+        os.remove(self.path)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE fresh (id INTEGER)")
+        conn.commit()
+        conn.close()
+        second = pool.acquire()
+        self.assertIsNot(first, second)
+        tables = [row[0] for row in second.execute("SELECT name FROM sqlite_master")]
+        self.assertEqual(tables, ["fresh"])
+        pool.release(second)
+
+    # Tests that a schema change retires pooled connections, whose cached EXPLAIN statements would describe the old schema.
+    def test_schema_change_detected(self):
+        pool = ConnectionPool(self.path)
+        first = pool.acquire()
+        first.execute("EXPLAIN QUERY PLAN SELECT * FROM users WHERE name = 'a'").fetchall()
+        pool.release(first)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE INDEX idx_users_name ON users (name)")
+        conn.commit()
+        conn.close()
+        second = pool.acquire()
+        self.assertIsNot(first, second)
+        plan = second.execute("EXPLAIN QUERY PLAN SELECT * FROM users WHERE name = 'a'").fetchall()
+        self.assertIn("idx_users_name", plan[0][3])
+        pool.release(second)
+
+    # Tests that uncommitted writes are rolled back when a connection is returned.
+    def test_release_rolls_back(self):
+        pool = ConnectionPool(self.path)
+        conn = pool.acquire()
+        conn.execute("INSERT INTO users (name) VALUES ('Alice')")
+        pool.release(conn)
+        conn = pool.acquire()
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone()[0], 0)
+        pool.release(conn)
+
+    # Tests that DBConnector instances share one pooled connection per DB path.
+    def test_db_connector_uses_pool(self):
+        db = DBConnector(db_path = self.path)
+        first = db.conn
+        db.close()
+        db = DBConnector(db_path = self.path)
+        self.assertIs(db.conn, first)
+        db.close()
+        self.assertEqual(get_pool(self.path).stats()["idle"], 1)
+
+    # Tests that read-only connections reject writes.
+    def test_read_only_mode(self):
+        db = DBConnector(db_path = self.path, read_only = True)
+        with self.assertRaises(sqlite3.OperationalError):
+            db.conn.execute("INSERT INTO users (name) VALUES ('Alice')")
+        db.close()
+
+    # Tests that immutable mode opens the file and still answers queries.
+    def test_immutable_mode(self):
+        db = DBConnector(db_path = self.path, immutable = True)
+        self.assertEqual(db.execute_query("SELECT COUNT(*) AS total FROM users"), [{"total" : 0}])
+        db.close()
+
+    # Tests that PRAGMA options are applied to new connections.
+    def test_pragma_options(self):
+        db = DBConnector(db_path = self.path, pooled = False, cache_size = -4096, temp_store = "memory", mmap_size = 1048576)
+        self.assertEqual(db.conn.execute("PRAGMA cache_size").fetchone()[0], -4096)
+        self.assertEqual(db.conn.execute("PRAGMA temp_store").fetchone()[0], 2)
+        db.close()
+
+    # Tests that connections opened with different options are pooled separately.
+    def test_pools_keyed_by_options(self):
+        self.assertIsNot(get_pool(self.path, {"read_only" : True}), get_pool(self.path))
+        self.assertIs(get_pool(self.path, {"read_only" : True}), get_pool(self.path, {"read_only" : True}))
+
+    # Tests that the pool registry keeps only the most recently used pools, closing evicted ones and connections released to them.
+    def test_pool_registry_bounded(self):
+        with patch.dict(CONNECTION_POOL, {"max_pools" : 2}):
+            first = get_pool(self.path, {"cache_size" : 100})
+            conn = first.acquire()
+            get_pool(self.path, {"cache_size" : 200})
+            get_pool(self.path, {"cache_size" : 300})
+            self.assertIsNot(get_pool(self.path, {"cache_size" : 100}), first)
+        first.release(conn)
+        self.assertEqual((first.stats()["idle"], first.stats()["discarded"]), (0, 1))
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+    # Tests that malformed option values are rejected with a clear message, by the connector and the API.
+    def test_invalid_option_values_rejected(self):
+        for options in ({"mmap_size" : "lots"}, {"cache_size" : True}, {"read_only" : "false"}, {"temp_store" : "disk"}, {"mmap_size" : -1}):
+            with self.assertRaises(ValueError):
+                DBConnector(db_path = self.path, pooled = False, **options)
+        response = app.test_client().post("/analyze", json = {"db_path" : self.path, "query" : "SELECT * FROM users", "connection" : {"mmap_size" : "lots"}})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("mmap_size", response.get_json()["error"])
+
+    # Tests that unknown connection options are rejected.
+    def test_unknown_option_rejected(self):
+        with self.assertRaises(ValueError):
+            DBConnector(db_path = self.path, journal = "wal")
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestConnectionPool))
@@ -0,0 +1,90 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# cost_model_test.py
+
+# Resource importing and management.
+import unittest
+import sqlite3
+from cost_model import CostModel, rank_by_savings
+from explain_analyzer import ExplainAnalyzer
+from plan_tree import PlanTree
+from suggestions import Suggestions
+from query_parser import QueryParser
+
+# Testing suite for the statistics-based cost model.
+class TestCostModel(unittest.TestCase):
+
+    # Creates an in-memory DB with a small lookup table, an indexed users table and a large events table.
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript("""
+            CREATE TABLE countries (code TEXT, name TEXT);
+            CREATE TABLE users (id INTEGER PRIMARY KEY, city TEXT, name TEXT, age INTEGER);
+            CREATE INDEX idx_users_city_name ON users (city, name);
+            CREATE TABLE events (id INTEGER PRIMARY KEY, user_id INTEGER, kind TEXT);
+            ANALYZE;
+            DELETE FROM sqlite_stat1;
+            INSERT INTO sqlite_stat1 VALUES ('countries', NULL, '10');
+            INSERT INTO sqlite_stat1 VALUES ('users', 'idx_users_city_name', '2000 200 20');
+            INSERT INTO sqlite_stat1 VALUES ('events', NULL, '200000000');
+        """)
+        self.model = CostModel.load(self.conn)
+
+    # Closes the DB.
+    def tearDown(self):
+        self.conn.close()
+
+    # Returns the plan rows for a query.
+    def explain(self, query):
+        return [{"id" : row[0], "parent" : row[1], "notused" : row[2], "detail" : row[3]} for row in self.conn.execute(f"EXPLAIN QUERY PLAN {query}")]
+
+    # Tests that table sizes and per-key row counts are read from sqlite_stat1, and an unanalyzed DB yields no statistics.
+    def test_load(self):
+        self.assertEqual(self.model.table_rows, {"countries" : 10, "users" : 2000, "events" : 200000000})
+        self.assertEqual(self.model.index_rows, {"idx_users_city_name" : [2000, 200, 20]})
+        self.assertFalse(CostModel.load(sqlite3.connect(":memory:")).has_statistics)
+
+    # Tests estimates for scans, index lookups with equality and range constraints, and rowid lookups.
+    def test_step_estimates(self):
+        estimate = lambda query: [entry and entry["rows"] for entry in self.model.estimate(self.explain(query))]
+        self.assertEqual(estimate("SELECT * FROM countries"), [10])
+        self.assertEqual(estimate("SELECT * FROM users WHERE city = 'x'"), [200])
+        self.assertEqual(estimate("SELECT * FROM users WHERE city = 'x' AND name = 'y'"), [20])
+        self.assertEqual(estimate("SELECT * FROM users WHERE city = 'x' AND name > 'y'"), [50])
+        self.assertEqual(estimate("SELECT * FROM users WHERE id = 3"), [1])
+        self.assertEqual(estimate("SELECT * FROM users WHERE id > 3"), [500])
+
+    # Tests that an inner join step is counted once per row of the steps before it and aliases resolve to tables.
+    def test_join_loops(self):
+        query = "SELECT * FROM countries c JOIN users u ON u.city = c.code"
+        tables = QueryParser(query).get_query_features()["tables"]
+        estimates = self.model.estimate(self.explain(query), tables)
+        self.assertEqual([(entry["rows"], entry["loops"], entry["visited"]) for entry in estimates], [(10, 1, 10), (200, 10, 2000)])
+
+    # Tests that stat4's heaviest sampled key is reported when it exceeds the stat1 average.
+    def test_sampled_max_rows(self):
+        model = CostModel({"users" : 2000}, {"idx_users_city_name" : [2000, 200, 20]}, {"idx_users_city_name" : [1500, 40, 1]})
+        self.assertEqual(model.estimate(self.explain("SELECT * FROM users WHERE city = 'x'"))[0]["max_rows"], 1500)
+
+    # Tests that the scan over the large table is ranked first, ahead of the harmless lookup-table scan, in issues and suggestions.
+    def test_issues_ranked_by_savings(self):
+        plan = self.explain("SELECT name FROM countries UNION ALL SELECT kind FROM events")
+        issues = ExplainAnalyzer(plan, cost_model = self.model).analyze()["issues_detected"]
+        self.assertEqual([(issue["message"], issue["estimated_rows"]) for issue in issues], [
+            ("Query performs full table scan: 'SCAN events'", 200000000),
+            ("Query performs full table scan: 'SCAN countries'", 10)
+        ])
+        self.assertEqual(rank_by_savings(list(reversed(issues))), issues)
+        analysis = ExplainAnalyzer(plan, cost_model = self.model, plan_tree = PlanTree(plan)).analyze()
+        self.assertEqual(analysis["issues_detected"], issues)
+        unranked = ExplainAnalyzer(plan).analyze()["issues_detected"]
+        self.assertEqual([issue["message"] for issue in unranked], [issue["message"] for issue in reversed(issues)])
+        suggestions = Suggestions([
+            {"type" : "LIKE without index", "message" : "", "estimated_rows" : 10},
+            {"type" : "Full Table Scan", "message" : "", "estimated_rows" : 200000000}
+        ]).generate_suggestions()
+        self.assertTrue(suggestions[0].startswith("The query performs a full table scan"))
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestCostModel))
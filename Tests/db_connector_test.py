@@ -42,7 +42,7 @@ from config import DB_CONFIG
 DB_CONFIG['db_path'] = DB_PATH
 
 # Import and test DBConnector.
-from db_connector import DBConnector
+from db_connector import DBConnector, QueryTimeoutError
 
 db = DBConnector()
 
@@ -60,4 +60,164 @@ for row in explain:
     print(row)
 
 
-db.close()
\ No newline at end of file
+db.close()
+
+## Unit tests for streaming and capped result fetching.
+
+import unittest
+import tempfile
+import time
+from unittest.mock import patch
+from config import PROFILING, QUERY_TIMEOUT
+from cost_model import sample_cache
+
+class TestExecuteQueryLimits(unittest.TestCase):
+
+    # Creates a temporary DB with a 250-row table.
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix = ".sqlite3")
+        os.close(handle)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, payload TEXT)")
+        conn.executemany("INSERT INTO events (payload) VALUES (?)", [("x" * 100,) for _ in range(250)])
+        conn.commit()
+        conn.close()
+        self.db = DBConnector(db_path = self.path)
+
+    # Closes the connector and removes the temporary DB.
+    def tearDown(self):
+        self.db.close()
+        os.remove(self.path)
+
+    # Tests that stream_query yields every row across several batches.
+    def test_stream_query_batches(self):
+        rows = list(self.db.stream_query("SELECT * FROM events", batch_size = 7))
+        self.assertEqual(len(rows), 250)
+        self.assertEqual(rows[0]["payload"], "x" * 100)
+
+    # Tests that the row cap truncates results and reports it.
+    def test_row_cap(self):
+        rows = self.db.execute_query("SELECT * FROM events", max_rows = 10)
+        self.assertEqual(len(rows), 10)
+        self.assertTrue(self.db.truncated)
+
+    # Tests that the byte budget truncates results and reports it.
+    def test_byte_budget(self):
+        rows = self.db.execute_query("SELECT * FROM events", max_rows = 1000, max_bytes = 1080)
+        self.assertEqual(len(rows), 10)
+        self.assertTrue(self.db.truncated)
+
+    # Tests that results within the limits are not flagged as truncated.
+    def test_not_truncated(self):
+        rows = self.db.execute_query("SELECT * FROM events WHERE id <= 5")
+        self.assertEqual(len(rows), 5)
+        self.assertFalse(self.db.truncated)
+
+    # Tests that profiling records wall time, VM steps, rows and the traced statement, and removes its hooks afterwards.
+    def test_profile(self):
+        with patch.dict(PROFILING, {"progress_interval" : 100}):
+            rows = self.db.execute_query("SELECT * FROM events WHERE payload LIKE '%y%' OR id <= 3", profile = True)
+        profile = self.db.profile
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(profile["rows"], 3)
+        self.assertGreaterEqual(profile["vm_steps"], 1000)
+        self.assertGreaterEqual(profile["wall_ms"], 0)
+        self.assertFalse(profile["truncated"])
+        self.assertIn("SELECT * FROM events", profile["statements"][0])
+
+        self.db.execute_query("SELECT * FROM events")
+        self.assertIsNone(self.db.profile)
+        self.assertEqual(profile["rows"], 3)
+
+    # Tests that a runaway query is cancelled at its deadline, keeping the profile, and the connection stays usable.
+    def test_timeout_cancels_query(self):
+        started = time.perf_counter()
+        with self.assertRaises(QueryTimeoutError) as raised:
+            self.db.execute_query("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT x FROM c WHERE x < 0", timeout_ms = 50, profile = True)
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertEqual(raised.exception.rows, [])
+        self.assertTrue(self.db.timed_out)
+        self.assertTrue(self.db.profile["timed_out"])
+        self.assertGreater(self.db.profile["vm_steps"], 0)
+        self.assertEqual(len(self.db.execute_query("SELECT * FROM events", timeout_ms = 0)), 250)
+        self.assertFalse(self.db.timed_out)
+
+    # Tests that a streamed run past its deadline is cancelled with QueryTimeoutError and its hooks are removed.
+    def test_stream_query_timeout(self):
+        rows = self.db.stream_query("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT x FROM c WHERE x < 0", timeout_ms = 50)
+        with self.assertRaises(QueryTimeoutError) as raised:
+            list(rows)
+        self.assertEqual(raised.exception.timeout_ms, 50)
+        self.assertEqual(len(list(self.db.stream_query("SELECT * FROM events", timeout_ms = 5000))), 250)
+        self.assertEqual(len(self.db.execute_query("SELECT * FROM events", timeout_ms = 0)), 250)
+
+    # Tests that the in-memory clone copies schema and sampled rows while the source file stays untouched.
+    def test_clone_schema(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE INDEX idx_events_payload ON events (payload)")
+        conn.commit()
+        conn.close()
+        before = os.stat(self.path).st_mtime_ns
+
+        clone = self.db.clone_schema(sample_rows = 20)
+        names = {row["name"] for row in clone.execute("SELECT name FROM sqlite_master")}
+        self.assertIn("idx_events_payload", names)
+        self.assertEqual(clone.execute("SELECT COUNT(*) FROM events").fetchone()[0], 20)
+        clone.execute("DROP INDEX idx_events_payload")
+        clone.execute("DELETE FROM events")
+        clone.commit()
+        self.assertEqual(clone.execute("PRAGMA database_list").fetchall()[0]["file"], "")
+        clone.close()
+
+        self.assertEqual(os.stat(self.path).st_mtime_ns, before)
+        self.assertEqual(len(self.db.execute_query("SELECT * FROM events", max_rows = 1000)), 250)
+
+    # Tests that a never-analyzed DB gets statistics from a chunked sample scaled to the table size, without the file being written.
+    def test_sample_statistics(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE INDEX idx_events_payload ON events (payload)")
+        conn.commit()
+        conn.close()
+        before = os.stat(self.path).st_mtime_ns
+        sample_cache.clear()
+
+        self.assertFalse(self.db.get_cost_model(tables = ["events"], sample = False).has_statistics)
+        model = self.db.get_cost_model(tables = ["events", "missing"], sample = True)
+        self.assertEqual(model.table_rows, {"events" : 250})
+        self.assertEqual(model.index_rows["idx_events_payload"], [250, 250])
+        self.db.get_cost_model(tables = ["events", "missing"], sample = True)
+        self.assertEqual(sample_cache.stats()["hits"], 1)
+
+        with patch("db_connector.sqlite3.connect", wraps = sqlite3.connect) as connect:
+            sampled = self.db.sample_statistics(["events"], sample_rows = 50)
+        self.assertEqual(sampled.table_rows, {"events" : 250})
+        self.assertTrue(connect.call_args.kwargs.get("uri"))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, before)
+        self.assertIsNone(self.db.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone())
+
+    # Tests that sparse rowids, from random keys or deletes, do not inflate the sampled size to the rowid span.
+    def test_sample_statistics_sparse_rowids(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE tokens (id INTEGER PRIMARY KEY, kind INTEGER)")
+        conn.executemany("INSERT INTO tokens VALUES (?, ?)", [(position * 922337203685477 + 7, position % 50) for position in range(5000)])
+        conn.execute("CREATE TABLE logs (id INTEGER PRIMARY KEY, kind INTEGER)")
+        conn.executemany("INSERT INTO logs VALUES (?, ?)", [(position, position % 50) for position in range(1, 40001)])
+        conn.execute("DELETE FROM logs WHERE id % 4 != 0")
+        conn.commit()
+        conn.close()
+        sample_cache.clear()
+        sampled = self.db.sample_statistics(["tokens", "logs"], sample_rows = 1000)
+        self.assertLess(abs(sampled.table_rows["tokens"] - 5000), 250)
+        self.assertLess(abs(sampled.table_rows["logs"] - 10000), 500)
+
+    # Tests that sampling stops at its time budget and an incomplete sample is not cached.
+    def test_sample_statistics_time_budget(self):
+        sample_cache.clear()
+        with patch.dict(QUERY_TIMEOUT, {"check_interval" : 1}):
+            model = self.db.sample_statistics(["events"], time_budget_ms = 0.000001)
+        self.assertFalse(model.has_statistics)
+        self.assertEqual(sample_cache.stats()["size"], 0)
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestExecuteQueryLimits))
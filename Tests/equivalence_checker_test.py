@@ -0,0 +1,110 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# equivalence_checker_test.py
+
+# Resource importing and management.
+import unittest
+import tempfile
+import sqlite3
+import os
+from unittest.mock import patch
+from db_connector import DBConnector, QueryTimeoutError
+from equivalence_checker import EquivalenceChecker, MultisetHash
+from query_rewriter import QueryRewriter
+from pipeline import analyze_query
+from app import app
+import config
+
+# Testing suite for result-equivalence checking of rewritten queries.
+class TestEquivalenceChecker(unittest.TestCase):
+
+    # Creates a temporary DB with a NOCASE-indexed email column, duplicate rows and NULLs.
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix = ".sqlite3")
+        os.close(handle)
+        conn = sqlite3.connect(self.path)
+        conn.executescript("""
+            CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT COLLATE NOCASE, age INTEGER);
+            CREATE INDEX idx_users_email ON users (email);
+        """)
+        conn.executemany("INSERT INTO users (name, email, age) VALUES (?, ?, ?)", [
+            ("John", "A@x.com", 30), ("joan", "a@x.com", None), ("JOE", None, 30), ("Ann", "b@x.com", 30), ("Ann", "c@x.com", 30)
+        ])
+        conn.commit()
+        conn.close()
+        self.db = DBConnector(db_path = self.path, pooled = False)
+        self.checker = EquivalenceChecker(self.db, batch_size = 2)
+
+    # Closes the connection and removes the temporary DB.
+    def tearDown(self):
+        self.db.close()
+        os.remove(self.path)
+
+    # Tests that the multiset hash ignores row order but counts duplicates and tells values of different types apart.
+    def test_multiset_hash(self):
+        first, second, third = MultisetHash(), MultisetHash(), MultisetHash()
+        for row in [(1, "a"), (2, None), (1, "a")]:
+            first.add(row)
+        for row in [(2, None), (1, "a"), (1, "a")]:
+            second.add(row)
+        for row in [(2, None), (1, "a"), (1.0, "a")]:
+            third.add(row)
+        self.assertEqual(first, second)
+        self.assertEqual(first.hexdigest(), second.hexdigest())
+        self.assertNotEqual(first, third)
+
+    # Tests that a reordered query is equivalent, while dropping a duplicate row is caught, and both runs are timed.
+    def test_compare(self):
+        report = self.checker.compare("SELECT name, age FROM users", "SELECT name, age FROM users ORDER BY age DESC, name")
+        self.assertTrue(report["equivalent"])
+        self.assertEqual(report["original"]["rows"], 5)
+        self.assertEqual(report["original"]["columns"], ["name", "age"])
+        self.assertGreaterEqual(report["original"]["elapsed_ms"], 0)
+        self.assertIn("speedup", report)
+        report = self.checker.compare("SELECT name FROM users WHERE age = 30", "SELECT DISTINCT name FROM users WHERE age = 30")
+        self.assertFalse(report["equivalent"])
+        self.assertEqual((report["original"]["rows"], report["rewritten"]["rows"]), (4, 3))
+
+    # Tests that the rewriter's verified rewrite is kept with its report, and a rewrite returning other rows is dropped.
+    def test_verify_rewrites(self):
+        query = "SELECT * FROM users WHERE LOWER(email) = 'a@x.com'"
+        rewrites = QueryRewriter(self.db).rewrite(query)["rewrites"]
+        wrong = dict(rewrites[0], query = "SELECT * FROM users WHERE email = 'a@x.com' COLLATE BINARY")
+        verified = self.checker.verify(query, rewrites + [wrong])
+        self.assertEqual([rewrite["query"] for rewrite in verified], [rewrites[0]["query"]])
+        self.assertTrue(verified[0]["equivalence"]["equivalent"])
+        self.assertEqual(verified[0]["equivalence"]["rewritten"]["rows"], 2)
+
+    # Tests that a run past its time budget is cancelled.
+    def test_timeout(self):
+        checker = EquivalenceChecker(self.db, timeout_ms = 1)
+        query = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT i FROM n"
+        with self.assertRaises(QueryTimeoutError):
+            checker.measure(query)
+
+    # Tests that the pipeline attaches the equivalence report when verification is on, and the check endpoint reports both runs.
+    def test_pipeline_and_endpoint(self):
+        query = "SELECT * FROM users WHERE LOWER(email) = 'a@x.com'"
+        with patch.dict(config.QUERY_REWRITE, {"verify_results" : True}):
+            result = analyze_query(query, self.path)
+        self.assertTrue(result["rewrites"])
+        self.assertTrue(all(rewrite["equivalence"]["equivalent"] for rewrite in result["rewrites"]))
+        response = app.test_client().post("/rewrite/check", json = {"db_path" : self.path, "query" : query,
+                                                                     "rewritten" : "SELECT * FROM users WHERE email = 'a@x.com' COLLATE NOCASE"})
+        self.assertTrue(response.get_json()["equivalent"])
+        response = app.test_client().post("/rewrite/check", json = {"db_path" : self.path, "query" : query})
+        self.assertEqual(response.status_code, 400)
+
+    # Tests that verifying rewrites, which streams them under a timeout, keeps the profile of the analyzed query's own run.
+    def test_pipeline_profile_with_verify(self):
+        query = "SELECT * FROM users WHERE LOWER(email) = 'a@x.com'"
+        with patch.dict(config.QUERY_REWRITE, {"verify_results" : True}):
+            result = analyze_query(query, self.path, profile = True, timeout_ms = 5000)
+        self.assertTrue(result["rewrites"])
+        self.assertIsNotNone(result["profile"])
+        self.assertEqual(result["profile"]["rows"], 2)
+        self.assertIn("LOWER(email)", result["profile"]["statements"][0])
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestEquivalenceChecker))
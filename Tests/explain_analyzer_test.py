@@ -404,6 +404,114 @@ class TestExplainAnalyzer(unittest.TestCase):
         self.assertIn('LIKE without index', issue_types)
         self.assertEqual(result['total_issues'], 3)
 
+class TestPlanPosition(unittest.TestCase):
+
+    # Ensures an index used only inside a subquery does not hide an outer filesort.
+    def test_subquery_index_does_not_hide_filesort(self):
+        explain_plan = [
+            {'id': 2, 'parent': 0, 'notused': 0, 'detail': 'SCAN users'},
+            {'id': 5, 'parent': 0, 'notused': 0, 'detail': 'CORRELATED SCALAR SUBQUERY 1'},
+            {'id': 9, 'parent': 5, 'notused': 0, 'detail': 'SEARCH orders USING INDEX order_idx (user_id=?)'},
+            {'id': 20, 'parent': 0, 'notused': 0, 'detail': 'USE TEMP B-TREE FOR ORDER BY'}
+        ]
+        analyzer = ExplainAnalyzer(explain_plan)
+        analyzer._check_unnecessary_filesort()
+
+        self.assertEqual(len(analyzer.issues), 1)
+        self.assertEqual(analyzer.issues[0]['type'], 'Unnecessary Filesort')
+
+    # Ensures an index used in a MULTI-INDEX OR branch counts for the query level holding the OR.
+    def test_multi_index_or_branch_counts_for_level(self):
+        explain_plan = [
+            {'id': 3, 'parent': 0, 'notused': 0, 'detail': 'MULTI-INDEX OR'},
+            {'id': 4, 'parent': 3, 'notused': 0, 'detail': 'INDEX 1'},
+            {'id': 7, 'parent': 4, 'notused': 0, 'detail': 'SEARCH users USING INDEX user_idx (id=?)'},
+            {'id': 20, 'parent': 0, 'notused': 0, 'detail': 'USE TEMP B-TREE FOR GROUP BY'}
+        ]
+        analyzer = ExplainAnalyzer(explain_plan)
+        analyzer._check_inefficient_group_by()
+
+        self.assertEqual(analyzer.issues, [])
+
+    # Ensures the single-pass analysis reports the same issues, in the same order, as running each check alone.
+    def test_single_pass_matches_individual_checks(self):
+        query = "SELECT DISTINCT name FROM users WHERE LOWER(email) = 'a' OR name LIKE '%son' ORDER BY name"
+        explain_plan = [
+            {'id': 2, 'parent': 0, 'notused': 0, 'detail': 'SCAN users'},
+            {'id': 8, 'parent': 0, 'notused': 0, 'detail': 'USE TEMP B-TREE FOR GROUP BY'},
+            {'id': 9, 'parent': 0, 'notused': 0, 'detail': 'USE TEMP B-TREE FOR ORDER BY'}
+        ]
+        individual = ExplainAnalyzer(explain_plan, raw_query = query)
+        for check in (individual._check_full_table_scan, individual._check_unnecessary_filesort, individual._check_inefficient_group_by,
+                      individual._check_like_without_index, individual._check_inefficient_or_conditions,
+                      individual._check_functions_on_indexed_columns, individual._check_distinct_without_index):
+            check()
+
+        self.assertEqual(ExplainAnalyzer(explain_plan, raw_query = query).analyze()['issues_detected'], individual.issues)
+        self.assertEqual(len(individual.issues), 7)
+
+class TestQueryFeatures(unittest.TestCase):
+
+    # Ensures parser-derived features drive the query-text checks instead of the raw-query regexes.
+    def test_features_drive_checks(self):
+        explain_plan = [
+            {'selectid': 0, 'order': 0, 'from': 0, 'detail': 'SCAN users'}
+        ]
+        features = {
+            'like_patterns': ["'%john%'", "'smith%'"],
+            'where_functions': ['LOWER(email)'],
+            'has_or': True,
+            'has_distinct': True
+        }
+        analyzer = ExplainAnalyzer(explain_plan, raw_query = "SELECT 1", query_features = features)
+        result = analyzer.analyze()
+        issue_types = [issue['type'] for issue in result['issues_detected']]
+
+        self.assertEqual(issue_types.count('LIKE without index'), 1)
+        self.assertIn('Inefficient OR Conditions', issue_types)
+        self.assertIn('Functions on Indexed Columns', issue_types)
+        self.assertIn('DISTINCT Without Index', issue_types)
+
+    # Ensures keywords inside string literals are not mistaken for OR, DISTINCT or functions once features are used.
+    def test_literals_not_misread(self):
+        from query_parser import QueryParser
+        query = "SELECT name FROM users WHERE note = 'DISTINCT OR upper(x)'"
+        explain_plan = [
+            {'selectid': 0, 'order': 0, 'from': 0, 'detail': 'SCAN users'}
+        ]
+        analyzer = ExplainAnalyzer(explain_plan, raw_query = query, query_features = QueryParser(query).get_query_features())
+        result = analyzer.analyze()
+
+        self.assertEqual([issue['type'] for issue in result['issues_detected']], ['Full Table Scan'])
+
+
+class TestProfiledAnalysis(unittest.TestCase):
+
+    # Builds a profile as DBConnector records it.
+    def profile(self, wall_ms, vm_steps = 1000, rows = 10):
+        return {'wall_ms': wall_ms, 'vm_steps': vm_steps, 'rows': rows, 'truncated': False, 'statements': []}
+
+    # Ensures the same full scan ranks low when it measured 2 ms and high when it measured 2 s.
+    def test_cost_ranks_issues(self):
+        explain_plan = [{'id': 2, 'parent': 0, 'notused': 0, 'detail': 'SCAN users'}]
+        fast = ExplainAnalyzer(explain_plan, profile = self.profile(2.0)).analyze()['issues_detected']
+        slow = ExplainAnalyzer(explain_plan, profile = self.profile(2000.0)).analyze()['issues_detected']
+
+        self.assertEqual([(issue['type'], issue['severity'], issue['cost_ms']) for issue in fast], [('Full Table Scan', 'low', 2.0)])
+        self.assertEqual([issue['type'] for issue in slow], ['Full Table Scan', 'Slow Execution'])
+        self.assertTrue(all(issue['severity'] == 'high' for issue in slow))
+
+    # Ensures a run doing many VM steps per returned row is flagged, unless its result was truncated.
+    def test_excessive_vm_steps(self):
+        explain_plan = [{'id': 2, 'parent': 0, 'notused': 0, 'detail': 'SCAN users'}]
+        profile = self.profile(50.0, vm_steps = 2000000, rows = 2)
+        issues = ExplainAnalyzer(explain_plan, profile = profile).analyze()['issues_detected']
+        self.assertIn('Excessive VM Steps', [issue['type'] for issue in issues])
+
+        profile['truncated'] = True
+        issues = ExplainAnalyzer(explain_plan, profile = profile).analyze()['issues_detected']
+        self.assertNotIn('Excessive VM Steps', [issue['type'] for issue in issues])
+
 
 # Run the tests.
 runner = unittest.TextTestRunner(verbosity = 2, buffer = False) 
@@ -430,4 +538,13 @@ suite7 = unittest.TestLoader().loadTestsFromTestCase(TestDistinctWithoutIndex)
 runner.run(suite7)
 
 suite8 = unittest.TestLoader().loadTestsFromTestCase(TestExplainAnalyzer)
-runner.run(suite8)
\ No newline at end of file
+runner.run(suite8)
+
+suite9 = unittest.TestLoader().loadTestsFromTestCase(TestQueryFeatures)
+runner.run(suite9)
+
+suite10 = unittest.TestLoader().loadTestsFromTestCase(TestPlanPosition)
+runner.run(suite10)
+
+suite11 = unittest.TestLoader().loadTestsFromTestCase(TestProfiledAnalysis)
+runner.run(suite11)
\ No newline at end of file
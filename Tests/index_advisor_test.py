@@ -0,0 +1,106 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# index_advisor_test.py
+
+# Resource importing and management.
+import unittest
+import sqlite3
+from index_advisor import IndexAdvisor, IndexCandidate
+from schema_catalog import SchemaCatalog
+
+# Testing suite for candidate scoring.
+class TestIndexCandidate(unittest.TestCase):
+
+    # Tests that equality columns lead and a range column follows.
+    def test_columns_and_score(self):
+        candidate = IndexCandidate("users", ("city",), "age", (), 1)
+        self.assertEqual(candidate.columns(4), ("city", "age"))
+        self.assertEqual(candidate.score(("city", "age")), 3)
+        self.assertEqual(candidate.score(("city",)), 2)
+        self.assertEqual(candidate.score(("age", "city")), 0)
+
+
+# Testing suite for workload-level index recommendations.
+class TestIndexAdvisor(unittest.TestCase):
+
+    # Tests that overlapping per-query candidates merge into one index serving all of them.
+    def test_overlapping_queries_share_index(self):
+        advisor = IndexAdvisor()
+        advisor.add_query("SELECT * FROM users WHERE city = 'NY' AND age > 30", weight = 5)
+        advisor.add_query("SELECT * FROM users WHERE city = 'LA'", weight = 3)
+        advisor.add_query("SELECT * FROM users WHERE city = 'SF' AND age < 20")
+        recommendations = advisor.recommend()
+        self.assertEqual(len(recommendations), 1)
+        self.assertEqual(recommendations[0]["columns"], ["city", "age"])
+        self.assertEqual(recommendations[0]["statement"], "CREATE INDEX IF NOT EXISTS idx_users_city_age ON users (city, age);")
+
+    # Tests that queries of the same shape accumulate weight instead of adding candidates.
+    def test_repeated_shapes_accumulate_weight(self):
+        advisor = IndexAdvisor()
+        for value in range(10):
+            advisor.add_query(f"SELECT * FROM orders WHERE status = 'state{value}'")
+        self.assertEqual(len(advisor.workload), 1)
+        self.assertEqual(advisor.recommend()[0]["benefit"], 20)
+
+    # Tests that aliases resolve join, filter and sort columns to their tables, with the heavier index ranked first.
+    def test_joins_and_sort(self):
+        advisor = IndexAdvisor()
+        advisor.add_query("SELECT u.name FROM users u JOIN orders o ON u.id = o.user_id WHERE o.status = 'paid' ORDER BY o.created_at", weight = 4)
+        advisor.add_query("SELECT department, COUNT(*) FROM employees GROUP BY department")
+        recommendations = advisor.recommend()
+        statements = [recommendation["statement"] for recommendation in recommendations]
+        self.assertEqual(recommendations[0]["table"], "orders")
+        self.assertEqual(recommendations[0]["columns"], ["status", "user_id", "created_at"])
+        self.assertIn("CREATE INDEX IF NOT EXISTS idx_employees_department ON employees (department);", statements)
+        self.assertNotIn("users", [recommendation["table"] for recommendation in recommendations])
+        self.assertEqual(recommendations, sorted(recommendations, key = lambda recommendation: -recommendation["benefit"]))
+
+    # Tests that subquery predicates are advised and non-sargable predicates are ignored.
+    def test_subqueries_and_non_sargable(self):
+        advisor = IndexAdvisor()
+        advisor.add_query("SELECT name FROM employees WHERE salary <> 5 AND dept IN (SELECT id FROM departments WHERE city = 'NY')")
+        tables = {recommendation["table"] : recommendation["columns"] for recommendation in advisor.recommend()}
+        self.assertEqual(tables, {"employees" : ["dept"], "departments" : ["city"]})
+
+    # Tests that only the inner side of a join is indexed: the joined table of an ON clause, or the later FROM table.
+    def test_join_inner_side(self):
+        advisor = IndexAdvisor()
+        advisor.add_query("SELECT * FROM orders o JOIN users u ON o.user_id = u.account_id")
+        advisor.add_query("SELECT * FROM items i, products p WHERE i.product_id = p.code")
+        tables = {recommendation["table"] : recommendation["columns"] for recommendation in advisor.recommend()}
+        self.assertEqual(tables, {"users" : ["account_id"], "products" : ["code"]})
+
+    # Tests that columns an existing index or INTEGER PRIMARY KEY already lead are not advised, while new access still is.
+    def test_catalog_skips_served_columns(self):
+        conn = sqlite3.connect(":memory:")
+        conn.executescript("""
+            CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT, city TEXT, age INTEGER);
+            CREATE INDEX idx_users_email ON users (Email);
+        """)
+        advisor = IndexAdvisor(catalog = SchemaCatalog(conn))
+        conn.close()
+        advisor.add_query("SELECT * FROM orders o JOIN users u ON o.user_id = u.id")
+        advisor.add_query("SELECT * FROM users WHERE email = 'a@x.com'")
+        advisor.add_query("SELECT * FROM users WHERE city = 'NY' AND age > 30")
+        recommendations = advisor.recommend()
+        self.assertEqual([(recommendation["table"], recommendation["columns"]) for recommendation in recommendations], [("users", ["city", "age"])])
+
+    # Tests that a query the parser cannot handle is reported in skipped rather than silently dropped.
+    def test_unparseable_query_skipped(self):
+        advisor = IndexAdvisor()
+        advisor.add_query("")
+        advisor.add_query("SELECT * FROM users WHERE city = 'NY'")
+        self.assertEqual(len(advisor.recommend()), 1)
+        self.assertEqual([entry["query"] for entry in advisor.skipped], [""])
+
+    # Tests that max_indexes bounds the recommendation set.
+    def test_max_indexes(self):
+        advisor = IndexAdvisor(max_indexes = 1)
+        advisor.add_query("SELECT * FROM a WHERE x = 1")
+        advisor.add_query("SELECT * FROM b WHERE y = 1")
+        self.assertEqual(len(advisor.recommend()), 1)
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestIndexCandidate))
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestIndexAdvisor))
@@ -0,0 +1,80 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# index_evaluator_test.py
+
+# Resource importing and management.
+import unittest
+import tempfile
+import sqlite3
+import os
+from db_connector import DBConnector
+from index_evaluator import IndexEvaluator, compare_plans
+
+# Testing suite for plan comparison.
+class TestComparePlans(unittest.TestCase):
+
+    # Tests that a scan turned into a search through the new index is verified.
+    def test_scan_to_search(self):
+        before = [{"detail": "SCAN users"}, {"detail": "USE TEMP B-TREE FOR ORDER BY"}]
+        after = [{"detail": "SEARCH users USING INDEX idx_users_city (city=?)"}, {"detail": "USE TEMP B-TREE FOR ORDER BY"}]
+        result = compare_plans(before, after, "idx_users_city")
+        self.assertTrue(result["verified"])
+        self.assertEqual(result["scans_removed"], ["SCAN users"])
+        self.assertEqual(result["temp_btrees_removed"], [])
+
+    # Tests that an unused index is not verified.
+    def test_unused_index(self):
+        before = [{"detail": "SCAN users"}]
+        self.assertFalse(compare_plans(before, before, "idx_users_city")["verified"])
+
+    # Tests that an index whose name is a prefix of the one the plan uses is not taken as used.
+    def test_index_name_prefix(self):
+        before = [{"detail": "SCAN users"}]
+        after = [{"detail": "SEARCH users USING COVERING INDEX idx_ab (a=?)"}]
+        self.assertFalse(compare_plans(before, after, "idx_a")["uses_index"])
+        self.assertTrue(compare_plans(before, after, "idx_ab")["verified"])
+        self.assertTrue(compare_plans(before, [{"detail": "SCAN users USING INDEX idx_a"}], "idx_a")["uses_index"])
+
+
+# Testing suite for evaluating candidate indexes on a schema clone.
+class TestIndexEvaluator(unittest.TestCase):
+
+    # Creates a temporary DB with an unindexed table.
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix = ".sqlite3")
+        os.close(handle)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, city TEXT, age INTEGER)")
+        conn.executemany("INSERT INTO users (name, city, age) VALUES (?, ?, ?)", [(f"user{i}", f"city{i % 10}", i % 70) for i in range(500)])
+        conn.commit()
+        conn.close()
+        self.db = DBConnector(db_path = self.path)
+        self.evaluator = IndexEvaluator(self.db, sample_rows = 100)
+
+    # Closes the evaluator and connector and removes the temporary DB.
+    def tearDown(self):
+        self.evaluator.close()
+        self.db.close()
+        os.remove(self.path)
+
+    # Tests that advisor candidates are proven on the clone and never created in the source file.
+    def test_evaluate_advised_indexes(self):
+        result = self.evaluator.evaluate("SELECT * FROM users WHERE city = 'city3' ORDER BY age")
+        self.assertEqual(result["baseline_plan"], ["SCAN users", "USE TEMP B-TREE FOR ORDER BY"])
+        candidate = result["candidates"][0]
+        self.assertTrue(candidate["verified"])
+        self.assertEqual(candidate["scans_removed"], ["SCAN users"])
+        self.assertEqual(candidate["temp_btrees_removed"], ["USE TEMP B-TREE FOR ORDER BY"])
+        self.assertEqual(self.db.execute_query("SELECT name FROM sqlite_master WHERE type = 'index'"), [])
+
+    # Tests that explicit statements are measured and dropped again, with useless ones left unverified.
+    def test_evaluate_explicit_statements(self):
+        statements = ["CREATE INDEX idx_users_name ON users (name)", "CREATE INDEX idx_users_city ON users (city)"]
+        candidates = self.evaluator.evaluate("SELECT * FROM users WHERE city = 'city1'", statements)["candidates"]
+        self.assertEqual([candidate["verified"] for candidate in candidates], [False, True])
+        self.assertIsNone(self.evaluator.clone.execute("SELECT 1 FROM sqlite_master WHERE type = 'index'").fetchone())
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestComparePlans))
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestIndexEvaluator))
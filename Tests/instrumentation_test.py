@@ -0,0 +1,67 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# instrumentation_test.py
+
+# Resource importing and management.
+import unittest
+from instrumentation import LatencyHistogram, StageTimer, MetricsRegistry
+
+# Testing suite for the LatencyHistogram class.
+class TestLatencyHistogram(unittest.TestCase):
+
+    # Tests counts, extremes and bucket placement.
+    def test_record(self):
+        histogram = LatencyHistogram()
+        for duration in (0.05, 3, 3, 40000):
+            histogram.record(duration)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["count"], 4)
+        self.assertEqual(snapshot["min_ms"], 0.05)
+        self.assertEqual(snapshot["max_ms"], 40000)
+        self.assertEqual(snapshot["buckets"], {"<=0.1ms" : 1, "<=5ms" : 2, ">10000ms" : 1})
+
+    # Tests bucket-based percentile estimates.
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for _ in range(99):
+            histogram.record(0.2)
+        histogram.record(700)
+        self.assertEqual(histogram.percentile(0.5), 0.25)
+        self.assertEqual(histogram.percentile(1.0), 1000)
+
+    # Tests that an empty histogram has no percentiles.
+    def test_empty(self):
+        self.assertIsNone(LatencyHistogram().percentile(0.5))
+
+# Testing suite for the StageTimer and MetricsRegistry classes.
+class TestStageTimer(unittest.TestCase):
+
+    # Tests that stages keep their counters and feed the registry.
+    def test_stages_recorded(self):
+        timer = StageTimer()
+        with timer.stage("execute") as stage:
+            stage["rows"] = 3
+            stage["bytes"] = 120
+        with timer.stage("parse"):
+            pass
+        timings = timer.as_dict()
+        self.assertEqual(timings["execute"]["rows"], 3)
+        self.assertEqual(timings["execute"]["bytes"], 120)
+        self.assertIn("total", timings)
+
+        registry = MetricsRegistry()
+        registry.record_timer(timer)
+        self.assertEqual(set(registry.snapshot()), {"execute", "parse", "total"})
+
+    # Tests that a stage raising an exception is still recorded.
+    def test_failed_stage_recorded(self):
+        timer = StageTimer()
+        with self.assertRaises(RuntimeError):
+            with timer.stage("execute"):
+                raise RuntimeError("boom")
+        self.assertIn("execute", timer.stages)
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestLatencyHistogram))
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestStageTimer))
@@ -0,0 +1,100 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# plan_tree_test.py
+
+# Resource importing and management.
+import unittest
+import sqlite3
+from plan_tree import PlanTree, PlanNode, SCAN, SEARCH, TEMP_BTREE, CORRELATED_SUBQUERY, MULTI_INDEX_OR, OR_BRANCH, COMPOUND, CONSTANT_ROW, MATERIALIZE
+
+# Testing suite for classifying single plan steps.
+class TestPlanNode(unittest.TestCase):
+
+    # Tests that SEARCH steps carry their table, alias, index and constraint columns.
+    def test_search_with_constraints(self):
+        node = PlanNode(3, 0, "SEARCH orders AS o USING COVERING INDEX idx_orders (user_id=? AND total>?)")
+        self.assertEqual((node.kind, node.table, node.alias, node.index), (SEARCH, "orders", "o", "idx_orders"))
+        self.assertTrue(node.covering)
+        self.assertEqual(node.constraints, [("user_id", "="), ("total", ">")])
+        self.assertTrue(node.uses_index)
+
+    # Tests full scans, older "SCAN TABLE" output and index scans.
+    def test_scans(self):
+        for detail in ("SCAN users", "SCAN TABLE users"):
+            node = PlanNode(2, 0, detail)
+            self.assertEqual((node.kind, node.table, node.uses_index), (SCAN, "users", False))
+        self.assertTrue(PlanNode(2, 0, "SCAN users USING INDEX user_idx").uses_index)
+        self.assertEqual(PlanNode(2, 0, "SCAN CONSTANT ROW").kind, CONSTANT_ROW)
+
+    # Tests the remaining step kinds.
+    def test_other_kinds(self):
+        self.assertEqual(PlanNode(1, 0, "use temp b-tree for order by ").purpose, "ORDER BY")
+        self.assertEqual(PlanNode(1, 0, "USE TEMP B-TREE FOR GROUP BY").kind, TEMP_BTREE)
+        self.assertEqual(PlanNode(1, 0, "CORRELATED SCALAR SUBQUERY 2").kind, CORRELATED_SUBQUERY)
+        self.assertEqual(PlanNode(1, 0, "MULTI-INDEX OR").kind, MULTI_INDEX_OR)
+        self.assertEqual(PlanNode(1, 0, "INDEX 1").kind, OR_BRANCH)
+        node = PlanNode(1, 0, "UNION USING TEMP B-TREE")
+        self.assertEqual((node.kind, node.purpose), (COMPOUND, "UNION USING TEMP B-TREE"))
+        self.assertTrue(PlanNode(1, 0, "SEARCH t USING AUTOMATIC COVERING INDEX (a=?)").uses_index)
+
+
+# Testing suite for rebuilding the tree from real and legacy plan rows.
+class TestPlanTree(unittest.TestCase):
+
+    # Returns the plan rows SQLite produces for a query.
+    def explain(self, query):
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        conn.executescript("""
+            CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, city TEXT, age INTEGER);
+            CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, total REAL);
+            CREATE INDEX idx_users_city ON users (city);
+            CREATE INDEX idx_users_name ON users (name);
+        """)
+        rows = [dict(row) for row in conn.execute(f"EXPLAIN QUERY PLAN {query}")]
+        conn.close()
+        return rows
+
+    # Tests that id/parent links nest subqueries and OR branches under their parents.
+    def test_nesting_from_parent_ids(self):
+        tree = PlanTree(self.explain("SELECT * FROM users WHERE city = 'a' OR name = 'b'"))
+        multi_index = tree.root.children[0]
+        self.assertEqual(multi_index.kind, MULTI_INDEX_OR)
+        self.assertEqual([child.kind for child in multi_index.children], [OR_BRANCH, OR_BRANCH])
+        self.assertEqual([node.index for node in tree if node.kind == SEARCH], ["idx_users_city", "idx_users_name"])
+
+    # Tests compound queries and materialized CTEs.
+    def test_compound_and_materialize(self):
+        tree = PlanTree(self.explain("SELECT id FROM users UNION SELECT user_id FROM orders"))
+        self.assertEqual(tree.root.children[0].kind, COMPOUND)
+        self.assertEqual(len([node for node in tree if node.kind == SCAN]), 2)
+        tree = PlanTree(self.explain("WITH t AS MATERIALIZED (SELECT city FROM users) SELECT * FROM t"))
+        self.assertEqual(tree.root.children[0].kind, MATERIALIZE)
+
+    # Tests that rows without id/parent hang flat off the root in their original order.
+    def test_legacy_rows(self):
+        rows = [
+            {'selectid': 0, 'order': 0, 'from': 0, 'detail': 'SCAN users USING INDEX user_idx'},
+            {'selectid': 1, 'order': 0, 'from': 0, 'detail': 'USE TEMP B-TREE FOR ORDER BY'}
+        ]
+        tree = PlanTree(rows)
+        self.assertEqual([node.parent for node in tree], [tree.root, tree.root])
+        self.assertEqual([node.kind for node in tree], [SCAN, TEMP_BTREE])
+
+    # Tests that a subquery's steps nest under it, apart from the outer query's steps.
+    def test_subquery_nesting(self):
+        rows = [
+            {'id': 2, 'parent': 0, 'detail': 'SCAN users'},
+            {'id': 5, 'parent': 0, 'detail': 'CORRELATED SCALAR SUBQUERY 1'},
+            {'id': 9, 'parent': 5, 'detail': 'SEARCH orders USING INDEX idx_orders (user_id=?)'},
+            {'id': 20, 'parent': 0, 'detail': 'USE TEMP B-TREE FOR ORDER BY'}
+        ]
+        tree = PlanTree(rows)
+        self.assertEqual([child.kind for child in tree.root.children], [SCAN, CORRELATED_SUBQUERY, TEMP_BTREE])
+        self.assertEqual(tree.nodes[2].parent, tree.nodes[1])
+        self.assertEqual(tree.to_dict()[1]["children"][0]["constraints"], ["user_id"])
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestPlanNode))
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestPlanTree))
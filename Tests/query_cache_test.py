@@ -0,0 +1,111 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# query_cache_test.py
+
+# Resource importing and management.
+import unittest
+from unittest.mock import patch
+import sqlparse
+from query_cache import LRUCache, SummaryCache
+from query_parser import QueryParser
+
+# Testing suite for the LRUCache class.
+class TestLRUCache(unittest.TestCase):
+
+    # Tests that the least recently used entry is evicted first.
+    def test_eviction_order(self):
+        cache = LRUCache(max_size = 2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    # Tests hit and miss counters.
+    def test_counters(self):
+        cache = LRUCache(max_size = 4)
+        cache.get("missing")
+        cache.put("key", "value")
+        cache.get("key")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+
+# Testing suite for the SummaryCache class.
+class TestSummaryCache(unittest.TestCase):
+
+    # Tests that a repeated shape skips sqlparse.parse and reports the new literals.
+    def test_repeat_shape_skips_parse(self):
+        cache = SummaryCache(max_size = 8)
+        cache.summarize("SELECT * FROM users WHERE age > 30 LIMIT 10")
+        with patch("query_parser.sqlparse.parse", wraps = sqlparse.parse) as parse:
+            summary = cache.summarize("SELECT * FROM users WHERE age > 45 LIMIT 20")
+        self.assertEqual(parse.call_count, 0)
+        self.assertEqual(summary["Conditions"], ["age > 45"])
+        self.assertEqual(summary["Limit"], 20)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    # Tests that re-bound summaries match a fresh parse for a query with subqueries.
+    def test_rebind_matches_fresh_parse(self):
+        cache = SummaryCache(max_size = 8)
+        cache.summarize("SELECT name FROM employees WHERE dept IN (SELECT id FROM departments WHERE city = 'NY') AND age > 30")
+        query = "SELECT name FROM employees WHERE dept IN (SELECT id FROM departments WHERE city = 'LA') AND age > 41"
+        self.assertEqual(cache.summarize(query), QueryParser(query).summarize_query())
+
+    # Tests that an ambiguous literal mapping falls back to parsing.
+    def test_ambiguous_literals_reparse(self):
+        cache = SummaryCache(max_size = 8)
+        cache.summarize("SELECT * FROM t WHERE a = 5 AND b = 5")
+        summary = cache.summarize("SELECT * FROM t WHERE a = 5 AND b = 7")
+        self.assertEqual(summary["Conditions"], ["a = 5", "AND", "b = 7"])
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    # Tests that cached query features are re-bound along with the summary.
+    def test_lookup_rebinds_features(self):
+        cache = SummaryCache(max_size = 8)
+        cache.lookup("SELECT * FROM users WHERE name LIKE 'jo%'")
+        profile = cache.lookup("SELECT * FROM users WHERE name LIKE '%jo'")
+        self.assertEqual(profile["features"]["like_patterns"], ["'%jo'"])
+        self.assertEqual(cache.stats()["hits"], 1)
+
+
+    # Tests that a query differing only in identifier case gets its own summary, matching a fresh parse.
+    def test_identifier_case_not_shared(self):
+        cache = SummaryCache(max_size = 8)
+        cache.summarize("SELECT * FROM Users INNER JOIN Orders ON Orders.uid = Users.id")
+        query = "SELECT * FROM users INNER JOIN orders ON orders.uid = users.id"
+        self.assertEqual(cache.summarize(query), QueryParser(query).summarize_query())
+        self.assertEqual(cache.summarize(query)["Tables"], ["users", "orders"])
+
+    # Tests that changing a returned summary leaves the cached entry untouched.
+    def test_returned_summary_is_a_copy(self):
+        cache = SummaryCache(max_size = 8)
+        query = "SELECT * FROM t WHERE a = 5"
+        cache.summarize(query)["Tables"].append("BAD")
+        cache.summarize(query)["Tables"].append("BAD")
+        self.assertEqual(cache.summarize(query)["Tables"], ["t"])
+        self.assertEqual(cache.stats()["hits"], 2)
+
+    # Tests that queries differing only in their comments do not share a summary that echoes the comment.
+    def test_comments_not_shared(self):
+        cache = SummaryCache(max_size = 8)
+        cache.summarize("SELECT * FROM t WHERE a = 2 -- c")
+        query = "SELECT * FROM t WHERE a = 2 /* z */"
+        self.assertEqual(cache.summarize(query), QueryParser(query).summarize_query())
+        cache.summarize("SELECT * FROM t WHERE a = 2 -- 2")
+        query = "SELECT * FROM t WHERE a = 3 -- 2"
+        self.assertEqual(cache.summarize(query), QueryParser(query).summarize_query())
+
+    # Tests that an integer written in a non-canonical form is not re-bound from its parsed value.
+    def test_non_canonical_integer_reparses(self):
+        cache = SummaryCache(max_size = 8)
+        cache.summarize("SELECT * FROM t LIMIT 01")
+        self.assertEqual(cache.summarize("SELECT * FROM t LIMIT 3")["Limit"], 3)
+        self.assertEqual(cache.summarize("SELECT * FROM t WHERE a = 2 LIMIT 01")["Limit"], 1)
+        self.assertEqual(cache.summarize("SELECT * FROM t WHERE a = 1 LIMIT 03")["Limit"], 3)
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestLRUCache))
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestSummaryCache))
@@ -0,0 +1,53 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# query_fingerprint_test.py
+
+# Resource importing and management.
+import unittest
+from query_fingerprint import fingerprint, fingerprint_id, normalize_query, extract_literals
+
+# Testing suite for the fingerprint function.
+class TestFingerprint(unittest.TestCase):
+
+    # Tests that whitespace, case and literals are normalized away.
+    def test_same_shape_same_fingerprint(self):
+        first = fingerprint("SELECT * FROM users WHERE age > 30 AND name = 'Bob'")
+        second = fingerprint("select *   from USERS\n where age > 45 and name = 'Alice';")
+        self.assertEqual(first, second)
+        self.assertEqual(first, "select * from users where age > ? and name = ?")
+
+    # Tests that comments are removed.
+    def test_comments_removed(self):
+        query = "SELECT id /* primary key */ FROM users -- all users\nWHERE id = 1"
+        self.assertEqual(fingerprint(query), "select id from users where id = ?")
+
+    # Tests that IN-lists of any length collapse to a single placeholder.
+    def test_in_list_collapsed(self):
+        short = fingerprint("SELECT * FROM t WHERE id IN (1, 2)")
+        long = fingerprint("SELECT * FROM t WHERE id in (1,2,3,4,'x')")
+        self.assertEqual(short, long)
+        self.assertEqual(short, "select * from t where id in (?)")
+
+    # Tests that numbers inside identifiers and quoted identifiers are kept.
+    def test_identifiers_kept(self):
+        self.assertEqual(fingerprint('SELECT t1.col2, "Col 3" FROM t1 WHERE t1.x = 3'), 'select t1.col2, "Col 3" from t1 where t1.x = ?')
+
+    # Tests escaped quotes, hex, blob and float literals.
+    def test_literal_forms(self):
+        literals = extract_literals("SELECT * FROM t WHERE a = 'it''s' AND b = 0x1F AND c = x'ff' AND d = 1.5e3")
+        self.assertEqual(literals, ("'it''s'", "0x1F", "x'ff'", "1.5e3"))
+
+    # Tests that the compact id is stable and distinguishes shapes.
+    def test_fingerprint_id(self):
+        self.assertEqual(fingerprint_id("SELECT * FROM t WHERE a = 1"), fingerprint_id("select * from t where a = 2"))
+        self.assertNotEqual(fingerprint_id("SELECT * FROM t WHERE a = 1"), fingerprint_id("SELECT * FROM t WHERE b = 1"))
+        self.assertEqual(len(fingerprint_id("SELECT 1")), 16)
+
+    # Tests that literals are returned alongside the fingerprint in order.
+    def test_normalize_returns_literals(self):
+        shape, literals = normalize_query("SELECT * FROM users WHERE age > 30 AND name = 'Bob'")
+        self.assertEqual(literals, ("30", "'Bob'"))
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestFingerprint))
@@ -4,6 +4,8 @@
 
 # Library importing and management. 
 import unittest
+from unittest.mock import patch
+import sqlparse
 from query_parser import QueryParser  
 
 # Testing suite for the get_tables method. 
@@ -543,6 +545,66 @@ class TestSummarizeQueryAdvanced(unittest.TestCase):
         self.assertTrue(any('amount > 100000' in cond for cond in nested_subquery['Conditions']))
         
 
+# Testing suite for the single-pass extraction engine.
+class TestSinglePassExtraction(unittest.TestCase):
+
+    # Tests that nested subqueries are summarized from the outer parse without re-parsing.
+    def test_subqueries_parse_once(self):
+        query = "SELECT name FROM employees WHERE department_id IN (SELECT department_id FROM projects WHERE project_id IN (SELECT project_id FROM budgets WHERE amount > 100000))"
+        with patch("query_parser.sqlparse.parse", wraps = sqlparse.parse) as parse:
+            summary = QueryParser(query).summarize_query()
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(len(summary['Subqueries']), 2)
+
+    # Tests that the individual getters agree with the summary.
+    def test_getters_match_summary(self):
+        query = "SELECT a, b FROM t JOIN s ON t.id = s.t_id WHERE x = 1 GROUP BY a HAVING count(*) > 1 ORDER BY a DESC LIMIT 5 OFFSET 10"
+        qp = QueryParser(query)
+        summary = qp.summarize_query()
+        self.assertEqual(summary['Tables'], qp.get_tables())
+        self.assertEqual(summary['Joins'], ["JOIN s ON t.id = s.t_id"])
+        self.assertEqual(summary['GROUP BY clauses'], ["a"])
+        self.assertEqual(summary['HAVING clauses'], ["count(*) > 1"])
+        self.assertEqual(summary['Limit'], (10, 5))
+
+    # Tests that clauses inside a subquery do not leak into the outer query.
+    def test_subquery_clauses_stay_local(self):
+        query = "SELECT id FROM users WHERE id IN (SELECT user_id FROM orders GROUP BY user_id ORDER BY user_id LIMIT 3)"
+        summary = QueryParser(query).summarize_query()
+        self.assertEqual(summary['GROUP BY clauses'], [])
+        self.assertEqual(summary['Limit'], None)
+        self.assertEqual(summary['Subqueries'][0]['GROUP BY clauses'], ["user_id"])
+        self.assertEqual(summary['Subqueries'][0]['Limit'], 3)
+
+    # Tests that the subquery tree records offsets into the outer query and links nested levels.
+    def test_subquery_tree_offsets(self):
+        query = "SELECT * FROM (SELECT id FROM users) u WHERE u.id IN (SELECT user_id FROM orders WHERE total > (SELECT avg(total) FROM orders))"
+        tree = QueryParser(query).get_subquery_tree()
+        self.assertEqual(len(tree), 2)
+        self.assertEqual(query[tree[0]['start']:tree[0]['end']], "(SELECT id FROM users)")
+        nested = tree[1]['subqueries'][0]
+        self.assertEqual(nested['depth'], 2)
+        self.assertEqual(nested['parent_start'], tree[1]['start'])
+        self.assertEqual(query[nested['start']:nested['end']], "(SELECT avg(total) FROM orders)")
+
+    # Tests that table aliases map back to real table names and derived tables map to None.
+    def test_table_aliases(self):
+        query = "SELECT * FROM users u JOIN orders AS o ON u.id = o.user_id JOIN (SELECT id FROM items) i ON i.id = o.item_id"
+        self.assertEqual(QueryParser(query).get_table_aliases(), {"users" : "users", "u" : "users", "orders" : "orders", "o" : "orders", "i" : None})
+
+    # Tests that query features come from tokens, so literals and nested queries are classified correctly.
+    def test_query_features(self):
+        query = "SELECT DISTINCT name FROM users WHERE LOWER(TRIM(email)) = 'a or b' AND name NOT LIKE '%x' AND id IN (SELECT user_id FROM orders WHERE upper(code) LIKE 'A%')"
+        features = QueryParser(query).get_query_features()
+        self.assertEqual(features['like_patterns'], ["'%x'", "'A%'"])
+        self.assertEqual(features['where_functions'], ["LOWER(TRIM(email))", "upper(code)"])
+        self.assertEqual(features['function_columns'], [((None, "email"),), ((None, "code"),)])
+        self.assertEqual(features['tables'], {"users" : "users", "orders" : "orders"})
+        self.assertEqual(features['distinct_columns'], ("name",))
+        self.assertFalse(features['has_or'])
+        self.assertTrue(features['has_distinct'])
+        
+
 # Runs the tests. 
 unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestGetTables))
 unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestGetColumns))
@@ -553,4 +615,5 @@ unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestGe
 unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestGetHaving))
 unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestGetLimit))
 unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestSummarizeQuery))
-unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestSummarizeQueryAdvanced))
\ No newline at end of file
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestSummarizeQueryAdvanced))
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestSinglePassExtraction))
\ No newline at end of file
@@ -0,0 +1,95 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# query_rewriter_test.py
+
+# Resource importing and management.
+import unittest
+import tempfile
+import sqlite3
+import os
+from db_connector import DBConnector
+from query_rewriter import QueryRewriter, function_to_collate_nocase, like_prefix_to_range
+from suggestions import Suggestions
+
+# Testing suite for the query rewrite engine.
+class TestQueryRewriter(unittest.TestCase):
+
+    # Creates a temporary DB with a NOCASE-indexed email column, an indexed name column and rows of mixed case and NULLs.
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix = ".sqlite3")
+        os.close(handle)
+        conn = sqlite3.connect(self.path)
+        conn.executescript("""
+            CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT COLLATE NOCASE, age INTEGER);
+            CREATE INDEX idx_users_name ON users (name);
+            CREATE INDEX idx_users_email ON users (email);
+        """)
+        conn.executemany("INSERT INTO users (name, email, age) VALUES (?, ?, ?)", [
+            ("John", "A@x.com", 30), ("joan", "a@x.com", None), ("JOE", None, 30), ("Jp", "b@x.com", 41),
+            ("Ann", "JOHN@x.com", 30), (None, "a@x.com", 25), ("jo", "c@x.com", None)
+        ])
+        conn.commit()
+        conn.close()
+        self.db = DBConnector(db_path = self.path, pooled = False)
+        self.rewriter = QueryRewriter(self.db)
+
+    # Closes the connection and removes the temporary DB.
+    def tearDown(self):
+        self.db.close()
+        os.remove(self.path)
+
+    # Returns a query's rows as a sorted list.
+    def rows(self, query):
+        return sorted((tuple(row.values()) for row in self.db.execute_query(query)), key = repr)
+
+    # Tests the condition rewrites, including the literals and patterns they must leave alone.
+    def test_condition_rewrites(self):
+        self.assertEqual(function_to_collate_nocase("LOWER(email) = 'a@x.com'"), "email = 'a@x.com' COLLATE NOCASE")
+        self.assertEqual(function_to_collate_nocase("upper(u.email) = 'A@X.COM'"), "u.email = 'A@X.COM' COLLATE NOCASE")
+        self.assertIsNone(function_to_collate_nocase("LOWER(email) = 'A@x.com'"))
+        self.assertEqual(like_prefix_to_range("name LIKE 'Jo%'"), "(name >= 'JO' AND name < 'jp' AND name LIKE 'Jo%')")
+        self.assertIsNone(like_prefix_to_range("name LIKE '%jo'"))
+        self.assertIsNone(like_prefix_to_range("name LIKE 'j_%'"))
+
+    # Tests that every candidate returns the same rows as the original query.
+    def test_candidates_preserve_results(self):
+        for query in ("SELECT * FROM users WHERE LOWER(email) = 'a@x.com' OR name LIKE 'jo%'",
+                      "SELECT * FROM users WHERE age = 30 OR name = 'Ann' OR email = 'a@x.com'",
+                      "SELECT DISTINCT age FROM users WHERE age = 30 OR name LIKE 'J%'"):
+            candidates = list(self.rewriter.candidates(query))
+            self.assertTrue(candidates)
+            for name, candidate in candidates:
+                self.assertEqual(self.rows(candidate), self.rows(query), f"{name}: {candidate}")
+
+    # Tests that a rewrite is returned only when its plan is better: COLLATE NOCASE can use the NOCASE email index, not the BINARY name index.
+    def test_only_better_plans_returned(self):
+        result = self.rewriter.rewrite("SELECT * FROM users WHERE LOWER(email) = 'a@x.com'")
+        self.assertEqual(result["baseline"]["scans"], 1)
+        self.assertEqual([rewrite["rewrite"] for rewrite in result["rewrites"]], ["function_to_collate_nocase"])
+        self.assertEqual(result["rewrites"][0]["plan"], ["SEARCH users USING INDEX idx_users_email (email=?)"])
+        self.assertEqual(self.rewriter.rewrite("SELECT * FROM users WHERE LOWER(name) = 'jo'")["rewrites"], [])
+
+    # Tests that the combined rewrite turns an OR of two unindexable conditions into two index searches.
+    def test_combined_rewrite(self):
+        rewrites = self.rewriter.rewrite("SELECT * FROM users WHERE LOWER(email) = 'a@x.com' OR name LIKE 'Jo%'")["rewrites"]
+        self.assertEqual(rewrites[0]["rewrite"], "function_to_collate_nocase+like_prefix_to_range+or_to_union")
+        self.assertEqual(rewrites[0]["scans"], 0)
+        self.assertIn("UNION ALL", rewrites[0]["query"])
+
+    # Tests that an OR is not split when ordering, limits or aggregates would change the result.
+    def test_or_not_split(self):
+        for query in ("SELECT * FROM users WHERE age = 30 OR name = 'Ann' ORDER BY name",
+                      "SELECT * FROM users WHERE age = 30 OR name = 'Ann' LIMIT 2",
+                      "SELECT COUNT(*) FROM users WHERE age = 30 OR name = 'Ann'"):
+            self.assertEqual(list(self.rewriter.candidates(query)), [])
+
+    # Tests that Suggestions hands out the verified rewrite for the issue it fixes.
+    def test_suggestion_uses_rewrite(self):
+        rewrites = self.rewriter.rewrite("SELECT * FROM users WHERE LOWER(email) = 'a@x.com'")["rewrites"]
+        issues = [{"type" : "Functions on Indexed Columns", "message" : "Functions used in WHERE clause may disable index usage: ['LOWER(email)']"}]
+        suggestion = Suggestions(issues, rewrites = rewrites).generate_suggestions()[0]
+        self.assertIn("email = 'a@x.com' COLLATE NOCASE", suggestion)
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestQueryRewriter))
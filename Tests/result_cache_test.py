@@ -0,0 +1,64 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# result_cache_test.py
+
+# Resource importing and management.
+import unittest
+from unittest.mock import patch
+import tempfile
+import os
+from result_cache import ResultCache, file_version
+
+# Testing suite for the TTL and size-bounded analysis result cache.
+class TestResultCache(unittest.TestCase):
+
+    # Creates a temporary DB file.
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix = ".sqlite3")
+        os.close(handle)
+
+    # Removes the temporary DB file.
+    def tearDown(self):
+        os.remove(self.path)
+
+    # Tests that queries of the same shape with different literals or identifier case get different keys, and whitespace does not.
+    def test_key_includes_literals(self):
+        key = ResultCache.key("SELECT * FROM users WHERE age > 26", self.path, 1)
+        self.assertEqual(key, ResultCache.key("SELECT * FROM users WHERE age > 26", self.path, 1))
+        self.assertNotEqual(key, ResultCache.key("SELECT * FROM Users WHERE age > 26", self.path, 1))
+        self.assertNotEqual(key, ResultCache.key("SELECT * FROM users WHERE age > 26 -- audit", self.path, 1))
+        self.assertNotEqual(ResultCache.key("SELECT * FROM users WHERE age > 26 -- a", self.path, 1),
+                            ResultCache.key("SELECT * FROM users WHERE age > 26 /* b */", self.path, 1))
+        self.assertNotEqual(key, ResultCache.key("SELECT * FROM users WHERE age > 31", self.path, 1))
+        self.assertNotEqual(key, ResultCache.key("SELECT * FROM users WHERE age > 26", self.path, 2))
+
+    # Tests that writing to the DB file or its WAL changes the file version.
+    def test_file_version(self):
+        version = file_version(self.path)
+        with open(self.path + "-wal", "wb") as handle:
+            handle.write(b"frame")
+        self.addCleanup(os.remove, self.path + "-wal")
+        self.assertNotEqual(file_version(self.path), version)
+
+    # Tests that entries expire after ttl seconds.
+    def test_ttl_expiry(self):
+        cache = ResultCache(max_size = 4, ttl = 60)
+        with patch("result_cache.time.monotonic", return_value = 1000.0):
+            cache.put("key", {"issues" : []})
+            self.assertEqual(cache.get("key"), {"issues" : []})
+        with patch("result_cache.time.monotonic", return_value = 1060.0):
+            self.assertIsNone(cache.get("key"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+        self.assertEqual(cache.stats()["size"], 0)
+
+    # Tests that the least recently used entry is evicted beyond max_size.
+    def test_size_eviction(self):
+        cache = ResultCache(max_size = 1, ttl = 60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestResultCache))
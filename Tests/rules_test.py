@@ -0,0 +1,85 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# rules_test.py
+
+# Resource importing and management.
+import unittest
+from unittest.mock import patch
+from config import OPTIMIZATION_THRESHOLDS
+from explain_analyzer import ExplainAnalyzer
+from suggestions import Suggestions
+from plan_tree import SCAN, TEMP_BTREE, CORRELATED_SUBQUERY
+from rules import Rule, RULES, RULES_BY_ID, RULES_BY_KIND, RULES_BY_TYPE, register, unregister, dispatch_table
+
+# Testing suite for the rule registry.
+class TestRuleRegistry(unittest.TestCase):
+
+    # Tests that the built-in rules are registered once, in reporting order, and indexed by plan-step kind and issue type.
+    def test_builtin_rules_indexed(self):
+        self.assertEqual([rule.id for rule in RULES][:3], ["full_table_scan", "unnecessary_filesort", "inefficient GROUP BY"])
+        self.assertEqual(set(OPTIMIZATION_THRESHOLDS), set(RULES_BY_ID))
+        self.assertEqual([rule.id for rule in RULES_BY_KIND[SCAN]], ["full_table_scan"])
+        self.assertEqual(len(RULES_BY_KIND[TEMP_BTREE]), 2)
+        self.assertIs(RULES_BY_TYPE["LIKE without index"], RULES_BY_ID["like_without_index"])
+
+    # Tests that an id can only be registered once.
+    def test_duplicate_id_rejected(self):
+        with self.assertRaises(ValueError):
+            register(Rule("full_table_scan", "Full Table Scan", "high", None, ""))
+
+    # Tests that a plugged-in rule runs only when enabled in OPTIMIZATION_THRESHOLDS and supplies its own suggestion.
+    def test_custom_rule(self):
+        rule = register(Rule(
+            "correlated_subquery", "Correlated Subquery", "medium",
+            lambda detail, uses_index, purpose, level, state: f"Subquery runs once per outer row: '{detail}'",
+            "Rewrite the correlated subquery as a JOIN. ({message})",
+            kinds = (CORRELATED_SUBQUERY,)
+        ))
+        self.addCleanup(unregister, rule.id)
+        explain_plan = [{'id': 2, 'parent': 0, 'notused': 0, 'detail': 'CORRELATED SCALAR SUBQUERY 1'}]
+
+        self.assertEqual(ExplainAnalyzer(explain_plan).analyze()['issues_detected'], [])
+        with patch.dict(OPTIMIZATION_THRESHOLDS, {"correlated_subquery": True}):
+            issues = ExplainAnalyzer(explain_plan).analyze()['issues_detected']
+        self.assertEqual(issues, [{
+            "type": "Correlated Subquery",
+            "message": "Subquery runs once per outer row: 'CORRELATED SCALAR SUBQUERY 1'",
+            "severity": "medium"
+        }])
+        self.assertEqual(Suggestions(issues).generate_suggestions(), [
+            "Rewrite the correlated subquery as a JOIN. (Subquery runs once per outer row: 'CORRELATED SCALAR SUBQUERY 1')"
+        ])
+
+    # Tests that unregistering removes the rule from every index.
+    def test_unregister(self):
+        register(Rule("temporary_rule", "Temporary", "low", lambda detail, uses_index, purpose, level, state: None, "", kinds = (SCAN,)))
+        unregister("temporary_rule")
+        self.assertNotIn("temporary_rule", RULES_BY_ID)
+        self.assertNotIn("Temporary", RULES_BY_TYPE)
+        self.assertEqual([rule.id for rule in RULES_BY_KIND[SCAN]], ["full_table_scan"])
+
+
+    # Tests that the cached dispatch table for a set of rule ids is rebuilt when a rule with one of those ids is registered or removed.
+    def test_dispatch_table_follows_registry(self):
+        rule_ids = ["full_table_scan", "temporary_rule"]
+        self.assertEqual([rule.id for rule in dispatch_table(rule_ids)[0]], ["full_table_scan"])
+        register(Rule("temporary_rule", "Temporary", "low", lambda features, state: [], ""))
+        rules, dispatch, query_rules = dispatch_table(rule_ids)
+        self.assertEqual([rule.id for rule in rules], ["full_table_scan", "temporary_rule"])
+        self.assertEqual([position for position, detect, issue in dispatch["SCAN users"][3]], [0])
+        self.assertEqual([(position, rule.id) for position, rule in query_rules], [(1, "temporary_rule")])
+        unregister("temporary_rule")
+        self.assertEqual([rule.id for rule in dispatch_table(rule_ids)[0]], ["full_table_scan"])
+
+    # Tests that a step is classified once and handed only to the rules registered for its kind and purpose.
+    def test_dispatch_by_kind_and_purpose(self):
+        rules, dispatch, query_rules = dispatch_table(["full_table_scan", "unnecessary_filesort", "inefficient GROUP BY"])
+        kind, uses_index, purpose, visits = dispatch["USE TEMP B-TREE FOR GROUP BY"]
+        self.assertEqual((kind, uses_index, purpose), (TEMP_BTREE, False, "GROUP BY"))
+        self.assertEqual([rules[position].id for position, detect, issue in visits], ["inefficient GROUP BY"])
+        self.assertEqual([rules[position].id for position, detect, issue in dispatch["USE TEMP B-TREE FOR ORDER BY"][3]], ["unnecessary_filesort"])
+        self.assertEqual(dispatch["SEARCH users USING INDEX idx_users (id=?)"][3], ())
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestRuleRegistry))
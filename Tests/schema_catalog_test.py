@@ -0,0 +1,115 @@
+# Ryan Gallagher
+# SQL Query Optimization Tool
+# schema_catalog_test.py
+
+# Resource importing and management.
+import unittest
+from unittest.mock import patch
+import tempfile
+import sqlite3
+import os
+from schema_catalog import SchemaCatalog, SchemaCatalogCache
+from explain_analyzer import ExplainAnalyzer
+from query_parser import QueryParser
+from pipeline import analyze_query
+
+# Testing suite for the schema catalog and its cache.
+class TestSchemaCatalog(unittest.TestCase):
+
+    # Creates a temporary DB with indexed, expression-indexed and foreign-keyed tables.
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix = ".sqlite3")
+        os.close(handle)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript("""
+            CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT UNIQUE, name TEXT, city TEXT, bio TEXT);
+            CREATE INDEX idx_users_city_name ON users (city, name);
+            CREATE INDEX idx_users_lower_bio ON users (lower(bio));
+            CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER REFERENCES users (id), code TEXT);
+        """)
+        self.catalog = SchemaCatalog(self.conn)
+
+    # Closes the connection and removes the temporary DB.
+    def tearDown(self):
+        self.conn.close()
+        os.remove(self.path)
+
+    # Analyzes a query's plan with the parser features and this DB's catalog.
+    def analyze(self, query, catalog):
+        explain_plan = [{"id" : row[0], "parent" : row[1], "notused" : row[2], "detail" : row[3]}
+                        for row in self.conn.execute(f"EXPLAIN QUERY PLAN {query}")]
+        features = QueryParser(query).get_query_features()
+        return ExplainAnalyzer(explain_plan, raw_query = query, query_features = features, catalog = catalog).analyze()["issues_detected"]
+
+    # Tests that tables, columns, indexes and foreign keys are loaded with their key columns.
+    def test_catalog_contents(self):
+        self.assertEqual(self.catalog.table("USERS")["columns"], ["id", "email", "name", "city", "bio"])
+        self.assertEqual([index["columns"] for index in self.catalog.table_indexes("users")], [[None], ["city", "name"], ["email"]])
+        self.assertEqual(self.catalog.table("orders")["foreign_keys"], [{"table" : "users", "from" : "user_id", "to" : "id"}])
+        self.assertTrue(self.catalog.indexes["sqlite_autoindex_users_1"]["unique"])
+
+    # Tests column coverage: indexed columns, the rowid alias, and columns only reached through an expression index.
+    def test_column_coverage(self):
+        self.assertEqual([(index["name"], position) for index, position in self.catalog.column_indexes("users", "Name")], [("idx_users_city_name", 1)])
+        self.assertTrue(self.catalog.is_indexed("users", "email"))
+        self.assertTrue(self.catalog.is_indexed("orders", "id"))
+        self.assertFalse(self.catalog.is_indexed("users", "bio"))
+        self.assertFalse(self.catalog.is_indexed("missing", "id"))
+
+    # Tests that an index only matches when it leads with exactly the given columns.
+    def test_leading_index(self):
+        self.assertEqual(self.catalog.leading_index("users", ["name", "city"]), "idx_users_city_name")
+        self.assertEqual(self.catalog.leading_index("users", ["city"]), "idx_users_city_name")
+        self.assertIsNone(self.catalog.leading_index("users", ["name"]))
+
+    # Tests that the cache loads a DB's catalog once and reloads it after a schema change.
+    def test_cache_keyed_by_schema_version(self):
+        cache = SchemaCatalogCache(max_size = 4)
+        first = cache.load(self.conn, self.path)
+        self.assertIs(cache.load(self.conn, self.path), first)
+        with patch("schema_catalog.SchemaCatalog.__init__", side_effect = AssertionError("reloaded")):
+            cache.load(self.conn, self.path)
+        self.conn.execute("CREATE INDEX idx_orders_code ON orders (code)")
+        second = cache.load(self.conn, self.path)
+        self.assertIsNot(second, first)
+        self.assertTrue(second.is_indexed("orders", "code"))
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    # Tests that functions only on unindexed columns are not reported when the catalog is available.
+    def test_functions_rule_checks_indexes(self):
+        query = "SELECT * FROM users u JOIN orders o ON o.user_id = u.id WHERE LOWER(u.name) = 'ann' AND UPPER(code) = 'X' AND LOWER(bio) = 'a'"
+        issues = [issue for issue in self.analyze(query, self.catalog) if issue["type"] == "Functions on Indexed Columns"]
+        self.assertEqual(issues[0]["message"], "Functions used in WHERE clause may disable index usage: ['LOWER(u.name)']")
+        issues = [issue for issue in self.analyze("SELECT * FROM users WHERE LOWER(city) = 'x'", None) if issue["type"] == "Functions on Indexed Columns"]
+        self.assertEqual(len(issues), 1)
+        issues = [issue for issue in self.analyze("SELECT * FROM orders WHERE UPPER(code) = 'X'", self.catalog) if issue["type"] == "Functions on Indexed Columns"]
+        self.assertEqual(issues, [])
+
+    # Tests that DISTINCT is not reported when an index already leads with the DISTINCT columns.
+    def test_distinct_rule_checks_indexes(self):
+        explain_plan = [{"id" : 2, "parent" : 0, "notused" : 0, "detail" : "SCAN users"}]
+        for query, expected in (("SELECT DISTINCT city FROM users", 0), ("SELECT DISTINCT bio FROM users", 1)):
+            features = QueryParser(query).get_query_features()
+            issues = ExplainAnalyzer(explain_plan, raw_query = query, query_features = features, catalog = self.catalog).analyze()["issues_detected"]
+            self.assertEqual(len([issue for issue in issues if issue["type"] == "DISTINCT Without Index"]), expected)
+
+
+    # Tests that a virtual table whose module is not loaded is left out of the catalog, and analyses of other tables still run.
+    def test_unreadable_table_skipped(self):
+        self.conn.execute("CREATE VIRTUAL TABLE notes USING fts4(body)")
+        self.conn.execute("PRAGMA writable_schema = ON")
+        self.conn.execute("UPDATE sqlite_master SET sql = 'CREATE VIRTUAL TABLE notes USING nosuchmod(body)' WHERE name = 'notes'")
+        self.conn.commit()
+        conn = sqlite3.connect(self.path)
+        try:
+            catalog = SchemaCatalog(conn)
+        finally:
+            conn.close()
+        self.assertIsNone(catalog.table("notes"))
+        self.assertTrue(catalog.is_indexed("users", "city"))
+        result = analyze_query("SELECT * FROM users WHERE LOWER(name) = 'ann'", self.path)
+        self.assertNotIn("error", result)
+
+
+# Runs the tests.
+unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestSchemaCatalog))
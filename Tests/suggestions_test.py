@@ -85,6 +85,21 @@ class TestSuggestions(unittest.TestCase):
         result = sugg.generate_suggestions()
         self.assertTrue(any("filesort" in s.lower() for s in result))
 
+    # Tests that a verified index candidate replaces the generic advice for the issue it fixes.
+    def test_verified_index_suggestion(self):
+        issues = [
+            {"type": "Full Table Scan", "message": "Query performs full table scan: 'SCAN users'"},
+            {"type": "Full Table Scan", "message": "Query performs full table scan: 'SCAN orders'"}
+        ]
+        candidates = [
+            {"statement": "CREATE INDEX IF NOT EXISTS idx_users_city ON users (city);", "verified": True, "scans_removed": ["SCAN users"], "temp_btrees_removed": []},
+            {"statement": "CREATE INDEX IF NOT EXISTS idx_orders_id ON orders (id);", "verified": False, "scans_removed": [], "temp_btrees_removed": []}
+        ]
+        result = Suggestions(issues, index_candidates = candidates).generate_suggestions()
+        self.assertEqual(len(result), 2)
+        self.assertIn("idx_users_city", result[0])
+        self.assertIn("Consider adding indexes", result[1])
+
 
 # Run the tests.
 unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(TestSuggestions))
\ No newline at end of file